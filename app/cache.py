@@ -0,0 +1,379 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .db import get_pool
+from .embedding_storage import EMBEDDING_DIMENSIONS
+
+load_dotenv()
+
+# ============================================
+# 답변 캐시 (정확 일치 + 의미 기반 유사 질문)
+# ============================================
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?？!！.。~]+$")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """대소문자, 공백, 끝의 문장부호 차이를 없앤 캐시용 질문 문자열"""
+    question = unicodedata.normalize("NFKC", question).strip().lower()
+    question = _WHITESPACE.sub(" ", question)
+    return _TRAILING_PUNCTUATION.sub("", question)
+
+def make_cache_key(question: str, language: str) -> str:
+    """(정규화된 질문, 언어) 캐시 키"""
+    raw = f"{language}\x1f{normalize_question(question)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _unit_vector(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class InMemoryAnswerCache:
+    """프로세스 내부 LRU + TTL 답변 캐시"""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (created_at, language, response, unit embedding)
+        self._lock = threading.Lock()
+
+    def _expired(self, created_at: float) -> bool:
+        return time.monotonic() - created_at > self.ttl
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def find_similar(self, embedding, language: str):
+        """같은 언어의 캐시 항목 중 코사인 유사도가 가장 높은 (응답, 유사도)를 반환합니다."""
+        query = _unit_vector(embedding)
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry[1] == language and entry[3] is not None and not self._expired(entry[0])
+            ]
+            if not candidates:
+                return None
+            similarities = np.stack([entry[3] for _, entry in candidates]) @ query
+            best = int(np.argmax(similarities))
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            return entry[2], float(similarities[best])
+
+    def set(self, key: str, question: str, language: str, response: dict, embedding=None):
+        unit = _unit_vector(embedding) if embedding is not None else None
+        with self._lock:
+            self._entries[key] = (time.monotonic(), language, response, unit)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class PostgresAnswerCache:
+    """
+    pgvector 데이터베이스의 answer_cache 테이블을 사용하는 답변 캐시
+
+    여러 워커 프로세스가 캐시를 공유할 수 있으며, 유사 질문 검색은 pgvector의 코사인 거리를 사용합니다.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._ensure_table()
+
+    def _ensure_table(self):
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS answer_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    response JSONB NOT NULL,
+                    embedding vector({EMBEDDING_DIMENSIONS}),
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    last_accessed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS answer_cache_last_accessed_idx ON answer_cache (last_accessed_at)")
+
+    def get(self, key: str):
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE answer_cache SET last_accessed_at = now()
+                WHERE cache_key = %s AND created_at > now() - make_interval(secs => %s)
+                RETURNING response
+            """, (key, self.ttl))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def find_similar(self, embedding, language: str):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT cache_key, response, 1 - (embedding <=> %s::vector) AS similarity
+                FROM answer_cache
+                WHERE language = %s
+                  AND embedding IS NOT NULL
+                  AND created_at > now() - make_interval(secs => %s)
+                ORDER BY embedding <=> %s::vector
+                LIMIT 1
+            """, (embedding, language, self.ttl, embedding))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            cur.execute("UPDATE answer_cache SET last_accessed_at = now() WHERE cache_key = %s", (row[0],))
+        return row[1], float(row[2])
+
+    def set(self, key: str, question: str, language: str, response: dict, embedding=None):
+        embedding = np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO answer_cache (cache_key, question, language, response, embedding)
+                VALUES (%s, %s, %s, %s, %s::vector)
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    response = EXCLUDED.response,
+                    embedding = EXCLUDED.embedding,
+                    created_at = now(),
+                    last_accessed_at = now()
+            """, (key, question, language, json.dumps(response, ensure_ascii=False), embedding))
+            # 만료 항목과 LRU 한도를 넘는 항목 정리
+            cur.execute("DELETE FROM answer_cache WHERE created_at <= now() - make_interval(secs => %s)", (self.ttl,))
+            cur.execute("""
+                DELETE FROM answer_cache WHERE cache_key IN (
+                    SELECT cache_key FROM answer_cache ORDER BY last_accessed_at DESC OFFSET %s
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM answer_cache")
+
+class AnswerCache:
+    """
+    /query 응답 캐시
+
+    (정규화된 질문, 언어) 정확 일치 조회를 먼저 하고, semantic 모드에서는 hybrid_search가 이미 계산한
+    질문 임베딩으로 유사도가 `similarity_threshold` 이상인 캐시 응답도 재사용합니다.
+    """
+
+    def __init__(self, backend, semantic: bool = False, similarity_threshold: float = 0.95):
+        self.backend = backend
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._errors = 0
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def lookup(self, question: str, language: str):
+        """정확 일치하는 캐시 응답(dict)을 반환합니다. 없으면 None."""
+        try:
+            response = self.backend.get(make_cache_key(question, language))
+        except Exception as e:
+            print(f"Answer cache lookup failed: {e}")
+            self._count("_errors")
+            return None
+        if response is not None:
+            self._count("_hits")
+        return response
+
+    def lookup_similar(self, embedding, language: str):
+        """의미상 같은 질문의 캐시 응답(dict)을 반환합니다. semantic 모드가 아니면 항상 None."""
+        if not self.semantic or embedding is None:
+            return None
+        try:
+            match = self.backend.find_similar(embedding, language)
+        except Exception as e:
+            print(f"Answer cache similarity lookup failed: {e}")
+            self._count("_errors")
+            return None
+        if match is not None and match[1] >= self.similarity_threshold:
+            self._count("_semantic_hits")
+            return match[0]
+        return None
+
+    def record_miss(self):
+        self._count("_misses")
+
+    def store(self, question: str, language: str, response: dict, embedding=None):
+        try:
+            self.backend.set(make_cache_key(question, language), question, language, response, embedding)
+            self._count("_stores")
+        except Exception as e:
+            print(f"Answer cache store failed: {e}")
+            self._count("_errors")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._semantic_hits + self._misses
+            return {
+                "backend": type(self.backend).__name__,
+                "semantic": self.semantic,
+                "hits": self._hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "errors": self._errors,
+                "hit_rate": (self._hits + self._semantic_hits) / total if total else 0.0,
+            }
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache():
+    """
+    환경 변수 설정에 따른 프로세스 전역 답변 캐시를 반환합니다.
+    ANSWER_CACHE_BACKEND=none 이면 None을 반환합니다.
+    """
+    global _answer_cache
+    backend_name = os.getenv("ANSWER_CACHE_BACKEND", "memory").lower()
+    if backend_name == "none":
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                ttl = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+                max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+                if backend_name == "postgres":
+                    backend = PostgresAnswerCache(max_entries=max_entries, ttl=ttl)
+                else:
+                    backend = InMemoryAnswerCache(max_entries=max_entries, ttl=ttl)
+                _answer_cache = AnswerCache(
+                    backend,
+                    semantic=os.getenv("ANSWER_CACHE_SEMANTIC", "false").lower() == "true",
+                    similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.95")),
+                )
+    return _answer_cache
+
+# ============================================
+# 임베딩 캐시 (요청 단위 + 프로세스 전역 LRU)
+# ============================================
+
+def _text_key(model: str, text: str):
+    return model, hashlib.sha256(text.encode("utf-8")).digest()
+
+class EmbeddingCache:
+    """
+    (모델 이름, 텍스트 해시) → float32 임베딩 LRU 캐시
+
+    임베딩은 1536개의 파이썬 float 리스트 대신 float32 NumPy 배열로 저장하여
+    항목당 메모리를 약 6KB로 줄입니다.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, model: str, text: str):
+        key = _text_key(model, text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return embedding
+
+    def put(self, model: str, text: str, embedding):
+        key = _text_key(model, text)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+
+embedding_cache = EmbeddingCache(max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")))
+
+# 요청 하나 안에서 계산된 임베딩 (전역 LRU에서 밀려나도 같은 요청 안에서는 재계산하지 않음)
+_request_embeddings = contextvars.ContextVar("request_embeddings", default=None)
+
+@contextmanager
+def embedding_scope():
+    """이 블록 안에서 계산된 임베딩을 요청 단위로 공유합니다."""
+    token = _request_embeddings.set({})
+    try:
+        yield
+    finally:
+        _request_embeddings.reset(token)
+
+def get_cached_embeddings(embeddings_model, model_name: str, texts):
+    """
+    요청 캐시 → 전역 캐시 순으로 조회하고, 없는 텍스트만 한 번의 embed_documents 호출로 계산합니다.
+
+    Returns:
+        texts와 같은 순서의 float32 NumPy 배열 리스트
+    """
+    scope = _request_embeddings.get()
+    results = [None] * len(texts)
+    missing = {}
+    for i, text in enumerate(texts):
+        embedding = scope.get((model_name, text)) if scope is not None else None
+        if embedding is None:
+            embedding = embedding_cache.get(model_name, text)
+        if embedding is None:
+            missing.setdefault(text, []).append(i)
+        results[i] = embedding
+
+    if missing:
+        new_texts = list(missing)
+        new_embeddings = embeddings_model.embed_documents(new_texts)
+        for text, embedding in zip(new_texts, new_embeddings):
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding_cache.put(model_name, text, embedding)
+            for i in missing[text]:
+                results[i] = embedding
+
+    if scope is not None:
+        for text, embedding in zip(texts, results):
+            scope[(model_name, text)] = embedding
+    return results
@@ -1,30 +1,212 @@
 import os
-import psycopg2
+import threading
+import time
 from psycopg2.extras import RealDictCursor
 from langchain_community.utilities import SQLDatabase
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain.chains import create_sql_query_chain
 from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 import json
+import numpy as np
+
+from .cache import get_cached_embeddings
+from .db import get_pool, run_blocking
+from .embedding_storage import (
+    EMBEDDING_MODEL_ID, QUERY_VECTOR, candidate_rows, make_embeddings_model, rerank_candidates,
+)
+from .index_manager import EMBEDDING_TABLES, UNIFIED_PARTITIONS, search_settings_sql
+from .intent import INTENT_EMBEDDING_FALLBACK, classify_intent
+from .results import compact_result_for_prompt, run_prepared, run_sql, strip_sql
+from .sql_templates import SQL_TEMPLATE_CACHE, sql_template_cache
+from .lexical import (
+    HYBRID_CANDIDATES, HYBRID_LEXICAL, HYBRID_NAME_MIN_SIMILARITY, HYBRID_RRF_K, build_tsquery,
+    extract_name_phrases, hybrid_sql, is_confident_lexical_match, reciprocal_rank_fusion,
+)
+from .vector_index import VECTOR_SEARCH_BACKEND, get_index
 
 load_dotenv()
 
-# OpenAI Embeddings 초기화
-embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small")
+# 스키마 검색: 질문과 관련된 테이블의 스키마만 SQL 생성 프롬프트에 넣음
+SCHEMA_RETRIEVAL = os.getenv("SCHEMA_RETRIEVAL", "true").lower() == "true"
+# 임베딩 유사도로 고르는 테이블 수
+SCHEMA_TOP_K = int(os.getenv("SCHEMA_TOP_K", "4"))
+# 고른 테이블에서 외래 키를 따라 함께 포함할 이웃 테이블의 깊이
+SCHEMA_FK_DEPTH = int(os.getenv("SCHEMA_FK_DEPTH", "1"))
 
-def get_db():
+# OpenAI Embeddings 초기화 (EMBEDDING_DIMENSIONS 차원, 저장된 임베딩과 같은 설정)
+embeddings_model = make_embeddings_model()
+
+def embed_query(text: str):
+    """질문 임베딩을 반환합니다 (요청 캐시 → 전역 LRU 캐시 → 임베딩 API 순)."""
+    return get_cached_embeddings(embeddings_model, EMBEDDING_MODEL_ID, [text])[0]
+
+def embed_queries(texts):
+    """여러 질문의 임베딩을 반환합니다. 캐시에 없는 질문만 한 번의 API 호출로 계산합니다."""
+    return get_cached_embeddings(embeddings_model, EMBEDDING_MODEL_ID, list(texts))
+
+# 앱이 내부적으로 쓰는 테이블 (SQL 생성 프롬프트, 스키마 임베딩, 스키마 검색에서 제외)
+# unified_embeddings의 source_table별 파티션과 DEFAULT 파티션(unified_embeddings_other)도 포함
+INTERNAL_TABLES = frozenset(EMBEDDING_TABLES) | {
+    "unified_embeddings", "unified_embeddings_other", "schema_embeddings", "answer_cache", "vector_index_settings",
+}
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    스키마 반영 결과와 table_info 문자열을 캐시하는 SQLDatabase
+
+    SQLDatabase.get_table_info는 호출할 때마다 테이블별 샘플 행을 다시 조회하므로,
+    스키마가 바뀌지 않는 한 결과를 재사용합니다. 스키마가 바뀌면 invalidate()를 호출하세요.
+    """
+
+    def __init__(self, engine, **kwargs):
+        # 부모 생성자가 get_usable_table_names()를 호출하므로 캐시를 먼저 준비
+        self._init_kwargs = kwargs
+        self._cache_lock = threading.Lock()
+        self._usable_table_names = None
+        self._table_info_cache = {}
+        self._foreign_key_neighbours = None
+        super().__init__(engine, **kwargs)
+
+    def get_usable_table_names(self):
+        if self._usable_table_names is None:
+            # ignore_tables는 DB에 없는 이름이 있으면 오류이므로 (임베딩 생성 전) 여기서 걸러냄
+            self._usable_table_names = [name for name in super().get_usable_table_names()
+                                        if name not in INTERNAL_TABLES]
+        return self._usable_table_names
+
+    def get_table_info(self, table_names=None, **kwargs):
+        key = (tuple(sorted(table_names)) if table_names else None, tuple(sorted(kwargs.items())))
+        table_info = self._table_info_cache.get(key)
+        if table_info is None:
+            table_info = super().get_table_info(table_names=table_names, **kwargs)
+            self._table_info_cache[key] = table_info
+        return table_info
+
+    def get_foreign_key_neighbours(self):
+        """외래 키로 직접 연결된 테이블 목록 {table: {이웃 테이블, ...}} (양방향)"""
+        if self._foreign_key_neighbours is None:
+            neighbours = {name: set() for name in self.get_usable_table_names()}
+            for name in neighbours:
+                for foreign_key in self._inspector.get_foreign_keys(name, schema=self._schema):
+                    referred = foreign_key["referred_table"]
+                    if referred in neighbours and referred != name:
+                        neighbours[name].add(referred)
+                        neighbours[referred].add(name)
+            self._foreign_key_neighbours = neighbours
+        return self._foreign_key_neighbours
+
+    def invalidate(self):
+        """스키마를 다시 반영하고 캐시된 테이블 목록, table_info, 외래 키 관계를 비웁니다."""
+        with self._cache_lock:
+            self._usable_table_names = None
+            self._table_info_cache = {}
+            self._foreign_key_neighbours = None
+            SQLDatabase.__init__(self, self._engine, **self._init_kwargs)
+
+def get_database_uri() -> str:
     db_user = os.getenv("DB_USER")
     db_password = os.getenv("DB_PASSWORD")
     db_host = os.getenv("DB_HOST")
     db_port = os.getenv("DB_PORT")
     db_name = os.getenv("DB_NAME")
-    
-    return SQLDatabase.from_uri(
-        f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    )
+    return f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+_db = None
+_db_lock = threading.Lock()
+
+def get_db():
+    """
+    프로세스 전역에서 공유하는 SQLDatabase를 반환합니다.
+
+    최초 호출 시 한 번만 엔진을 만들고 스키마를 반영하며, 이후에는 같은 객체를 재사용합니다.
+    """
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = CachedSQLDatabase.from_uri(get_database_uri(), engine_args={"pool_pre_ping": True})
+    return _db
+
+def invalidate_schema_cache():
+    """
+    데이터베이스 스키마가 바뀐 뒤 호출합니다.
+
+    공유 SQLDatabase의 스키마를 다시 반영하고 캐시된 테이블 정보를 비웁니다.
+    체인이 같은 객체를 참조하므로 체인을 다시 만들 필요는 없습니다.
+    스키마 검색용 테이블 임베딩도 다음 질문에서 다시 읽고, 이전 스키마로 만든 SQL 템플릿은 버립니다.
+    """
+    global _schema_index
+    if _db is not None:
+        _db.invalidate()
+    _schema_index = None
+    sql_template_cache.clear()
+
+_schema_index = None
+_schema_index_lock = threading.Lock()
+
+def _get_schema_index():
+    """
+    schema_embeddings 테이블의 테이블 임베딩을 (테이블 이름 목록, 정규화된 행렬)로 읽어 둡니다.
+
+    테이블 수십 개 규모이므로 질문마다 pgvector를 조회하지 않고 메모리에서 유사도를 계산합니다.
+    invalidate_schema_cache()가 호출되면 다시 읽습니다.
+    """
+    global _schema_index
+    if _schema_index is None:
+        with _schema_index_lock:
+            if _schema_index is None:
+                try:
+                    with get_pool().connection() as conn, conn.cursor() as cur:
+                        cur.execute("SELECT table_name, embedding FROM schema_embeddings ORDER BY table_name")
+                        rows = cur.fetchall()
+                except Exception as e:
+                    print(f"Schema embeddings unavailable (using all tables): {e}")
+                    rows = []
+                names = [name for name, _ in rows]
+                matrix = np.array([embedding for _, embedding in rows], dtype=np.float32).reshape(len(rows), -1)
+                if len(rows):
+                    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+                _schema_index = (names, matrix)
+    return _schema_index
+
+def retrieve_relevant_tables(question: str, top_k: int = None, fk_depth: int = None, query_embedding=None, db=None,
+                             seed_tables=None):
+    """
+    질문과 관련된 테이블 이름 목록을 반환합니다.
+
+    테이블 DDL/설명 임베딩과 질문 임베딩의 코사인 유사도로 top_k개를 고른 뒤,
+    JOIN에 필요한 테이블이 빠지지 않도록 외래 키로 연결된 이웃을 fk_depth 단계까지 추가합니다.
+    seed_tables(키워드 검색으로 이름이 확실히 일치한 테이블)가 있으면 임베딩 없이 그 테이블에서 시작합니다.
+    스키마 임베딩이 없거나 고른 테이블이 없으면 None(전체 테이블 사용)을 반환합니다.
+    """
+    top_k = SCHEMA_TOP_K if top_k is None else top_k
+    fk_depth = SCHEMA_FK_DEPTH if fk_depth is None else fk_depth
+    db = db or get_db()
+    usable = set(db.get_usable_table_names())
+
+    if seed_tables:
+        selected = set(seed_tables) & usable
+    else:
+        names, matrix = _get_schema_index()
+        if not names:
+            return None
+        if query_embedding is None:
+            query_embedding = embed_query(question)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        similarities = matrix @ (query_vector / np.linalg.norm(query_vector))
+        selected = {names[i] for i in np.argsort(-similarities)[:top_k] if names[i] in usable}
+    if not selected:
+        return None
+
+    neighbours = db.get_foreign_key_neighbours()
+    frontier = set(selected)
+    for _ in range(fk_depth):
+        frontier = {n for table in frontier for n in neighbours.get(table, ())} - selected
+        selected |= frontier
+    return sorted(selected)
 
 def clean_sql_query(query: str) -> str:
     """
@@ -69,9 +251,22 @@ def clean_json_response(response: str) -> str:
     
     return response
 
-def get_full_chain():
-    db = get_db()
-    llm = ChatOpenAI(model="gpt-4-turbo", temperature=0)
+def get_chain_stages(llm=None, db=None):
+    """
+    Text-to-SQL 파이프라인의 단계별 Runnable을 구성합니다.
+
+    스트리밍 API처럼 단계별 결과가 필요한 곳에서 직접 사용하며,
+    get_full_chain은 이 단계들을 하나의 체인으로 조립합니다.
+
+    Args:
+        llm: 사용할 LLM (기본값: gpt-4-turbo)
+        db: 사용할 SQLDatabase (기본값: get_db())
+
+    Returns:
+        {"intent", "sql_query", "sql_result", "final_response"} 키를 가진 Runnable dict
+    """
+    db = db or get_db()
+    llm = llm or ChatOpenAI(model="gpt-4-turbo", temperature=0)
 
     # 1. 의도 파악 체인 (다국어 지원)
     intent_prompts = {
@@ -102,31 +297,56 @@ def get_full_chain():
     }
 
     # 2. SQL 쿼리 생성 체인
+    # 스키마 검색이 켜져 있으면 질문과 관련된 테이블만 table_names_to_use로 넘겨 프롬프트를 줄인다
+    # (schema_embeddings가 같은 PostgreSQL DB에 있으므로 기본 CachedSQLDatabase일 때만 사용)
     generate_query_chain = create_sql_query_chain(llm, db)
+    if SCHEMA_RETRIEVAL and isinstance(db, CachedSQLDatabase):
+        def select_tables(x):
+            # 키워드 검색만으로 답한 질문(lexical_tables)은 임베딩 API를 호출하지 않고 일치한 테이블에서 시작
+            return retrieve_relevant_tables(x.get("user_question", x["question"]), db=db,
+                                            seed_tables=x.get("lexical_tables"))
+
+        async def aselect_tables(x):
+            return await run_blocking(select_tables, x)
+
+        generate_query_chain = (
+            RunnablePassthrough.assign(table_names_to_use=RunnableLambda(select_tables, afunc=aselect_tables))
+            | generate_query_chain
+        )
+
+    if SQL_TEMPLATE_CACHE:
+        llm_query_chain = generate_query_chain
+
+        def route_sql_query(x):
+            # 리터럴만 다른 질문의 SQL 템플릿이 있으면 LLM 호출 없이 리터럴을 넣은 SQL을 반환
+            hit = sql_template_cache.lookup(x.get("user_question", x["question"]))
+            if hit is None:
+                return llm_query_chain
+            return hit.sql
+
+        async def aroute_sql_query(x):
+            return route_sql_query(x)
 
-    # 3. 자연어 답변 및 차트 데이터 생성 체인 (다국어 지원)
+        generate_query_chain = RunnableLambda(route_sql_query, afunc=aroute_sql_query)
+
+    # 3. 자연어 답변 생성 체인 (다국어 지원)
+    # chart_data는 app/charts.py가 SQL 결과 행에서 직접 만들므로 LLM은 답변 문장만 생성합니다.
     answer_prompts = {
         "한국어": PromptTemplate.from_template(
-            """사용자의 질문, 생성된 SQL 쿼리, 그리고 SQL 결과를 바탕으로 포괄적인 답변을 두 부분으로 나누어 제공하세요:
-            1. 질문에 직접적으로 답변하는 자연어 응답. (답변 언어: 한국어)
-            2. 사용자가 시각화를 요청한 경우, 차트에 필요한 데이터를 유효한 JSON 형식으로 제공. JSON은 각 데이터 포인트를 나타내는 객체들의 리스트여야 합니다.
+            """사용자의 질문, 생성된 SQL 쿼리, 그리고 SQL 결과를 바탕으로 질문에 직접적으로 답변하는 자연어 응답을 작성하세요. (답변 언어: 한국어)
 
             질문: {question}
             SQL 쿼리: {sql_query}
             SQL 결과: {sql_result}
             사용자 의도: {intent}
 
-            중요: 시간 기반 데이터(월별, 연도별 등)의 경우, chart_data의 키 이름을 명확하게 지정하세요.
-            예: {{{{"Month": "2024-01", "Count": 150}}}} 또는 {{{{"Year": 2024, "Month": 1, "Count": 150}}}}
-            
-            'natural_language_response'와 'chart_data' 두 개의 키를 가진 단일 JSON 객체로 응답을 제공하세요.
-            - 'natural_language_response': [여기에 자연어 답변]
-            - 'chart_data': [여기에 차트용 JSON 데이터, 차트가 필요 없으면 빈 리스트 []]"""
+            중요:
+            - ID 대신 실제 이름(카테고리 이름, 고객 이름, 배우 이름 등)을 사용하세요.
+            - 차트 데이터는 별도로 생성되므로 JSON이나 표를 다시 작성하지 말고 답변 문장만 출력하세요.
+            답변:"""
         ),
         "English": PromptTemplate.from_template(
-            """Given the user's question, the generated SQL query, and the SQL result, provide a comprehensive answer in two parts:
-            1. A natural language response that directly answers the question. (Answer Language: English)
-            2. If the user asked for a visualization, provide the necessary data for the chart in a valid JSON format. The JSON should be a list of objects, where each object represents a data point.
+            """Given the user's question, the generated SQL query, and the SQL result, write a natural language response that directly answers the question. (Answer Language: English)
 
             Question: {question}
             SQL Query: {sql_query}
@@ -134,29 +354,20 @@ def get_full_chain():
             User Intent: {intent}
 
             CRITICAL RULES:
-            - ALWAYS use actual names (category names, customer names, actor names, etc.) instead of IDs in both the natural language response and chart_data
+            - ALWAYS use actual names (category names, customer names, actor names, etc.) instead of IDs
             - If the SQL result contains both ID and name columns (e.g., category_id and name), ALWAYS use the name column
             - Make your response human-readable and meaningful
-            
-            Important guidelines for chart_data:
-            - Use descriptive, human-readable key names (e.g., "Category", "Count", "Revenue", "Customer_Name")
-            - For categorical data (categories, names, etc.), use string values (NOT IDs)
-            - For numerical data (counts, amounts, etc.), use numeric values
-            - For time-based data, use clear key names: {{"Month": "2024-01", "Count": 150}} or {{"Year": 2024, "Month": 1, "Count": 150}}
-            - Example for categories: [{{"Category": "Action", "Movie_Count": 74}}, {{"Category": "Drama", "Movie_Count": 73}}]
-            - NEVER use: [{{"Category_ID": 15, "Movie_Count": 74}}] - this is WRONG!
-            
-            Provide your response as a single JSON object with two keys: 'natural_language_response' and 'chart_data'.
-            - 'natural_language_response': [Your natural language answer here]
-            - 'chart_data': [Your JSON data for the chart here, or an empty list [] if no chart is needed]"""
+            - Chart data is generated separately: do NOT repeat the rows as JSON or tables, output only the answer text
+            Answer:"""
         )
     }
 
     # 동적 프롬프트 선택을 위한 체인 구성
+    # 의도 판단에는 벡터 컨텍스트가 붙기 전의 원래 질문을 사용
     def select_intent_prompt(x):
         language = x.get("language", "한국어")
         prompt = intent_prompts.get(language, intent_prompts["한국어"])
-        return prompt.invoke({"question": x["question"]})
+        return prompt.invoke({"question": x.get("user_question", x["question"])})
     
     def select_answer_prompt(x):
         language = x.get("language", "한국어")
@@ -164,53 +375,97 @@ def get_full_chain():
         return prompt.invoke({
             "question": x["question"],
             "sql_query": x["sql_query"],
-            "sql_result": x["sql_result"],
+            "sql_result": compact_result_for_prompt(x["sql_result"]),
             "intent": x["intent"]
         })
     
-    intent_chain = select_intent_prompt | llm | StrOutputParser()
+    llm_intent_chain = select_intent_prompt | llm | StrOutputParser()
+
+    def route_intent(x):
+        # 규칙(또는 임베딩)으로 판단되면 LLM 호출 없이 같은 형식의 JSON을 반환하고,
+        # 애매한 질문만 LLM 의도 체인으로 넘긴다 (RunnableLambda가 반환된 체인을 실행)
+        decided = classify_intent(x.get("user_question", x["question"]), embed_texts=embed_queries)
+        if decided is None:
+            return llm_intent_chain
+        return json.dumps(decided)
+
+    async def aroute_intent(x):
+        # 임베딩 fallback은 블로킹 API 호출이 될 수 있으므로 스레드 풀에서 판단
+        if INTENT_EMBEDDING_FALLBACK:
+            return await run_blocking(route_intent, x)
+        return route_intent(x)
+
+    intent_chain = RunnableLambda(route_intent, afunc=aroute_intent)
     answer_chain = select_answer_prompt | llm | StrOutputParser()
 
     # 4. 전체 체인 구성
     def run_db_query(x):
-        sql_query = clean_sql_query(x["sql_query"])
-        try:
-            return db.run(sql_query)
-        except Exception as e:
-            return f"Error executing query: {str(e)}"
+        # 구조화된 결과 {"columns", "rows", "row_count", "error"} 반환
+        sql = strip_sql(clean_sql_query(x["sql_query"]))
+        if not SQL_TEMPLATE_CACHE:
+            return run_sql(db, sql)
+
+        question = x.get("user_question", x["question"])
+        hit = sql_template_cache.peek(question)
+        if hit is not None and hit.sql == sql:
+            # 템플릿에서 온 SQL은 prepared statement로 실행 (파싱/계획 생략)
+            if db.dialect != "postgresql":
+                return run_sql(db, sql)
+            result = run_prepared(db, hit.statement_name, hit.template, hit.params)
+            if result["error"]:
+                # PREPARE는 일반 텍스트로는 실행되는 SQL에서도 실패할 수 있음 (예: 파라미터 타입 추론 불가)
+                # → 템플릿을 버리고 완성된 SQL로 다시 실행
+                sql_template_cache.discard(question)
+                return run_sql(db, hit.sql)
+            return result
+
+        result = run_sql(db, sql)
+        if not result["error"] and result["columns"]:
+            sql_template_cache.store(question, sql)
+        return result
+
+    async def arun_db_query(x):
+        # ainvoke 시 DB 호출이 이벤트 루프를 막지 않도록 스레드 풀에서 실행
+        return await run_blocking(run_db_query, x)
+
+    return {
+        "intent": intent_chain,
+        "sql_query": generate_query_chain,
+        "sql_result": RunnableLambda(run_db_query, afunc=arun_db_query),
+        "final_response": answer_chain,
+    }
+
+def get_full_chain(llm=None, db=None, stages=None):
+    """
+    Text-to-SQL 전체 체인을 구성합니다.
+
+    의도 파악과 SQL 생성은 서로의 결과를 필요로 하지 않으므로 병렬로 실행되며,
+    SQL 실행과 답변 생성만 그 뒤에 순차적으로 이어집니다.
 
+    Args:
+        llm: 사용할 LLM (기본값: gpt-4-turbo)
+        db: 사용할 SQLDatabase (기본값: get_db())
+        stages: 이미 구성된 get_chain_stages() 결과 (주어지면 llm, db는 무시)
+    """
+    stages = stages or get_chain_stages(llm=llm, db=db)
+
+    # 의도 파악과 SQL 생성은 하나의 병렬 단계에서 동시에 실행됩니다.
     chain = (
-        RunnablePassthrough.assign(intent=intent_chain)
-        .assign(sql_query=generate_query_chain)
-        .assign(sql_result=run_db_query)
-        .assign(final_response=answer_chain)
+        RunnablePassthrough.assign(intent=stages["intent"], sql_query=stages["sql_query"])
+        .assign(sql_result=stages["sql_result"])
+        .assign(final_response=stages["final_response"])
     )
     
     return chain
 
 def execute_query(sql_query: str):
-    db = get_db()
-    try:
-        result = db.run(sql_query)
-        return result
-    except Exception as e:
-        return f"Error executing query: {str(e)}"
+    return run_sql(get_db(), sql_query)
 
 # ============================================
 # 벡터 검색 기능
 # ============================================
 
-def get_vector_db_connection():
-    """pgvector 데이터베이스 연결 생성"""
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD")
-    )
-
-def vector_search_unified(query: str, top_k: int = 5, source_filter: str = None):
+def vector_search_unified(query: str, top_k: int = 5, source_filter: str = None, query_embedding=None):
     """
     통합 벡터 검색 (모든 테이블에서 검색)
     
@@ -218,48 +473,58 @@ def vector_search_unified(query: str, top_k: int = 5, source_filter: str = None)
         query: 검색 쿼리
         top_k: 반환할 결과 수
         source_filter: 특정 테이블만 검색 ('film', 'actor', 'customer', 'category')
+        query_embedding: 이미 계산된 쿼리 임베딩 (없으면 새로 생성)
     
     Returns:
         검색 결과 리스트
     """
     # 쿼리 임베딩 생성
-    query_embedding = embeddings_model.embed_query(query)
-    
-    conn = get_vector_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
-    # SQL 쿼리 구성
-    if source_filter:
-        sql = """
-            SELECT 
-                source_table,
-                source_id,
-                content,
-                metadata,
-                1 - (embedding <=> %s::vector) as similarity
-            FROM unified_embeddings
-            WHERE source_table = %s
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-        """
-        cur.execute(sql, (query_embedding, source_filter, query_embedding, top_k))
-    else:
-        sql = """
-            SELECT 
-                source_table,
-                source_id,
-                content,
-                metadata,
-                1 - (embedding <=> %s::vector) as similarity
-            FROM unified_embeddings
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s
-        """
-        cur.execute(sql, (query_embedding, query_embedding, top_k))
-    
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
+    if query_embedding is None:
+        query_embedding = embed_query(query)
+
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        where = {"source_table": source_filter} if source_filter else None
+        return get_index("unified").search(query_embedding, top_k, where=where)
+    
+    # 인덱스 관리자가 보정한 probes / ef_search (같은 execute에서 SET LOCAL)
+    # source_filter가 있으면 해당 파티션만 스캔되므로 그 파티션의 값만 적용
+    candidates = rerank_candidates(top_k)
+    settings = search_settings_sql([f"unified_embeddings_{source_filter}"] if source_filter else UNIFIED_PARTITIONS,
+                                   candidates=candidates)
+    params = {"embedding": query_embedding, "source_filter": source_filter,
+              "top_k": top_k, "rerank_candidates": candidates}
+    columns = "source_table, source_id, content, metadata, embedding"
+    with get_pool().connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        # SQL 쿼리 구성 (binary 저장이면 비트 후보를 코사인 거리로 다시 정렬)
+        if source_filter:
+            rows = candidate_rows("unified_embeddings", columns, where="source_table = %(source_filter)s")
+            sql = f"""
+                SELECT 
+                    source_table,
+                    source_id,
+                    content,
+                    metadata,
+                    1 - (embedding <=> {QUERY_VECTOR}) as similarity
+                FROM {rows} u
+                WHERE source_table = %(source_filter)s
+                ORDER BY embedding <=> {QUERY_VECTOR}
+                LIMIT %(top_k)s
+            """
+        else:
+            sql = f"""
+                SELECT 
+                    source_table,
+                    source_id,
+                    content,
+                    metadata,
+                    1 - (embedding <=> {QUERY_VECTOR}) as similarity
+                FROM {candidate_rows("unified_embeddings", columns)} u
+                ORDER BY embedding <=> {QUERY_VECTOR}
+                LIMIT %(top_k)s
+            """
+        cur.execute(settings + sql, params)
+    
+        results = cur.fetchall()
     
     return [dict(row) for row in results]
 
@@ -274,30 +539,31 @@ def vector_search_films(query: str, top_k: int = 5):
     Returns:
         검색 결과 리스트
     """
-    query_embedding = embeddings_model.embed_query(query)
-    
-    conn = get_vector_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    query_embedding = embed_query(query)
+
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        return get_index("film").search(query_embedding, top_k)
     
-    sql = """
-        SELECT 
-            fe.film_id,
-            fe.content,
-            f.title,
-            f.description,
-            f.release_year,
-            f.rating,
-            1 - (fe.embedding <=> %s::vector) as similarity
-        FROM film_embeddings fe
-        JOIN film f ON fe.film_id = f.film_id
-        ORDER BY fe.embedding <=> %s::vector
-        LIMIT %s
-    """
-    cur.execute(sql, (query_embedding, query_embedding, top_k))
+    candidates = rerank_candidates(top_k)
+    settings = search_settings_sql(["film_embeddings"], candidates=candidates)
+    with get_pool().connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        sql = f"""
+            SELECT 
+                fe.film_id,
+                fe.content,
+                f.title,
+                f.description,
+                f.release_year,
+                f.rating,
+                1 - (fe.embedding <=> {QUERY_VECTOR}) as similarity
+            FROM {candidate_rows("film_embeddings", "film_id, content, embedding")} fe
+            JOIN film f ON fe.film_id = f.film_id
+            ORDER BY fe.embedding <=> {QUERY_VECTOR}
+            LIMIT %(top_k)s
+        """
+        cur.execute(settings + sql, {"embedding": query_embedding, "top_k": top_k, "rerank_candidates": candidates})
     
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
+        results = cur.fetchall()
     
     return [dict(row) for row in results]
 
@@ -312,28 +578,29 @@ def vector_search_actors(query: str, top_k: int = 5):
     Returns:
         검색 결과 리스트
     """
-    query_embedding = embeddings_model.embed_query(query)
-    
-    conn = get_vector_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    query_embedding = embed_query(query)
+
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        return get_index("actor").search(query_embedding, top_k)
     
-    sql = """
-        SELECT 
-            ae.actor_id,
-            ae.content,
-            a.first_name,
-            a.last_name,
-            1 - (ae.embedding <=> %s::vector) as similarity
-        FROM actor_embeddings ae
-        JOIN actor a ON ae.actor_id = a.actor_id
-        ORDER BY ae.embedding <=> %s::vector
-        LIMIT %s
-    """
-    cur.execute(sql, (query_embedding, query_embedding, top_k))
+    candidates = rerank_candidates(top_k)
+    settings = search_settings_sql(["actor_embeddings"], candidates=candidates)
+    with get_pool().connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        sql = f"""
+            SELECT 
+                ae.actor_id,
+                ae.content,
+                a.first_name,
+                a.last_name,
+                1 - (ae.embedding <=> {QUERY_VECTOR}) as similarity
+            FROM {candidate_rows("actor_embeddings", "actor_id, content, embedding")} ae
+            JOIN actor a ON ae.actor_id = a.actor_id
+            ORDER BY ae.embedding <=> {QUERY_VECTOR}
+            LIMIT %(top_k)s
+        """
+        cur.execute(settings + sql, {"embedding": query_embedding, "top_k": top_k, "rerank_candidates": candidates})
     
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
+        results = cur.fetchall()
     
     return [dict(row) for row in results]
 
@@ -348,53 +615,260 @@ def vector_search_customers(query: str, top_k: int = 5):
     Returns:
         검색 결과 리스트
     """
-    query_embedding = embeddings_model.embed_query(query)
+    query_embedding = embed_query(query)
+
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        return get_index("customer").search(query_embedding, top_k)
     
-    conn = get_vector_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    candidates = rerank_candidates(top_k)
+    settings = search_settings_sql(["customer_embeddings"], candidates=candidates)
+    with get_pool().connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        sql = f"""
+            SELECT 
+                ce.customer_id,
+                ce.content,
+                c.first_name,
+                c.last_name,
+                c.email,
+                1 - (ce.embedding <=> {QUERY_VECTOR}) as similarity
+            FROM {candidate_rows("customer_embeddings", "customer_id, content, embedding")} ce
+            JOIN customer c ON ce.customer_id = c.customer_id
+            ORDER BY ce.embedding <=> {QUERY_VECTOR}
+            LIMIT %(top_k)s
+        """
+        cur.execute(settings + sql, {"embedding": query_embedding, "top_k": top_k, "rerank_candidates": candidates})
     
-    sql = """
-        SELECT 
-            ce.customer_id,
+        results = cur.fetchall()
+    
+    return [dict(row) for row in results]
+
+# 테이블별 ANN 조회 (vector_search_multi에서 UNION ALL로 묶어 한 번에 실행)
+# details에는 단일 테이블 검색 API와 같은 컬럼을 담습니다.
+# binary 저장이면 테이블마다 %({table}_candidates)s개 비트 후보를 코사인 거리로 다시 정렬합니다.
+_MULTI_SEARCH_BRANCHES = {
+    "film": f"""
+        SELECT
+            'film' AS source_table,
+            fe.content,
+            1 - (fe.embedding <=> {QUERY_VECTOR}) AS similarity,
+            jsonb_build_object(
+                'film_id', f.film_id, 'title', f.title, 'description', f.description,
+                'release_year', f.release_year, 'rating', f.rating
+            ) AS details,
+            statement_timestamp() AS started_at,
+            clock_timestamp() AS finished_at
+        FROM {candidate_rows("film_embeddings", "film_id, content, embedding", limit_param="film_candidates")} fe
+        JOIN film f ON fe.film_id = f.film_id
+        ORDER BY fe.embedding <=> {QUERY_VECTOR}
+        LIMIT %(film_top_k)s
+    """,
+    "actor": f"""
+        SELECT
+            'actor' AS source_table,
+            ae.content,
+            1 - (ae.embedding <=> {QUERY_VECTOR}) AS similarity,
+            jsonb_build_object(
+                'actor_id', a.actor_id, 'first_name', a.first_name, 'last_name', a.last_name
+            ) AS details,
+            statement_timestamp() AS started_at,
+            clock_timestamp() AS finished_at
+        FROM {candidate_rows("actor_embeddings", "actor_id, content, embedding", limit_param="actor_candidates")} ae
+        JOIN actor a ON ae.actor_id = a.actor_id
+        ORDER BY ae.embedding <=> {QUERY_VECTOR}
+        LIMIT %(actor_top_k)s
+    """,
+    "customer": f"""
+        SELECT
+            'customer' AS source_table,
             ce.content,
-            c.first_name,
-            c.last_name,
-            c.email,
-            1 - (ce.embedding <=> %s::vector) as similarity
-        FROM customer_embeddings ce
+            1 - (ce.embedding <=> {QUERY_VECTOR}) AS similarity,
+            jsonb_build_object(
+                'customer_id', c.customer_id, 'first_name', c.first_name,
+                'last_name', c.last_name, 'email', c.email
+            ) AS details,
+            statement_timestamp() AS started_at,
+            clock_timestamp() AS finished_at
+        FROM {candidate_rows("customer_embeddings", "customer_id, content, embedding", limit_param="customer_candidates")} ce
         JOIN customer c ON ce.customer_id = c.customer_id
-        ORDER BY ce.embedding <=> %s::vector
-        LIMIT %s
+        ORDER BY ce.embedding <=> {QUERY_VECTOR}
+        LIMIT %(customer_top_k)s
+    """,
+    "category": f"""
+        SELECT
+            'category' AS source_table,
+            cae.content,
+            1 - (cae.embedding <=> {QUERY_VECTOR}) AS similarity,
+            jsonb_build_object('category_id', ca.category_id, 'name', ca.name) AS details,
+            statement_timestamp() AS started_at,
+            clock_timestamp() AS finished_at
+        FROM {candidate_rows("category_embeddings", "category_id, content, embedding", limit_param="category_candidates")} cae
+        JOIN category ca ON cae.category_id = ca.category_id
+        ORDER BY cae.embedding <=> {QUERY_VECTOR}
+        LIMIT %(category_top_k)s
+    """,
+}
+
+def vector_search_multi(query: str, top_k_by_table: dict):
     """
-    cur.execute(sql, (query_embedding, query_embedding, top_k))
+    여러 테이블 벡터 검색을 한 번에 수행
     
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
+    쿼리 임베딩은 한 번만 계산하고, 테이블별 ANN 조회를 UNION ALL 한 문장으로 묶어
+    데이터베이스 왕복 한 번에 실행합니다.
     
-    return [dict(row) for row in results]
+    Args:
+        query: 검색 쿼리
+        top_k_by_table: 테이블별 반환할 결과 수 (예: {"film": 5, "actor": 3})
+    
+    Returns:
+        테이블별 검색 결과와 소요 시간
+        (테이블별 elapsed_ms는 서버에서 UNION ALL 각 분기가 끝난 시각의 차이로 계산)
+        VECTOR_SEARCH_BACKEND=numpy이면 프로세스 내부 인덱스에서 테이블별로 검색하고 각 검색 시간을 잽니다.
+    """
+    unknown = set(top_k_by_table) - set(_MULTI_SEARCH_BRANCHES)
+    if unknown:
+        raise ValueError(f"Unsupported tables: {sorted(unknown)}. Use one of {sorted(_MULTI_SEARCH_BRANCHES)}")
+    tables = [table for table in _MULTI_SEARCH_BRANCHES if top_k_by_table.get(table, 0) > 0]
+    if not tables:
+        return {"results": {}, "embedding_ms": 0.0, "query_ms": 0.0}
+
+    start = time.perf_counter()
+    query_embedding = embed_query(query)
+    embedding_ms = (time.perf_counter() - start) * 1000
+
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        results = {}
+        query_start = time.perf_counter()
+        for table in tables:
+            start = time.perf_counter()
+            rows = get_index(table).search(query_embedding, top_k_by_table[table])
+            results[table] = {"results": rows, "count": len(rows),
+                              "elapsed_ms": (time.perf_counter() - start) * 1000}
+        return {"results": results, "embedding_ms": embedding_ms,
+                "query_ms": (time.perf_counter() - query_start) * 1000}
+
+    candidates = {table: rerank_candidates(top_k_by_table[table]) for table in tables}
+    sql = search_settings_sql([f"{table}_embeddings" for table in tables], candidates=max(candidates.values()))
+    sql += "\nUNION ALL\n".join(f"({_MULTI_SEARCH_BRANCHES[table]})" for table in tables)
+    params = {"embedding": query_embedding}
+    params.update({f"{table}_top_k": top_k_by_table[table] for table in tables})
+    params.update({f"{table}_candidates": candidates[table] for table in tables})
+
+    start = time.perf_counter()
+    with get_pool().connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    query_ms = (time.perf_counter() - start) * 1000
+
+    grouped = {table: {"results": [], "finished_at": None} for table in tables}
+    for row in rows:
+        group = grouped[row["source_table"]]
+        group["results"].append({**row["details"], "content": row["content"], "similarity": row["similarity"]})
+        if group["finished_at"] is None or row["finished_at"] > group["finished_at"]:
+            group["finished_at"] = row["finished_at"]
 
-def hybrid_search(query: str, top_k: int = 5):
+    results = {}
+    # statement_timestamp()는 문장 전체에서 같은 값이므로 아무 행에서나 읽음 (행이 없으면 소요 시간 0)
+    previous = rows[0]["started_at"] if rows else None
+    for table in tables:
+        group = grouped[table]
+        finished_at = group["finished_at"] or previous
+        results[table] = {
+            "results": group["results"],
+            "count": len(group["results"]),
+            "elapsed_ms": max((finished_at - previous).total_seconds() * 1000, 0.0) if previous else 0.0,
+        }
+        previous = max(previous, finished_at) if previous else None
+
+    return {"results": results, "embedding_ms": embedding_ms, "query_ms": query_ms}
+
+def _run_hybrid_query(top_k: int, phrases, tsquery, query_embedding=None, candidates: int = None):
+    """키워드(전문 검색 + 이름 트라이그램)와, 임베딩이 있으면 pgvector 검색을 한 SQL 문으로 실행해 RRF로 합칩니다."""
+    use_vector = query_embedding is not None
+    candidates = candidates or HYBRID_CANDIDATES
+    sql = hybrid_sql(use_vector=use_vector, use_fulltext=tsquery is not None, use_names=bool(phrases))
+    if use_vector:
+        sql = search_settings_sql(UNIFIED_PARTITIONS, candidates=rerank_candidates(candidates)) + sql
+    params = {
+        "embedding": query_embedding, "tsquery": tsquery, "phrases": list(phrases),
+        "candidates": candidates, "rerank_candidates": rerank_candidates(candidates), "rrf_k": HYBRID_RRF_K,
+        "min_similarity": HYBRID_NAME_MIN_SIMILARITY, "top_k": top_k,
+    }
+    with get_pool().connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, params)
+        return [dict(row) for row in cur.fetchall()]
+
+def lexical_hybrid_search(query: str, top_k: int = 5, query_embedding=None):
     """
-    하이브리드 검색: 벡터 검색 결과를 기반으로 SQL 쿼리 생성을 위한 컨텍스트 제공
+    키워드 + 벡터 하이브리드 검색
+
+    질문에 이름 후보가 있고 임베딩이 아직 없으면 키워드 검색만 먼저 실행하고,
+    이름이 확실히 일치하면 임베딩 API를 호출하지 않고 그 결과를 반환합니다.
+    그렇지 않으면 질문을 임베딩하여 벡터/전문/이름 검색을 한 번에 실행하고 RRF로 합칩니다.
+
+    Returns:
+        (결과 리스트, 질문 임베딩 또는 None, 검색 방식 "lexical" | "hybrid" | "vector")
+    """
+    phrases = extract_name_phrases(query)
+    tsquery = build_tsquery(query)
+
+    if query_embedding is None and phrases:
+        rows = _run_hybrid_query(top_k, phrases, tsquery)
+        if is_confident_lexical_match(rows):
+            return rows, None, "lexical"
+
+    if query_embedding is None:
+        query_embedding = embed_query(query)
+    if not (phrases or tsquery):
+        return vector_search_unified(query, top_k=top_k, query_embedding=query_embedding), query_embedding, "vector"
+
+    if VECTOR_SEARCH_BACKEND == "numpy":
+        # 벡터 후보는 프로세스 내부 인덱스에서, 키워드 후보는 SQL로 가져와 파이썬에서 RRF
+        vector_rows = get_index("unified").search(query_embedding, HYBRID_CANDIDATES)
+        lexical_rows = _run_hybrid_query(HYBRID_CANDIDATES, phrases, tsquery)
+        rows = reciprocal_rank_fusion({"vector": vector_rows, "lexical": lexical_rows}, top_k)
+    else:
+        rows = _run_hybrid_query(top_k, phrases, tsquery, query_embedding=query_embedding)
+    return rows, query_embedding, "hybrid"
+
+def _match_label(result: dict) -> str:
+    if result.get("similarity") is not None:
+        return f"Similarity: {result['similarity']:.3f}"
+    if result.get("name_similarity") is not None:
+        return f"Name match: {result['name_similarity']:.3f}"
+    return "Keyword match"
+
+def hybrid_search(query: str, top_k: int = 5, query_embedding=None):
+    """
+    하이브리드 검색: 벡터(+ 키워드) 검색 결과를 기반으로 SQL 쿼리 생성을 위한 컨텍스트 제공
+
+    HYBRID_LEXICAL이 켜져 있으면 키워드 검색과 벡터 검색을 RRF로 합치고,
+    이름이 확실히 일치하는 질문은 임베딩 없이 키워드 결과만 사용합니다 (이때 query_embedding은 None).
     
     Args:
         query: 사용자 질문
-        top_k: 벡터 검색 결과 수
+        top_k: 검색 결과 수
+        query_embedding: 이미 계산된 질문 임베딩 (없으면 필요할 때 생성)
     
     Returns:
-        벡터 검색 결과와 관련 컨텍스트
+        검색 결과, 관련 컨텍스트, 질문 임베딩 (답변 캐시 등에서 재사용), 검색 방식
     """
-    # 통합 벡터 검색 수행
-    vector_results = vector_search_unified(query, top_k=top_k)
+    if HYBRID_LEXICAL:
+        vector_results, query_embedding, retrieval = lexical_hybrid_search(query, top_k, query_embedding)
+    else:
+        if query_embedding is None:
+            query_embedding = embed_query(query)
+        vector_results = vector_search_unified(query, top_k=top_k, query_embedding=query_embedding)
+        retrieval = "vector"
     
     # 결과를 컨텍스트 문자열로 변환
     context = "\n\n=== Relevant Data from Vector Search ===\n"
     for i, result in enumerate(vector_results, 1):
-        context += f"\n{i}. [{result['source_table'].upper()}] (Similarity: {result['similarity']:.3f})\n"
+        context += f"\n{i}. [{result['source_table'].upper()}] ({_match_label(result)})\n"
         context += f"   {result['content'][:200]}...\n"
     
     return {
         "vector_results": vector_results,
-        "context": context
+        "context": context,
+        "query_embedding": query_embedding,
+        "retrieval": retrieval,
     }
@@ -0,0 +1,110 @@
+"""
+SQL 결과 행에서 차트 데이터를 직접 만드는 모듈
+
+LLM이 결과를 JSON으로 다시 받아쓰게 하면 숫자 하나마다 출력 토큰이 들어가 느리고,
+출력 길이 제한에 걸리거나 행을 잘못 옮기는 경우가 있습니다.
+여기서는 구조화된 결과({"columns", "rows"})와 의도 단계의 chart_type만으로
+라벨/값 컬럼을 골라 chart_data를 만듭니다.
+"""
+import os
+import re
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# chart_data에 담는 최대 데이터 포인트 수
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "200"))
+
+CHART_TYPES_WITHOUT_DATA = {"none", "", None}
+
+_ID_COLUMN = re.compile(r"(^|_)id$", re.IGNORECASE)
+_NAME_COLUMN = re.compile(r"name|title|category|rating|city|country|language|store", re.IGNORECASE)
+_TIME_PART_COLUMN = re.compile(r"^(year|quarter|month|week|day|date|hour)(_|$)|(_|^)(year|month|date|day)$", re.IGNORECASE)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _column_kinds(columns, rows):
+    """컬럼별로 숫자 컬럼 여부를 판단합니다 (NULL이 아닌 값이 모두 숫자이면 숫자 컬럼)."""
+    numeric = {}
+    for index, column in enumerate(columns):
+        values = [row[index] for row in rows if row[index] is not None]
+        numeric[column] = bool(values) and all(_is_number(value) for value in values)
+    return numeric
+
+
+def _select_columns(columns, rows):
+    """
+    라벨 컬럼과 값 컬럼을 고릅니다.
+
+    - ID 컬럼(id, *_id)은 같은 행에 다른 라벨 후보가 있으면 사용하지 않습니다 (이름 컬럼 우선).
+    - 연/월/일 같은 시간 구분 컬럼은 숫자라도 라벨로 사용합니다.
+    - 라벨은 이름 계열 컬럼 → 그 밖의 문자열 컬럼 순서로 고릅니다.
+    """
+    numeric = _column_kinds(columns, rows)
+    ids = [c for c in columns if _ID_COLUMN.search(c)]
+    time_parts = [c for c in columns if _TIME_PART_COLUMN.search(c) and c not in ids]
+    text = [c for c in columns if not numeric[c] and c not in ids and c not in time_parts]
+
+    if time_parts:
+        labels = time_parts
+    elif text:
+        named = [c for c in text if _NAME_COLUMN.search(c)]
+        # 이름이 여러 컬럼으로 나뉜 경우(first_name, last_name)는 합쳐서 하나의 라벨로 사용
+        labels = named if len(named) > 1 and all("name" in c.lower() for c in named) else (named or text)[:1]
+    else:
+        labels = [c for c in columns if not numeric[c]][:1] or ids[:1]
+
+    values = [c for c in columns if numeric[c] and c not in labels and c not in ids and c not in time_parts]
+    return labels, values
+
+
+def _label(values) -> str:
+    """라벨 컬럼 값들을 하나의 문자열로 합칩니다 (연/월처럼 정수만 있으면 2005-07 형식)."""
+    parts = [value for value in values if value is not None]
+    if len(parts) > 1 and all(_is_number(value) and isinstance(value, int) for value in parts):
+        return "-".join([str(parts[0])] + [f"{value:02d}" for value in parts[1:]])
+    return " ".join(str(value) for value in parts)
+
+
+def build_chart_data(result: dict, chart_type: str, max_points: int = None) -> list:
+    """
+    구조화된 SQL 결과와 chart_type으로 chart_data(객체 리스트)를 만듭니다.
+
+    bar/line/pie: {라벨: 문자열, 값 컬럼: 숫자, ...}
+    scatter: 숫자 컬럼 두 개 (+ 라벨이 있으면 함께)
+    table: ID 컬럼을 제외한 모든 컬럼
+    차트가 필요 없거나 그릴 수 있는 컬럼이 없으면 빈 리스트를 반환합니다.
+    """
+    max_points = CHART_MAX_POINTS if max_points is None else max_points
+    if chart_type in CHART_TYPES_WITHOUT_DATA or result.get("error") or not result.get("rows"):
+        return []
+
+    columns, rows = result["columns"], result["rows"][:max_points]
+    index = {column: i for i, column in enumerate(columns)}
+
+    if chart_type == "table":
+        ids = [c for c in columns if _ID_COLUMN.search(c)]
+        keep = [c for c in columns if c not in ids] or columns
+        return [{c: row[index[c]] for c in keep} for row in rows]
+
+    labels, values = _select_columns(columns, rows)
+    if chart_type == "scatter":
+        if len(values) < 2:
+            return []
+        values = values[:2]
+    elif chart_type == "pie":
+        values = values[:1]
+    if not values:
+        return []
+
+    label_key = "_".join(labels)
+    chart_data = []
+    for row in rows:
+        point = {label_key: _label([row[index[c]] for c in labels])} if labels else {}
+        point.update({c: row[index[c]] for c in values})
+        chart_data.append(point)
+    return chart_data
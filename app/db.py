@@ -0,0 +1,330 @@
+import asyncio
+import collections
+import contextvars
+import functools
+import io
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
+import numpy as np
+import psycopg2
+import psycopg2.extensions
+from dotenv import load_dotenv
+from pgvector.psycopg2 import register_vector
+
+load_dotenv()
+
+# ============================================
+# 블로킹 I/O 오프로딩
+# ============================================
+
+# psycopg2, 동기 임베딩 호출 등 블로킹 작업을 이벤트 루프 밖에서 실행하기 위한 제한된 스레드 풀
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BLOCKING_IO_WORKERS", "32")),
+    thread_name_prefix="blocking-io",
+)
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    블로킹 함수를 전용 스레드 풀에서 실행하고 결과를 기다립니다.
+
+    현재 컨텍스트(contextvars)를 그대로 복사해 실행하므로
+    요청 단위 상태도 워커 스레드에서 그대로 보입니다.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_blocking_executor, call)
+
+# ============================================
+# PostgreSQL 커넥션 풀
+# ============================================
+
+class PoolTimeout(Exception):
+    """풀에서 제한 시간 안에 커넥션을 얻지 못한 경우"""
+
+def _connect():
+    """pgvector 데이터베이스 연결 생성 (NumPy 배열을 vector 파라미터로 바로 전달할 수 있도록 등록)"""
+    conn = psycopg2.connect(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD")
+    )
+    register_vector(conn, globally=False)
+    conn.commit()
+    return conn
+
+class ConnectionPool:
+    """
+    크기가 제한된 스레드 안전 psycopg2 커넥션 풀
+
+    - 최대 `maxconn`개의 커넥션만 열며, 모두 사용 중이면 `timeout`초까지 대기합니다.
+    - `health_check_after`초 이상 유휴 상태였던 커넥션은 꺼낼 때 `SELECT 1`로 검사하고,
+      끊어진 커넥션은 폐기 후 새로 연결합니다.
+    - `stats()`로 사용 중/대기 중/생성된 커넥션 수 등 모니터링 지표를 제공합니다.
+    """
+
+    def __init__(self, maxconn: int = 10, timeout: float = 30.0, health_check_after: float = 30.0, connect=None):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._connect = connect or _connect
+        self._idle = collections.deque()  # (conn, last_used)
+        self._cond = threading.Condition()
+        self._size = 0
+        self._checked_out = 0
+        self._waiting = 0
+        self._created = 0
+        self._discarded = 0
+        self._closed = False
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """풀에서 커넥션을 꺼냅니다. 여유가 없으면 빈 자리가 생길 때까지 기다립니다."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        conn, last_used = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No connection available within {self.timeout}s (maxconn={self.maxconn})")
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                self._checked_out += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._checked_out -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+                return conn
+
+            if self._is_healthy(conn, last_used):
+                return conn
+
+            # 끊어진 커넥션은 버리고 다시 시도
+            with self._cond:
+                self._checked_out -= 1
+            self._discard(conn)
+
+    def putconn(self, conn, discard: bool = False):
+        """커넥션을 풀에 반환합니다. 진행 중인 트랜잭션은 롤백됩니다."""
+        if not discard and not conn.closed:
+            try:
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._cond:
+            self._checked_out -= 1
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        커넥션을 빌려 쓰는 컨텍스트 매니저
+
+        블록이 정상 종료되면 커밋하고, 예외가 발생하면 롤백합니다.
+        연결 자체가 끊어진 경우에는 커넥션을 풀에서 폐기합니다.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    @asynccontextmanager
+    async def aconnection(self):
+        """
+        비동기 코드용 커넥션 컨텍스트 매니저
+
+        커넥션 획득(대기 포함)과 커밋/반환을 스레드 풀에서 수행하므로 이벤트 루프를 막지 않습니다.
+        커넥션을 사용하는 쿼리 역시 `run_blocking`으로 실행해야 합니다.
+        """
+        conn = await run_blocking(self.getconn)
+        discard = False
+        try:
+            yield conn
+            await run_blocking(conn.commit)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        except Exception:
+            if not conn.closed:
+                await run_blocking(conn.rollback)
+            raise
+        finally:
+            await run_blocking(self.putconn, conn, discard)
+
+    def stats(self) -> dict:
+        """풀 모니터링 지표"""
+        with self._cond:
+            return {
+                "max_size": self.maxconn,
+                "size": self._size,
+                "idle": len(self._idle),
+                "checked_out": self._checked_out,
+                "waiting": self._waiting,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
+
+    def close(self):
+        """유휴 커넥션을 모두 닫고 더 이상 커넥션을 내주지 않습니다."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """프로세스 전역에서 공유하는 커넥션 풀을 반환합니다 (최초 호출 시 생성)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    maxconn=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                    health_check_after=float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30")),
+                )
+    return _pool
+
+# ============================================
+# 바이너리 COPY 벌크 쓰기
+# ============================================
+
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL_FIELD = struct.pack(">i", -1)
+
+def _encode_int4(value) -> bytes:
+    return struct.pack(">i", value)
+
+def _encode_text(value) -> bytes:
+    return value.encode("utf-8")
+
+def _encode_vector(value) -> bytes:
+    # pgvector 바이너리 입력 형식: int16 차원 수, int16 예약(0), float4 값들 (big-endian)
+    vector = np.asarray(value, dtype=">f4")
+    return struct.pack(">hh", vector.shape[0], 0) + vector.tobytes()
+
+def _encode_halfvec(value) -> bytes:
+    # halfvec 바이너리 입력 형식: vector와 같은 헤더, float2 값들 (big-endian)
+    vector = np.asarray(value, dtype=">f2")
+    return struct.pack(">hh", vector.shape[0], 0) + vector.tobytes()
+
+COPY_ENCODERS = {"int4": _encode_int4, "text": _encode_text, "vector": _encode_vector, "halfvec": _encode_halfvec}
+
+def encode_copy_binary(rows, column_types) -> bytes:
+    """
+    행들을 COPY ... (FORMAT binary) 입력 형식으로 인코딩합니다.
+
+    벡터는 텍스트 "[0.1,0.2,...]"로 만들지 않고 float32 버퍼를 그대로 보내므로
+    클라이언트의 문자열 포맷팅과 서버의 파싱 비용이 없습니다.
+    """
+    encoders = [COPY_ENCODERS[column_type] for column_type in column_types]
+    field_count = struct.pack(">h", len(encoders))
+    parts = [_COPY_HEADER]
+    for row in rows:
+        parts.append(field_count)
+        for encode, value in zip(encoders, row):
+            if value is None:
+                parts.append(_NULL_FIELD)
+                continue
+            data = encode(value)
+            parts.append(struct.pack(">i", len(data)))
+            parts.append(data)
+    parts.append(_COPY_TRAILER)
+    return b"".join(parts)
+
+def copy_upsert(cur, table: str, key_column: str, columns, column_types, rows):
+    """
+    바이너리 COPY로 임시 스테이징 테이블에 적재한 뒤 INSERT ... ON CONFLICT 한 번으로 대상 테이블에 병합합니다.
+
+    스테이징 테이블은 커넥션마다 한 번 만들어지고 (ON COMMIT DELETE ROWS) 커밋 시 비워집니다.
+    호출자가 커밋해야 합니다.
+    """
+    staging = f"{table}_staging"
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column != key_column)
+    cur.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+        f"ON COMMIT DELETE ROWS AS SELECT {column_list} FROM {table} WITH NO DATA"
+    )
+    cur.copy_expert(
+        f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT binary)",
+        io.BytesIO(encode_copy_binary(rows, column_types)),
+    )
+    cur.execute(
+        f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+        f"ON CONFLICT ({key_column}) DO UPDATE SET {updates}"
+    )
+    # 같은 트랜잭션에서 다시 호출될 수 있으므로 병합한 행은 바로 비운다
+    cur.execute(f"TRUNCATE {staging}")
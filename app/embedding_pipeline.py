@@ -0,0 +1,194 @@
+"""
+동시 임베딩 생성 파이프라인
+
+원본 행을 청크 단위로 읽어 배치를 만드는 생산자와, 여러 배치를 동시에 임베딩 API로 보내는 작업자,
+임베딩이 끝난 배치를 바로 저장하는 소비자로 구성됩니다.
+요청 수/토큰 수 토큰 버킷으로 호출 속도를 제한하고, 429 응답을 받으면 Retry-After(없으면 지수 백오프)만큼
+기다린 뒤 재시도하면서 버킷 속도를 절반으로 줄였다가 성공할 때마다 천천히 되돌립니다.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+from .results import estimate_tokens
+
+load_dotenv()
+
+# 동시에 임베딩 API로 보내는 배치 수
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+# 요청 하나에 담는 텍스트 수
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+# 분당 요청 수 / 토큰 수 한도 (계정의 rate limit에 맞게 설정)
+EMBEDDING_RPM = float(os.getenv("EMBEDDING_RPM", "3000"))
+EMBEDDING_TPM = float(os.getenv("EMBEDDING_TPM", "1000000"))
+# 429 응답에 대한 최대 재시도 횟수
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+
+
+class TokenBucket:
+    """
+    분당 한도로 설정하는 토큰 버킷 (AIMD 방식으로 속도 조절)
+
+    한 번에 버킷 용량보다 큰 양을 요청하면 용량만큼 채워졌을 때 통과시키고 잔량을 음수로 남겨,
+    큰 배치도 평균 속도 한도를 지키면서 처리할 수 있게 합니다.
+    """
+
+    def __init__(self, per_minute: float):
+        self.max_rate = per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(self.max_rate, 1.0)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0):
+        needed = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._level >= needed:
+                    self._level -= amount
+                    return
+                wait_seconds = (needed - self._level) / self.rate
+            time.sleep(wait_seconds)
+
+    def penalize(self):
+        """429를 받으면 속도를 절반으로 (최소 한도의 5%)"""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate * 0.5, self.max_rate * 0.05)
+
+    def reward(self):
+        """성공할 때마다 한도의 5%씩 속도를 되돌림"""
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimitedEmbedder:
+    """요청/토큰 버킷과 429 재시도를 적용해 embed_documents를 호출합니다 (여러 스레드에서 공유)."""
+
+    def __init__(self, embeddings_model, rpm: float = None, tpm: float = None, max_retries: int = None):
+        self.embeddings_model = embeddings_model
+        self.requests = TokenBucket(EMBEDDING_RPM if rpm is None else rpm)
+        self.tokens = TokenBucket(EMBEDDING_TPM if tpm is None else tpm)
+        self.max_retries = EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self.rate_limited = 0
+
+    def embed(self, texts, token_count: int):
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire(1)
+            self.tokens.acquire(token_count)
+            try:
+                embeddings = self.embeddings_model.embed_documents(texts)
+            except Exception as e:
+                if not _is_rate_limit(e) or attempt == self.max_retries:
+                    raise
+                self.rate_limited += 1
+                self.requests.penalize()
+                self.tokens.penalize()
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                time.sleep(delay)
+                continue
+            self.requests.reward()
+            self.tokens.reward()
+            return embeddings
+
+
+class PipelineStats:
+    """파이프라인 처리량 집계"""
+
+    def __init__(self):
+        self.rows = 0
+        self.tokens = 0
+        self.batches = 0
+        self.failed_rows = 0
+        self.rate_limited = 0
+        self._started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self._started
+        return self
+
+    def report(self) -> str:
+        elapsed = self.elapsed or 1e-9
+        line = (f"{self.rows} rows in {self.batches} batches, {self.elapsed:.1f}s "
+                f"({self.rows / elapsed:.1f} rows/s, {self.tokens / elapsed:.0f} tokens/s, "
+                f"{self.rate_limited} rate-limited retries)")
+        if self.failed_rows:
+            line += f", {self.failed_rows} rows failed (retried on next run)"
+        return line
+
+
+def run_embedding_pipeline(batches, embedder: RateLimitedEmbedder, write_batch,
+                           concurrency: int = None, desc: str = "Embedding") -> PipelineStats:
+    """
+    배치들을 최대 concurrency개씩 동시에 임베딩하고, 끝나는 순서대로 write_batch(batch, embeddings)를 호출합니다.
+
+    Args:
+        batches: (ID, content, ...) 튜플 리스트들의 이터러블 (생산자, 필요한 만큼만 읽음)
+        write_batch: 호출한 스레드에서 실행되는 저장 함수 (DB 커넥션을 하나만 사용해도 됨)
+
+    실패한 배치는 저장하지 않고 failed_rows로 집계하며 나머지 배치는 계속 처리합니다.
+    """
+    concurrency = EMBEDDING_CONCURRENCY if concurrency is None else concurrency
+    stats = PipelineStats()
+    rate_limited_before = embedder.rate_limited
+    in_flight = {}
+    progress = tqdm(desc=desc, unit="rows")
+
+    def drain():
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            batch, token_count = in_flight.pop(future)
+            try:
+                write_batch(batch, future.result())
+            except Exception as e:
+                print(f"Error processing batch ({len(batch)} rows): {e}")
+                stats.failed_rows += len(batch)
+                continue
+            stats.rows += len(batch)
+            stats.tokens += token_count
+            stats.batches += 1
+            progress.update(len(batch))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for batch in batches:
+            texts = [item[1] for item in batch]
+            token_count = sum(estimate_tokens(text) for text in texts)
+            in_flight[executor.submit(embedder.embed, texts, token_count)] = (batch, token_count)
+            # 동시에 진행 중인 배치 수를 제한하여 읽기가 임베딩보다 앞서 나가지 않게 한다
+            if len(in_flight) >= concurrency:
+                drain()
+        while in_flight:
+            drain()
+
+    progress.close()
+    stats.rate_limited = embedder.rate_limited - rate_limited_before
+    return stats.finish()
@@ -0,0 +1,94 @@
+"""
+임베딩 차원과 저장 형식
+
+text-embedding-3-small은 차원을 줄인 임베딩(256, 512, ...)을 반환할 수 있고, 줄인 임베딩은
+전체 임베딩의 앞부분을 잘라 L2 정규화한 것과 같습니다. 저장 형식은 세 가지입니다.
+- float32: embedding vector(차원), 한 번의 코사인 검색
+- float16: embedding halfvec(차원), 행과 인덱스 크기가 절반. 코사인 검색 한 번 (float16 오차는 순위에 거의 영향 없음)
+- binary: embedding halfvec(차원) + 생성 컬럼 embedding_bits bit(차원) (차원/8 바이트)
+  1단계에서 embedding_bits의 해밍 거리로 top_k × EMBEDDING_RERANK_FACTOR개 후보를 고르고
+  2단계에서 후보만 halfvec embedding의 코사인 거리로 다시 정렬합니다.
+  float32 컬럼을 두지 않으므로 행 크기는 float16 + 차원/8 바이트이고, 1536차원 halfvec(3 KB)는
+  TOAST로 행 밖에 저장되어 1단계는 후보가 아닌 행의 벡터를 읽지 않습니다.
+
+검색 SQL은 candidate_rows()를 FROM 절에 쓰고 QUERY_VECTOR와의 거리로 정렬하면
+저장 형식과 관계없이 같은 모양이 됩니다. 파라미터는 embedding(질문 임베딩)과 rerank_candidates입니다.
+
+저장 형식이나 차원을 바꾸면 python -m app.embeddings가 기존 컬럼을 변환합니다 (embeddings.ensure_sync_schema).
+"""
+import os
+
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+FULL_DIMENSIONS = 1536
+STORAGE_MODES = ("float32", "float16", "binary")
+
+# 임베딩 차원 (256, 512, 1536 등; 바꾸면 저장된 임베딩을 앞부분만 남겨 변환)
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", str(FULL_DIMENSIONS)))
+# 저장 형식: float32 | float16 (halfvec) | binary (비트 1단계 검색 + halfvec 재정렬)
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32").lower()
+# binary 저장 시 1단계에서 가져오는 후보 수 = top_k × 이 값
+EMBEDDING_RERANK_FACTOR = int(os.getenv("EMBEDDING_RERANK_FACTOR", "10"))
+
+if EMBEDDING_STORAGE not in STORAGE_MODES:
+    raise ValueError(f"EMBEDDING_STORAGE must be one of {STORAGE_MODES}, got {EMBEDDING_STORAGE!r}")
+if not 1 <= EMBEDDING_DIMENSIONS <= FULL_DIMENSIONS:
+    raise ValueError(f"EMBEDDING_DIMENSIONS must be between 1 and {FULL_DIMENSIONS}, got {EMBEDDING_DIMENSIONS}")
+
+# 캐시 키에 쓰는 모델 이름 (차원이 다르면 다른 임베딩)
+EMBEDDING_MODEL_ID = (EMBEDDING_MODEL if EMBEDDING_DIMENSIONS == FULL_DIMENSIONS
+                      else f"{EMBEDDING_MODEL}@{EMBEDDING_DIMENSIONS}")
+
+# binary도 재정렬용 embedding은 halfvec으로 저장 (float32보다 작게)
+VECTOR_TYPE = "vector" if EMBEDDING_STORAGE == "float32" else "halfvec"
+# 임베딩 테이블의 embedding 컬럼 타입
+COLUMN_TYPE = f"{VECTOR_TYPE}({EMBEDDING_DIMENSIONS})"
+# 바이너리 COPY 인코딩 (db.COPY_ENCODERS)
+COPY_TYPE = VECTOR_TYPE
+TWO_STAGE = EMBEDDING_STORAGE == "binary"
+# ANN 인덱스를 만드는 컬럼과 연산자 클래스 (index_manager)
+INDEX_OPCLASS = {"float32": "vector_cosine_ops", "float16": "halfvec_cosine_ops",
+                 "binary": "bit_hamming_ops"}[EMBEDDING_STORAGE]
+INDEX_COLUMN = "embedding_bits" if TWO_STAGE else "embedding"
+# embedding 컬럼과 비교할 질문 임베딩
+QUERY_VECTOR = f"%(embedding)s::{VECTOR_TYPE}"
+
+
+def make_embeddings_model(**kwargs) -> OpenAIEmbeddings:
+    """설정한 차원의 임베딩을 반환하는 OpenAIEmbeddings (1536이면 dimensions를 보내지 않음)"""
+    dimensions = EMBEDDING_DIMENSIONS if EMBEDDING_DIMENSIONS != FULL_DIMENSIONS else None
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, dimensions=dimensions, **kwargs)
+
+
+def rerank_candidates(top_k: int) -> int:
+    """인덱스(1단계)에서 가져올 행 수 (한 단계 검색이면 top_k)"""
+    return top_k * EMBEDDING_RERANK_FACTOR if TWO_STAGE else top_k
+
+
+def candidate_rows(table: str, columns: str = "*", where: str = None, limit_param: str = "rerank_candidates") -> str:
+    """
+    검색 쿼리의 FROM 절에 넣을 행 집합
+
+    한 단계 검색이면 테이블 이름 그대로이고, binary이면 embedding_bits 해밍 거리 상위
+    %(limit_param)s개 후보 서브쿼리입니다. 호출하는 쿼리가 후보를 embedding의 코사인 거리로 다시 정렬합니다.
+    where는 후보를 고르기 전에 적용할 조건입니다 (한 단계 검색이면 호출하는 쿼리의 WHERE에 두어야 함).
+    """
+    if not TWO_STAGE:
+        return table
+    condition = f" WHERE {where}" if where else ""
+    return (f"(SELECT {columns} FROM {table}{condition} "
+            f"ORDER BY embedding_bits <~> binary_quantize(%(embedding)s::vector)::bit({EMBEDDING_DIMENSIONS}) "
+            f"LIMIT %({limit_param})s)")
+
+
+def storage_summary() -> dict:
+    return {
+        "model": EMBEDDING_MODEL_ID,
+        "dimensions": EMBEDDING_DIMENSIONS,
+        "storage": EMBEDDING_STORAGE,
+        "rerank_factor": EMBEDDING_RERANK_FACTOR if TWO_STAGE else None,
+    }
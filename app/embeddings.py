@@ -1,32 +1,236 @@
-import os
-import psycopg2
 from psycopg2.extras import execute_values
-from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
-from tqdm import tqdm
-import time
+import argparse
+import hashlib
+import re
+import numpy as np
+
+from .db import copy_upsert, get_pool
+from .embedding_pipeline import (
+    EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY, RateLimitedEmbedder, run_embedding_pipeline
+)
+from .embedding_storage import COLUMN_TYPE, COPY_TYPE, EMBEDDING_DIMENSIONS, TWO_STAGE, make_embeddings_model
+from .index_manager import UNIFIED_PARTITIONS, index_name, manage_vector_indexes
+from .vector_index import VECTOR_SEARCH_BACKEND, refresh_vector_indexes
 
 load_dotenv()
 
-# OpenAI Embeddings 초기화
-embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small")
-
-def get_db_connection():
-    """데이터베이스 연결 생성"""
-    return psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        database=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD")
-    )
-
-def generate_film_embeddings():
-    """영화 데이터 임베딩 생성 및 저장"""
+# OpenAI Embeddings 초기화 (EMBEDDING_DIMENSIONS 차원)
+embeddings_model = make_embeddings_model()
+# 429 재시도는 파이프라인이 직접 처리 (Retry-After + 버킷 속도 조절)
+embedder = RateLimitedEmbedder(make_embeddings_model(max_retries=0))
+
+# (unified_embeddings.source_table, 임베딩 테이블, ID 컬럼)
+EMBEDDING_SOURCES = [
+    ("film", "film_embeddings", "film_id"),
+    ("actor", "actor_embeddings", "actor_id"),
+    ("customer", "customer_embeddings", "customer_id"),
+    ("category", "category_embeddings", "category_id"),
+]
+
+def content_hash(content: str) -> str:
+    """임베딩할 텍스트의 해시 (PostgreSQL md5(content)와 같은 값)"""
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+def unified_partition(source_table: str) -> str:
+    """unified_embeddings에서 source_table 값의 행이 저장되는 파티션"""
+    return f"unified_embeddings_{source_table}"
+
+def ensure_sync_schema():
+    """
+    기존 데이터베이스에 증분 동기화용 컬럼, unified_embeddings 파티션, 키워드 색인을 추가하고 (init-db.sh와 같은 정의)
+    embedding 컬럼을 EMBEDDING_DIMENSIONS / EMBEDDING_STORAGE 설정에 맞춥니다.
+    """
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        for _, table, _ in EMBEDDING_SOURCES:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_hash TEXT")
+            # 이전 버전에서 만든 행은 저장된 content로 해시를 채워 다시 임베딩하지 않는다
+            # (차원 변환으로 임베딩을 비운 행은 제외: 해시가 채워지면 다시 임베딩되지 않음)
+            cur.execute(f"UPDATE {table} SET content_hash = md5(content) "
+                        f"WHERE content_hash IS NULL AND embedding IS NOT NULL")
+        _ensure_unified_partitions(cur)
+        _ensure_lexical_indexes(cur)
+        _ensure_embedding_storage(cur)
+
+def _ensure_unified_partitions(cur):
+    """
+    unified_embeddings를 source_table별 LIST 파티션 테이블로 만듭니다.
+
+    이전 버전의 일반 테이블이면 새 파티션 테이블로 행을 옮기고 기존 테이블(과 전체 ivfflat 인덱스)을 삭제합니다.
+    임베딩을 다시 계산하지 않으며 같은 트랜잭션에서 실행됩니다.
+    """
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('unified_embeddings')")
+    row = cur.fetchone()
+    migrate = row is not None and row[0] != "p"
+    if migrate:
+        print("Converting unified_embeddings to a partitioned table...")
+        cur.execute("ALTER TABLE unified_embeddings RENAME TO unified_embeddings_unpartitioned")
+        # 제약/인덱스 이름은 스키마 전체에서 유일해야 하므로 새 테이블이 쓸 이름을 비워 둔다
+        cur.execute("ALTER INDEX IF EXISTS unified_embeddings_source_key RENAME TO unified_embeddings_unpartitioned_source_key")
+        cur.execute("ALTER INDEX IF EXISTS unified_embeddings_idx RENAME TO unified_embeddings_unpartitioned_idx")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS unified_embeddings (
+            source_table VARCHAR(50) NOT NULL,
+            source_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            embedding vector(1536),
+            metadata JSONB,
+            CONSTRAINT unified_embeddings_source_key PRIMARY KEY (source_table, source_id)
+        ) PARTITION BY LIST (source_table)
+    """)
+    for source_table, _, _ in EMBEDDING_SOURCES:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {unified_partition(source_table)} "
+                    f"PARTITION OF unified_embeddings FOR VALUES IN (%s)", (source_table,))
+    cur.execute("CREATE TABLE IF NOT EXISTS unified_embeddings_other PARTITION OF unified_embeddings DEFAULT")
+    if migrate:
+        cur.execute("""
+            INSERT INTO unified_embeddings (source_table, source_id, content, embedding, metadata)
+            SELECT source_table, source_id, content, embedding, metadata FROM unified_embeddings_unpartitioned
+        """)
+        cur.execute("DROP TABLE unified_embeddings_unpartitioned")
+
+def _ensure_lexical_indexes(cur):
+    """하이브리드 검색용 tsvector 생성 컬럼과 GIN 인덱스(전문 검색, pg_trgm 트라이그램)"""
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cur.execute("""
+        ALTER TABLE unified_embeddings ADD COLUMN IF NOT EXISTS content_tsv tsvector
+            GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS unified_embeddings_content_tsv_idx "
+                "ON unified_embeddings USING gin (content_tsv)")
+    cur.execute("CREATE INDEX IF NOT EXISTS unified_embeddings_content_trgm_idx "
+                "ON unified_embeddings USING gin (content gin_trgm_ops)")
+
+def _embedding_column_type(cur, table: str):
+    """embedding 컬럼의 현재 타입 (예: 'vector(1536)', 테이블이 없으면 None)"""
+    cur.execute("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attname = 'embedding' AND NOT attisdropped
+    """, (table,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def _convert_embedding_column(cur, table: str, target: str, indexes=()) -> bool:
+    """
+    embedding 컬럼을 target 타입으로 바꿉니다 (바꿨으면 True).
+
+    차원이 줄면 저장된 임베딩의 앞부분을 잘라 L2 정규화하므로 (text-embedding-3의 차원 축소와 같은 결과)
+    다시 임베딩하지 않습니다. 차원이 늘면 값을 비울 수밖에 없어 NULL로 바꿉니다.
+    컬럼 타입이 바뀌면 연산자 클래스가 맞지 않으므로 벡터 인덱스는 지우고 인덱스 관리자가 다시 만듭니다.
+    """
+    current = _embedding_column_type(cur, table)
+    if current is None or current == target:
+        return False
+    print(f"Converting {table}.embedding from {current} to {target}...")
+    for index in indexes:
+        cur.execute(f"DROP INDEX IF EXISTS {index}")
+    cur.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS embedding_bits")
+    match = re.search(r"\((\d+)\)", current)
+    current_dims = int(match.group(1)) if match else None
+    if current_dims == EMBEDDING_DIMENSIONS:
+        using = f"embedding::{target}"
+    elif current_dims is not None and current_dims > EMBEDDING_DIMENSIONS:
+        using = f"l2_normalize(subvector(embedding::vector, 1, {EMBEDDING_DIMENSIONS}))::{target}"
+    else:
+        using = "NULL"
+    cur.execute(f"ALTER TABLE {table} ALTER COLUMN embedding TYPE {target} USING {using}")
+    return using == "NULL"
+
+def _ensure_embedding_storage(cur):
+    """
+    임베딩 테이블의 embedding 컬럼을 COLUMN_TYPE으로, binary 저장이면 embedding_bits 생성 컬럼을 추가합니다.
+
+    질문 임베딩과 비교만 하는 schema_embeddings, answer_cache는 차원만 맞춘 float32로 둡니다.
+    pgvector 0.7 이상이 필요합니다 (halfvec, subvector, l2_normalize, binary_quantize).
+    """
+    targets = [(table, [index_name(table), f"{index_name(table)}_new"]) for _, table, _ in EMBEDDING_SOURCES]
+    targets.append(("unified_embeddings", [index_name(partition) for partition in UNIFIED_PARTITIONS]))
+    for table, indexes in targets:
+        if _convert_embedding_column(cur, table, COLUMN_TYPE, indexes) and table != "unified_embeddings":
+            # 차원이 늘어 값을 비운 행은 다음 동기화에서 다시 임베딩
+            cur.execute(f"UPDATE {table} SET content_hash = NULL")
+        if TWO_STAGE:
+            cur.execute(f"""
+                ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_bits bit({EMBEDDING_DIMENSIONS})
+                    GENERATED ALWAYS AS (binary_quantize(embedding)::bit({EMBEDDING_DIMENSIONS})) STORED
+            """)
+        else:
+            cur.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS embedding_bits")
+    for table in ("schema_embeddings", "answer_cache"):
+        _convert_embedding_column(cur, table, f"vector({EMBEDDING_DIMENSIONS})")
+
+def _sync_embeddings(table: str, id_column: str, query: str, build_content, desc: str, full: bool = False):
+    """
+    원본 행을 임베딩 테이블과 비교하여 content가 바뀐 행만 다시 임베딩하고 upsert합니다.
+
+    원본 쿼리에 저장된 content_hash를 LEFT JOIN하여 서버 측(named) 커서로 청크 단위로 읽고,
+    바뀐 행만 배치로 묶어 동시 파이프라인으로 넘깁니다. 배치는 임베딩되는 대로 바로 저장/커밋되므로
+    클라이언트 메모리는 테이블 크기와 무관하게 진행 중인 배치 몇 개 분량으로 유지됩니다.
+    원본에서 사라진 행은 SQL로 한 번에 삭제합니다.
+    실패한 배치는 해시가 저장되지 않으므로 다음 실행에서 다시 처리됩니다.
+
+    Args:
+        query: 첫 컬럼 이름이 id_column인 원본 조회 SQL
+        build_content: 원본 행 → (ID, content)
+
+    Returns:
+        (PipelineStats, 삭제한 행 수)
+    """
+    def changed_batches():
+        with get_pool().connection() as conn, conn.cursor(name=f"{table}_sync") as source:
+            source.itersize = EMBEDDING_BATCH_SIZE * EMBEDDING_CONCURRENCY
+            source.execute(f"""
+                SELECT src.*, stored.content_hash, stored.embedding IS NULL AS missing
+                FROM ({query}) src
+                LEFT JOIN {table} stored ON stored.{id_column} = src.{id_column}
+            """)
+            batch, read, unchanged = [], 0, 0
+            for row in source:
+                read += 1
+                source_id, content = build_content(row[:-2])
+                digest = content_hash(content)
+                stored_hash, missing = row[-2:]
+                if not full and stored_hash == digest and not missing:
+                    unchanged += 1
+                    continue
+                batch.append((source_id, content, digest))
+                if len(batch) >= EMBEDDING_BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            print(f"Read {read} rows ({unchanged} unchanged)")
+
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        def write_batch(batch, batch_embeddings):
+            # 벡터를 SQL 텍스트로 만들지 않고 float32 바이너리 COPY → 스테이징 → upsert
+            vectors = np.asarray(batch_embeddings, dtype=np.float32)
+            try:
+                copy_upsert(
+                    cur, table, id_column,
+                    (id_column, "content", "content_hash", "embedding"),
+                    ("int4", "text", "text", COPY_TYPE),
+                    [(source_id, content, digest, vector)
+                     for (source_id, content, digest), vector in zip(batch, vectors)],
+                )
+                conn.commit()
+            except Exception:
+                # 모든 배치가 같은 커넥션을 쓰므로 중단된 트랜잭션을 되돌려야 다음 배치를 쓸 수 있음
+                conn.rollback()
+                raise
+
+        stats = run_embedding_pipeline(changed_batches(), embedder, write_batch, desc=desc)
+
+        cur.execute(f"""
+            DELETE FROM {table} stored
+            WHERE NOT EXISTS (SELECT 1 FROM ({query}) src WHERE src.{id_column} = stored.{id_column})
+        """)
+        removed = cur.rowcount
+    return stats, removed
+
+def generate_film_embeddings(full: bool = False):
+    """영화 데이터 임베딩 생성 및 저장 (내용이 바뀐 영화만)"""
     print("\n=== Generating Film Embeddings ===")
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     # 영화 데이터 조회 (제목 + 설명 + 카테고리)
     query = """
         SELECT 
@@ -41,120 +245,44 @@ def generate_film_embeddings():
         LEFT JOIN category c ON fc.category_id = c.category_id
         ORDER BY f.film_id
     """
-    cur.execute(query)
-    films = cur.fetchall()
-    
-    print(f"Found {len(films)} films to process")
-    
-    embeddings_data = []
-    batch_size = 100
-    
-    for i in tqdm(range(0, len(films), batch_size), desc="Processing films"):
-        batch = films[i:i+batch_size]
-        texts = []
-        film_ids = []
-        
-        for film in batch:
-            film_id, title, description, category, year, rating = film
-            # 텍스트 구성: 제목, 설명, 카테고리, 연도, 등급
-            content = f"Title: {title}\nDescription: {description}\nCategory: {category or 'Unknown'}\nYear: {year}\nRating: {rating}"
-            texts.append(content)
-            film_ids.append((film_id, content))
-        
-        # 배치 임베딩 생성
-        try:
-            batch_embeddings = embeddings_model.embed_documents(texts)
-            
-            for (film_id, content), embedding in zip(film_ids, batch_embeddings):
-                embeddings_data.append((film_id, content, embedding))
-            
-            time.sleep(0.1)  # API rate limit 방지
-        except Exception as e:
-            print(f"Error processing batch: {e}")
-            continue
-    
-    # 데이터베이스에 저장
-    print("Saving film embeddings to database...")
-    execute_values(
-        cur,
-        "INSERT INTO film_embeddings (film_id, content, embedding) VALUES %s ON CONFLICT (film_id) DO UPDATE SET content = EXCLUDED.content, embedding = EXCLUDED.embedding",
-        embeddings_data
-    )
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    print(f"✓ Saved {len(embeddings_data)} film embeddings")
 
-def generate_actor_embeddings():
-    """배우 데이터 임베딩 생성 및 저장"""
+    def build_content(row):
+        film_id, title, description, category, year, rating = row
+        # 텍스트 구성: 제목, 설명, 카테고리, 연도, 등급
+        content = f"Title: {title}\nDescription: {description}\nCategory: {category or 'Unknown'}\nYear: {year}\nRating: {rating}"
+        return film_id, content
+
+    stats, removed = _sync_embeddings("film_embeddings", "film_id", query, build_content, "Processing films", full=full)
+    print(f"✓ Film embeddings: {stats.report()}, {removed} removed")
+
+def generate_actor_embeddings(full: bool = False):
+    """배우 데이터 임베딩 생성 및 저장 (내용이 바뀐 배우만)"""
     print("\n=== Generating Actor Embeddings ===")
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     # 배우 데이터 조회 (이름 + 출연 영화 목록)
     query = """
         SELECT 
             a.actor_id,
             a.first_name || ' ' || a.last_name as actor_name,
-            STRING_AGG(f.title, ', ') as films
+            STRING_AGG(f.title, ', ' ORDER BY f.title) as films
         FROM actor a
         LEFT JOIN film_actor fa ON a.actor_id = fa.actor_id
         LEFT JOIN film f ON fa.film_id = f.film_id
         GROUP BY a.actor_id, actor_name
         ORDER BY a.actor_id
     """
-    cur.execute(query)
-    actors = cur.fetchall()
-    
-    print(f"Found {len(actors)} actors to process")
-    
-    embeddings_data = []
-    batch_size = 100
-    
-    for i in tqdm(range(0, len(actors), batch_size), desc="Processing actors"):
-        batch = actors[i:i+batch_size]
-        texts = []
-        actor_ids = []
-        
-        for actor in batch:
-            actor_id, actor_name, films = actor
-            # 텍스트 구성: 배우 이름 + 출연 영화
-            content = f"Actor: {actor_name}\nFilms: {films or 'No films'}"
-            texts.append(content)
-            actor_ids.append((actor_id, content))
-        
-        # 배치 임베딩 생성
-        try:
-            batch_embeddings = embeddings_model.embed_documents(texts)
-            
-            for (actor_id, content), embedding in zip(actor_ids, batch_embeddings):
-                embeddings_data.append((actor_id, content, embedding))
-            
-            time.sleep(0.1)
-        except Exception as e:
-            print(f"Error processing batch: {e}")
-            continue
-    
-    # 데이터베이스에 저장
-    print("Saving actor embeddings to database...")
-    execute_values(
-        cur,
-        "INSERT INTO actor_embeddings (actor_id, content, embedding) VALUES %s ON CONFLICT (actor_id) DO UPDATE SET content = EXCLUDED.content, embedding = EXCLUDED.embedding",
-        embeddings_data
-    )
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    print(f"✓ Saved {len(embeddings_data)} actor embeddings")
 
-def generate_customer_embeddings():
-    """고객 데이터 임베딩 생성 및 저장"""
+    def build_content(row):
+        actor_id, actor_name, films = row
+        # 텍스트 구성: 배우 이름 + 출연 영화
+        content = f"Actor: {actor_name}\nFilms: {films or 'No films'}"
+        return actor_id, content
+
+    stats, removed = _sync_embeddings("actor_embeddings", "actor_id", query, build_content, "Processing actors", full=full)
+    print(f"✓ Actor embeddings: {stats.report()}, {removed} removed")
+
+def generate_customer_embeddings(full: bool = False):
+    """고객 데이터 임베딩 생성 및 저장 (내용이 바뀐 고객만)"""
     print("\n=== Generating Customer Embeddings ===")
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     # 고객 데이터 조회 (이름 + 이메일 + 주소 + 대여 이력)
     query = """
         SELECT 
@@ -173,57 +301,19 @@ def generate_customer_embeddings():
         GROUP BY c.customer_id, customer_name, c.email, a.address, ci.city, co.country
         ORDER BY c.customer_id
     """
-    cur.execute(query)
-    customers = cur.fetchall()
-    
-    print(f"Found {len(customers)} customers to process")
-    
-    embeddings_data = []
-    batch_size = 100
-    
-    for i in tqdm(range(0, len(customers), batch_size), desc="Processing customers"):
-        batch = customers[i:i+batch_size]
-        texts = []
-        customer_ids = []
-        
-        for customer in batch:
-            customer_id, name, email, address, city, country, rental_count = customer
-            # 텍스트 구성: 고객 정보 + 대여 횟수
-            content = f"Customer: {name}\nEmail: {email}\nLocation: {address}, {city}, {country}\nTotal Rentals: {rental_count}"
-            texts.append(content)
-            customer_ids.append((customer_id, content))
-        
-        # 배치 임베딩 생성
-        try:
-            batch_embeddings = embeddings_model.embed_documents(texts)
-            
-            for (customer_id, content), embedding in zip(customer_ids, batch_embeddings):
-                embeddings_data.append((customer_id, content, embedding))
-            
-            time.sleep(0.1)
-        except Exception as e:
-            print(f"Error processing batch: {e}")
-            continue
-    
-    # 데이터베이스에 저장
-    print("Saving customer embeddings to database...")
-    execute_values(
-        cur,
-        "INSERT INTO customer_embeddings (customer_id, content, embedding) VALUES %s ON CONFLICT (customer_id) DO UPDATE SET content = EXCLUDED.content, embedding = EXCLUDED.embedding",
-        embeddings_data
-    )
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    print(f"✓ Saved {len(embeddings_data)} customer embeddings")
 
-def generate_category_embeddings():
-    """카테고리 데이터 임베딩 생성 및 저장"""
+    def build_content(row):
+        customer_id, name, email, address, city, country, rental_count = row
+        # 텍스트 구성: 고객 정보 + 대여 횟수
+        content = f"Customer: {name}\nEmail: {email}\nLocation: {address}, {city}, {country}\nTotal Rentals: {rental_count}"
+        return customer_id, content
+
+    stats, removed = _sync_embeddings("customer_embeddings", "customer_id", query, build_content, "Processing customers", full=full)
+    print(f"✓ Customer embeddings: {stats.report()}, {removed} removed")
+
+def generate_category_embeddings(full: bool = False):
+    """카테고리 데이터 임베딩 생성 및 저장 (내용이 바뀐 카테고리만)"""
     print("\n=== Generating Category Embeddings ===")
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     # 카테고리 데이터 조회 (카테고리명 + 영화 목록)
     query = """
         SELECT 
@@ -237,133 +327,126 @@ def generate_category_embeddings():
         GROUP BY c.category_id, c.name
         ORDER BY c.category_id
     """
-    cur.execute(query)
-    categories = cur.fetchall()
-    
-    print(f"Found {len(categories)} categories to process")
-    
-    embeddings_data = []
-    texts = []
-    category_ids = []
-    
-    for category in categories:
-        category_id, name, film_count, films = category
+
+    def build_content(row):
+        category_id, name, film_count, films = row
         # 텍스트 구성: 카테고리명 + 영화 수 + 영화 목록 (일부)
         films_preview = films[:500] if films else "No films"  # 처음 500자만
         content = f"Category: {name}\nFilm Count: {film_count}\nFilms: {films_preview}"
+        return category_id, content
+
+    stats, removed = _sync_embeddings("category_embeddings", "category_id", query, build_content, "Processing categories", full=full)
+    print(f"✓ Category embeddings: {stats.report()}, {removed} removed")
+
+def generate_unified_embeddings():
+    """
+    통합 임베딩 테이블 동기화 (모든 데이터를 하나의 테이블에)
+
+    전체를 지우고 다시 복사하지 않고, 각 임베딩 테이블과 content/embedding이 다른 행만 upsert하고
+    원본에서 사라진 행만 삭제하므로 쓰기와 인덱스 갱신이 변경된 행 수에 비례합니다.
+    """
+    print("\n=== Generating Unified Embeddings ===")
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        for source_table, table, id_column in EMBEDDING_SOURCES:
+            print(f"Syncing {source_table} embeddings...")
+            cur.execute(f"""
+                INSERT INTO unified_embeddings (source_table, source_id, content, embedding, metadata)
+                SELECT 
+                    %(source_table)s as source_table,
+                    {id_column} as source_id,
+                    content,
+                    embedding,
+                    jsonb_build_object('type', %(source_table)s) as metadata
+                FROM {table}
+                ON CONFLICT (source_table, source_id) DO UPDATE
+                SET content = EXCLUDED.content, embedding = EXCLUDED.embedding, metadata = EXCLUDED.metadata
+                WHERE unified_embeddings.content IS DISTINCT FROM EXCLUDED.content
+                   OR unified_embeddings.embedding IS DISTINCT FROM EXCLUDED.embedding
+            """, {"source_table": source_table})
+            upserted = cur.rowcount
+            cur.execute(f"""
+                DELETE FROM unified_embeddings u
+                WHERE u.source_table = %s
+                  AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{id_column} = u.source_id)
+            """, (source_table,))
+            print(f"  {upserted} upserted, {cur.rowcount} removed")
+
+        conn.commit()
+
+        # 통계 출력
+        cur.execute("SELECT COUNT(*) FROM unified_embeddings")
+        total_count = cur.fetchone()[0]
+    print(f"✓ Unified embeddings table has {total_count} entries")
+
+def generate_schema_embeddings():
+    """테이블 스키마(DDL + 설명 + 샘플 행) 임베딩 생성 및 저장 (SQL 생성 시 관련 테이블 검색용)"""
+    from .chains import get_db, invalidate_schema_cache
+
+    print("\n=== Generating Schema Embeddings ===")
+    db = get_db()
+    table_names = db.get_usable_table_names()
+    print(f"Found {len(table_names)} tables to process")
+
+    texts = []
+    for table_name in table_names:
+        comment = db._inspector.get_table_comment(table_name, schema=db._schema).get("text")
+        # 텍스트 구성: 테이블 이름 + 설명(COMMENT) + CREATE TABLE 문과 샘플 행
+        content = f"Table: {table_name}\nDescription: {comment or 'None'}\n{db.get_table_info([table_name])}"
         texts.append(content)
-        category_ids.append((category_id, content))
-    
-    # 임베딩 생성
+
     try:
         print("Generating embeddings...")
         batch_embeddings = embeddings_model.embed_documents(texts)
-        
-        for (category_id, content), embedding in zip(category_ids, batch_embeddings):
-            embeddings_data.append((category_id, content, embedding))
     except Exception as e:
         print(f"Error generating embeddings: {e}")
         return
-    
-    # 데이터베이스에 저장
-    print("Saving category embeddings to database...")
-    execute_values(
-        cur,
-        "INSERT INTO category_embeddings (category_id, content, embedding) VALUES %s ON CONFLICT (category_id) DO UPDATE SET content = EXCLUDED.content, embedding = EXCLUDED.embedding",
-        embeddings_data
-    )
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    print(f"✓ Saved {len(embeddings_data)} category embeddings")
 
-def generate_unified_embeddings():
-    """통합 임베딩 테이블 생성 (모든 데이터를 하나의 테이블에)"""
-    print("\n=== Generating Unified Embeddings ===")
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # 기존 통합 임베딩 삭제
-    cur.execute("DELETE FROM unified_embeddings")
-    
-    # Film embeddings 복사
-    print("Copying film embeddings...")
-    cur.execute("""
-        INSERT INTO unified_embeddings (source_table, source_id, content, embedding, metadata)
-        SELECT 
-            'film' as source_table,
-            film_id as source_id,
-            content,
-            embedding,
-            jsonb_build_object('type', 'film') as metadata
-        FROM film_embeddings
-    """)
-    
-    # Actor embeddings 복사
-    print("Copying actor embeddings...")
-    cur.execute("""
-        INSERT INTO unified_embeddings (source_table, source_id, content, embedding, metadata)
-        SELECT 
-            'actor' as source_table,
-            actor_id as source_id,
-            content,
-            embedding,
-            jsonb_build_object('type', 'actor') as metadata
-        FROM actor_embeddings
-    """)
-    
-    # Customer embeddings 복사
-    print("Copying customer embeddings...")
-    cur.execute("""
-        INSERT INTO unified_embeddings (source_table, source_id, content, embedding, metadata)
-        SELECT 
-            'customer' as source_table,
-            customer_id as source_id,
-            content,
-            embedding,
-            jsonb_build_object('type', 'customer') as metadata
-        FROM customer_embeddings
-    """)
-    
-    # Category embeddings 복사
-    print("Copying category embeddings...")
-    cur.execute("""
-        INSERT INTO unified_embeddings (source_table, source_id, content, embedding, metadata)
-        SELECT 
-            'category' as source_table,
-            category_id as source_id,
-            content,
-            embedding,
-            jsonb_build_object('type', 'category') as metadata
-        FROM category_embeddings
-    """)
-    
-    conn.commit()
-    
-    # 통계 출력
-    cur.execute("SELECT COUNT(*) FROM unified_embeddings")
-    total_count = cur.fetchone()[0]
-    
-    cur.close()
-    conn.close()
-    print(f"✓ Created unified embeddings table with {total_count} entries")
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        print("Saving schema embeddings to database...")
+        execute_values(
+            cur,
+            "INSERT INTO schema_embeddings (table_name, content, embedding) VALUES %s ON CONFLICT (table_name) DO UPDATE SET content = EXCLUDED.content, embedding = EXCLUDED.embedding, updated_at = now()",
+            list(zip(table_names, texts, batch_embeddings))
+        )
+        # 삭제된 테이블의 임베딩 정리
+        cur.execute("DELETE FROM schema_embeddings WHERE NOT (table_name = ANY(%s))", (list(table_names),))
+        conn.commit()
+
+    # 실행 중인 프로세스에서 호출된 경우 새 임베딩을 다시 읽도록 캐시를 비운다
+    invalidate_schema_cache()
+    print(f"✓ Saved {len(texts)} schema embeddings")
+
+def main(argv=None):
+    """모든 임베딩 생성 실행 (기본: 내용이 바뀐 행만 다시 임베딩)"""
+    parser = argparse.ArgumentParser(description="DVD Rental 임베딩 생성/동기화")
+    parser.add_argument("--full", action="store_true", help="내용이 같아도 모든 행을 다시 임베딩 (임베딩 모델 변경 시)")
+    args = parser.parse_args(argv)
 
-def main():
-    """모든 임베딩 생성 실행"""
     print("\n" + "="*50)
     print("DVD Rental Database - Embedding Generation")
     print("="*50)
     
     try:
-        # 각 테이블별 임베딩 생성
-        generate_film_embeddings()
-        generate_actor_embeddings()
-        generate_customer_embeddings()
-        generate_category_embeddings()
+        ensure_sync_schema()
+
+        # 각 테이블별 임베딩 생성 (변경된 행만)
+        generate_film_embeddings(full=args.full)
+        generate_actor_embeddings(full=args.full)
+        generate_customer_embeddings(full=args.full)
+        generate_category_embeddings(full=args.full)
         
         # 통합 임베딩 테이블 생성
         generate_unified_embeddings()
+
+        # SQL 생성용 테이블 스키마 임베딩
+        generate_schema_embeddings()
+
+        # 적재된 행 수에 맞춰 pgvector 인덱스 재구성 및 probes / ef_search 보정
+        manage_vector_indexes()
+
+        # 프로세스 내부 벡터 검색을 사용하는 경우 스냅샷 갱신
+        if VECTOR_SEARCH_BACKEND == "numpy":
+            refresh_vector_indexes()
         
         print("\n" + "="*50)
         print("✓ All embeddings generated successfully!")
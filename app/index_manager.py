@@ -0,0 +1,325 @@
+"""
+pgvector 인덱스 관리
+
+임베딩을 적재한 뒤 테이블별 행 수에 맞춰 ANN 인덱스를 고르고 다시 만듭니다.
+- 행 수가 PGVECTOR_EXACT_MAX_ROWS 미만: 인덱스 없이 전체 비교 (작은 테이블은 이쪽이 빠르고 정확)
+- PGVECTOR_HNSW_MAX_ROWS 이하: HNSW (m, ef_construction은 행 수에 따라)
+- 그보다 크면: ivfflat (lists = 행 수/1000, 100만 행 초과 시 sqrt(행 수))
+
+ivfflat은 이미 들어 있는 데이터로 중심점을 계산하므로 빈 테이블에 미리 만들지 않고 적재 후에 만듭니다.
+새 인덱스는 CREATE INDEX CONCURRENTLY로 만든 뒤 기존 인덱스와 바꾸므로 검색이 멈추지 않습니다.
+
+만든 뒤에는 저장된 임베딩 일부를 질문으로 써서 정확한 검색 결과와 비교한 recall@k를
+ivfflat.probes / hnsw.ef_search 값별로 측정해 vector_index_settings 테이블에 저장하고,
+검색할 때 목표 재현율(PGVECTOR_TARGET_RECALL)을 만족하는 가장 작은 값을 SET LOCAL로 적용합니다.
+인덱스 컬럼과 연산자 클래스는 저장 형식(EMBEDDING_STORAGE)을 따르며, binary 저장이면 embedding_bits
+해밍 거리 인덱스로 후보를 고른 뒤 halfvec 코사인 거리로 다시 정렬한 결과의 재현율을 측정합니다.
+
+사용법:
+    python -m app.index_manager            # 필요한 테이블만 다시 만들고 보정
+    python -m app.index_manager --force    # 모든 인덱스를 다시 만듦
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from .db import get_pool
+from .embedding_storage import (
+    INDEX_COLUMN, INDEX_OPCLASS, QUERY_VECTOR, candidate_rows, rerank_candidates,
+)
+
+load_dotenv()
+
+# 이 행 수 미만인 테이블은 ANN 인덱스 없이 전체 비교
+PGVECTOR_EXACT_MAX_ROWS = int(os.getenv("PGVECTOR_EXACT_MAX_ROWS", "5000"))
+# 이 행 수 이하는 HNSW, 초과하면 ivfflat (빌드 시간/메모리)
+PGVECTOR_HNSW_MAX_ROWS = int(os.getenv("PGVECTOR_HNSW_MAX_ROWS", "1000000"))
+# 검색 시 목표 recall@k (probes / ef_search 선택 기준)
+PGVECTOR_TARGET_RECALL = float(os.getenv("PGVECTOR_TARGET_RECALL", "0.95"))
+# 보정에 사용하는 질문 수와 k
+PGVECTOR_CALIBRATION_QUERIES = int(os.getenv("PGVECTOR_CALIBRATION_QUERIES", "50"))
+PGVECTOR_CALIBRATION_K = int(os.getenv("PGVECTOR_CALIBRATION_K", "10"))
+# 검색 프로세스가 vector_index_settings를 다시 읽는 간격(초)
+PGVECTOR_SETTINGS_TTL = float(os.getenv("PGVECTOR_SETTINGS_TTL", "60"))
+
+# unified_embeddings는 source_table별 파티션 테이블이므로 파티션마다 인덱스를 관리합니다.
+# (파티션 테이블 자체에는 CONCURRENTLY 인덱스를 만들 수 없고, source_filter 검색은 해당 파티션 인덱스만 사용)
+UNIFIED_PARTITIONS = ("unified_embeddings_film", "unified_embeddings_actor",
+                      "unified_embeddings_customer", "unified_embeddings_category")
+EMBEDDING_TABLES = ("film_embeddings", "actor_embeddings", "customer_embeddings",
+                    "category_embeddings") + UNIFIED_PARTITIONS
+
+# 방식별 검색 파라미터
+SEARCH_PARAMETERS = {"ivfflat": "ivfflat.probes", "hnsw": "hnsw.ef_search"}
+
+SETTINGS_DDL = """
+    CREATE TABLE IF NOT EXISTS vector_index_settings (
+        table_name TEXT PRIMARY KEY,
+        method TEXT NOT NULL,
+        params JSONB NOT NULL,
+        row_count INTEGER NOT NULL,
+        recall_curve JSONB NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+def index_name(table: str) -> str:
+    return f"{table}_idx"
+
+
+def plan_index(rows: int) -> dict:
+    """행 수에 맞는 인덱스 방식과 빌드 파라미터"""
+    if rows < PGVECTOR_EXACT_MAX_ROWS:
+        return {"method": "exact", "params": {}}
+    if rows <= PGVECTOR_HNSW_MAX_ROWS:
+        large = rows >= 100_000
+        return {"method": "hnsw", "params": {"m": 24 if large else 16, "ef_construction": 128 if large else 64}}
+    lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+    return {"method": "ivfflat", "params": {"lists": max(lists, 1)}}
+
+
+def _params_close(current: dict, planned: dict) -> bool:
+    """파라미터가 같거나 2배 이내 차이면 다시 만들 필요 없음"""
+    if current.keys() != planned.keys():
+        return False
+    return all(max(current[k], planned[k]) <= 2 * min(current[k], planned[k]) for k in planned)
+
+
+def _existing_index(cur, table: str):
+    """현재 인덱스의 접근 방식, 유효 여부, 정의 (없으면 None)"""
+    cur.execute("""
+        SELECT am.amname, i.indisvalid, pg_get_indexdef(c.oid)
+        FROM pg_class c
+        JOIN pg_index i ON i.indexrelid = c.oid
+        JOIN pg_am am ON c.relam = am.oid
+        WHERE c.relname = %s
+    """, (index_name(table),))
+    return cur.fetchone()
+
+
+def load_settings(cur) -> dict:
+    cur.execute(SETTINGS_DDL)
+    cur.execute("SELECT table_name, method, params, row_count, recall_curve FROM vector_index_settings")
+    return {row[0]: {"method": row[1], "params": row[2], "row_count": row[3], "recall_curve": row[4]}
+            for row in cur.fetchall()}
+
+
+def needs_rebuild(cur, table: str, plan: dict, current: dict = None) -> bool:
+    existing = _existing_index(cur, table)
+    if plan["method"] == "exact":
+        return existing is not None
+    if existing is None or not existing[1] or existing[0] != plan["method"]:
+        return True
+    if INDEX_OPCLASS not in existing[2]:
+        # 저장 형식이 바뀜
+        return True
+    if current is None or current["method"] != plan["method"]:
+        return True
+    return not _params_close(current["params"], plan["params"])
+
+
+def rebuild_index(table: str, plan: dict):
+    """
+    계획에 맞게 인덱스를 다시 만듭니다.
+
+    새 이름으로 CONCURRENTLY 빌드 → 기존 인덱스 CONCURRENTLY 삭제 → 이름 변경 순서로 진행하여
+    빌드하는 동안에도 기존 인덱스로 검색할 수 있습니다. (CONCURRENTLY는 트랜잭션 밖에서 실행해야 함)
+    """
+    name = index_name(table)
+    new_name = f"{name}_new"
+    with get_pool().connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                # 이전에 실패한 빌드가 남긴 INVALID 인덱스 정리
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}")
+                if plan["method"] != "exact":
+                    options = ", ".join(f"{key} = {int(value)}" for key, value in plan["params"].items())
+                    cur.execute(f"CREATE INDEX CONCURRENTLY {new_name} ON {table} "
+                                f"USING {plan['method']} ({INDEX_COLUMN} {INDEX_OPCLASS}) WITH ({options})")
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                if plan["method"] != "exact":
+                    cur.execute(f"ALTER INDEX {new_name} RENAME TO {name}")
+        finally:
+            conn.autocommit = False
+
+
+def _candidates(method: str, params: dict, top_k: int):
+    if method == "ivfflat":
+        lists = params["lists"]
+        values = sorted({min(2 ** i, lists) for i in range(int(math.log2(lists)) + 2)})
+    else:
+        # ef_search는 가져올 행 수(binary면 재정렬 후보 수) 이상이어야 그만큼 반환 (최대 1000)
+        floor = min(rerank_candidates(top_k), 1000)
+        values = sorted({max(v, floor) for v in (10, 20, 40, 80, 160, 320, 640, 1000)})
+    return values
+
+
+def calibrate(table: str, method: str, params: dict, queries: int = None, top_k: int = None):
+    """
+    probes / ef_search 값별 recall@k와 평균 지연 시간을 측정합니다.
+
+    저장된 임베딩을 무작위로 골라 질문으로 사용하고, 인덱스 스캔을 끈 정확한 검색 결과를 정답으로 씁니다.
+    binary 저장이면 측정 대상은 비트 후보 검색 + 코사인 재정렬 두 단계 전체입니다.
+    Returns:
+        [[값, recall, 평균 ms], ...] (값 오름차순), 정확한 검색의 평균 ms
+    """
+    queries = queries or PGVECTOR_CALIBRATION_QUERIES
+    top_k = top_k or PGVECTOR_CALIBRATION_K
+    exact_sql = f"SELECT ctid FROM {table} ORDER BY embedding <=> {QUERY_VECTOR} LIMIT %(top_k)s"
+    search_sql = (f"SELECT t.ctid FROM {candidate_rows(table, columns='ctid, embedding')} t "
+                  f"ORDER BY t.embedding <=> {QUERY_VECTOR} LIMIT %(top_k)s")
+    candidates = rerank_candidates(top_k)
+
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT embedding::vector FROM {table} WHERE embedding IS NOT NULL ORDER BY random() LIMIT %s",
+                    (queries,))
+        samples = [row[0] for row in cur.fetchall()]
+        if not samples:
+            return [], 0.0
+
+        cur.execute("SET LOCAL enable_indexscan = off")
+        truth, start = [], time.perf_counter()
+        for embedding in samples:
+            cur.execute(exact_sql, {"embedding": embedding, "top_k": top_k})
+            truth.append({row[0] for row in cur.fetchall()})
+        exact_ms = (time.perf_counter() - start) * 1000 / len(samples)
+        conn.rollback()
+
+        curve = []
+        if method == "exact":
+            return curve, exact_ms
+        for value in _candidates(method, params, top_k):
+            cur.execute(f"SET LOCAL {SEARCH_PARAMETERS[method]} = {int(value)}")
+            hits, start = 0, time.perf_counter()
+            for embedding, expected in zip(samples, truth):
+                cur.execute(search_sql, {"embedding": embedding, "top_k": top_k, "rerank_candidates": candidates})
+                hits += len({row[0] for row in cur.fetchall()} & expected)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(samples)
+            conn.rollback()
+            recall = hits / sum(len(expected) for expected in truth)
+            curve.append([value, round(recall, 4), round(elapsed_ms, 3)])
+            if recall >= 0.999:
+                break
+    return curve, exact_ms
+
+
+def manage_vector_indexes(tables=None, force: bool = False):
+    """
+    임베딩 적재 후 호출합니다. 테이블별로 인덱스 방식을 정하고, 필요하면 다시 만든 뒤 검색 파라미터를 보정합니다.
+    """
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        settings = load_settings(cur)
+
+    for table in tables or EMBEDDING_TABLES:
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {table} WHERE embedding IS NOT NULL")
+            rows = cur.fetchone()[0]
+            plan = plan_index(rows)
+            current = settings.get(table)
+            rebuild = force or needs_rebuild(cur, table, plan, current)
+        if not rebuild and current is not None and current["method"] == plan["method"]:
+            # 기존 인덱스를 그대로 쓰더라도 데이터가 바뀌었으므로 검색 파라미터는 다시 보정
+            plan = {"method": plan["method"], "params": current["params"]}
+
+        start = time.perf_counter()
+        if rebuild:
+            rebuild_index(table, plan)
+        build_seconds = time.perf_counter() - start
+        curve, exact_ms = calibrate(table, plan["method"], plan["params"])
+
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO vector_index_settings (table_name, method, params, row_count, recall_curve)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (table_name) DO UPDATE SET
+                    method = EXCLUDED.method, params = EXCLUDED.params, row_count = EXCLUDED.row_count,
+                    recall_curve = EXCLUDED.recall_curve, updated_at = now()
+            """, (table, plan["method"], json.dumps(plan["params"]), rows, json.dumps(curve)))
+
+        chosen = choose_search_value(curve, PGVECTOR_TARGET_RECALL)
+        action = f"rebuilt in {build_seconds:.1f}s" if rebuild else "kept"
+        detail = f", {SEARCH_PARAMETERS[plan['method']]}={chosen[0]} (recall {chosen[1]:.3f})" if chosen else ""
+        print(f"✓ {table}: {rows} rows, {plan['method']} {plan['params']} {action}{detail}, exact {exact_ms:.1f} ms")
+
+    invalidate_search_settings()
+
+
+def choose_search_value(curve, target_recall: float):
+    """목표 재현율을 만족하는 가장 작은 값의 [값, recall, ms] (만족하는 값이 없으면 가장 큰 값)"""
+    for point in curve:
+        if point[1] >= target_recall:
+            return point
+    return curve[-1] if curve else None
+
+
+_settings_cache = {"loaded_at": None, "settings": {}}
+_settings_lock = threading.Lock()
+
+
+def invalidate_search_settings():
+    with _settings_lock:
+        _settings_cache["loaded_at"] = None
+
+
+def _get_settings() -> dict:
+    loaded_at = _settings_cache["loaded_at"]
+    if loaded_at is not None and time.monotonic() - loaded_at < PGVECTOR_SETTINGS_TTL:
+        return _settings_cache["settings"]
+    with _settings_lock:
+        if _settings_cache["loaded_at"] is None or time.monotonic() - _settings_cache["loaded_at"] >= PGVECTOR_SETTINGS_TTL:
+            try:
+                with get_pool().connection() as conn, conn.cursor() as cur:
+                    cur.execute("SELECT to_regclass('vector_index_settings')")
+                    if cur.fetchone()[0] is None:
+                        settings = {}
+                    else:
+                        cur.execute("SELECT table_name, method, recall_curve FROM vector_index_settings")
+                        settings = {row[0]: {"method": row[1], "recall_curve": row[2]} for row in cur.fetchall()}
+            except Exception as e:
+                print(f"Vector index settings unavailable: {e}")
+                settings = {}
+            _settings_cache.update(loaded_at=time.monotonic(), settings=settings)
+    return _settings_cache["settings"]
+
+
+def search_settings_sql(tables, target_recall: float = None, candidates: int = None) -> str:
+    """
+    검색 쿼리 앞에 붙일 SET LOCAL 문 (같은 execute에서 실행하므로 왕복이 늘지 않음)
+
+    여러 테이블을 한 번에 검색하면 방식별로 가장 큰 값을 사용합니다.
+    HNSW는 ef_search개까지만 반환하므로 candidates(인덱스에서 가져올 행 수)가 더 크면 그 값을 씁니다.
+    """
+    target_recall = PGVECTOR_TARGET_RECALL if target_recall is None else target_recall
+    settings = _get_settings()
+    values = {}
+    for table in tables:
+        setting = settings.get(table)
+        if setting is None or setting["method"] not in SEARCH_PARAMETERS:
+            continue
+        chosen = choose_search_value(setting["recall_curve"], target_recall)
+        if chosen is not None:
+            parameter = SEARCH_PARAMETERS[setting["method"]]
+            value = int(chosen[0])
+            if candidates and setting["method"] == "hnsw":
+                value = max(value, min(candidates, 1000))
+            values[parameter] = max(values.get(parameter, 0), value)
+    return "".join(f"SET LOCAL {parameter} = {value};\n" for parameter, value in values.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pgvector 인덱스 재구성 및 검색 파라미터 보정")
+    parser.add_argument("--force", action="store_true", help="필요 여부와 관계없이 모든 인덱스를 다시 만듦")
+    parser.add_argument("--table", action="append", choices=EMBEDDING_TABLES, help="대상 테이블 (여러 번 지정 가능)")
+    args = parser.parse_args(argv)
+    manage_vector_indexes(args.table, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+시각화 의도 판단 (규칙 기반 빠른 경로)
+
+의도 프롬프트가 나열하는 시각화 키워드("시각화", "그래프", "chart", "visualize" 등)를
+한국어/영어 정규식으로 직접 판별하여 대부분의 질문을 LLM 호출 없이 처리합니다.
+부정 표현("차트 말고")이나 약한 단서("추이", "distribution")만 있는 애매한 질문은
+None을 반환하며, 이 경우에만 LLM 의도 체인이 실행됩니다.
+"""
+import os
+import re
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# rules: 규칙으로 판단하고 애매한 질문만 LLM 사용 / llm: 항상 LLM 사용
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "rules").lower()
+# 규칙으로 판단하지 못한 질문을 예시 질문과의 임베딩 유사도로 한 번 더 판단
+INTENT_EMBEDDING_FALLBACK = os.getenv("INTENT_EMBEDDING_FALLBACK", "false").lower() == "true"
+# 시각화/비시각화 예시와의 최대 유사도 차이가 이 값 이상일 때만 임베딩 판단을 사용
+INTENT_EMBEDDING_MARGIN = float(os.getenv("INTENT_EMBEDDING_MARGIN", "0.05"))
+
+# 영어 chart / plot은 명사("the plot of ACADEMY DINOSAUR", "chart-topping")로도 흔히 쓰이므로
+# 동사 + 목적어, "as a chart", "bar chart"처럼 시각화 문맥일 때만 명시적 요청으로 봄
+# 문장 첫 chart / plot은 한정사나 "목적어 + by/per/over ..."가 뒤따를 때만 (Plot summary / twist / line은 명사)
+_PLOT_NOUN = r"(?!(of|summary|summaries|synopsis|twist|twists|line|lines|hole|holes|point|points)\b)"
+_EXPLICIT = re.compile(
+    r"시각화|그래프|차트|플롯|도표|그려|그림으로|히스토그램|산점도"
+    r"|\bvisuali[sz]|\bgraphs?\b|\bdiagrams?\b|\bdraw\b|\bhistograms?\b|\bplotting\b"
+    r"|\b(bar|line|pie|donut|scatter|column|area)[\s-]*(chart|graph|plot)s?\b"
+    r"|\b(as|in|into|on|using)\s+(a|an)\s+([a-z]+\s+)?(chart|plot)s?\b(?!-)"
+    r"|(^|[.?!]\s*|\b(please|can you|could you|would you|let's|and)\s+)(chart|plot)\s+" + _PLOT_NOUN
+    + r"([a-z]+\s+){1,2}(by|per|over|across|against|versus|vs)\b"
+    r"|\b(chart|plot)\s+(the|a|an|this|these|those|it|them|how|each|every|all|my|our|total|number|monthly|daily|yearly|weekly)\b"
+    r"|\b(create|make|draw|generate|render)\s+(a|an|the|me\s+a)?\s*([a-z]+\s+)?(chart|plot)s?\b(?!-)"
+    r"|\b(show|display|give)\s+(me\s+)?(a|an)\s+([a-z]+\s+)?charts?\b(?!-)",
+    re.IGNORECASE,
+)
+_NEGATION = re.compile(
+    r"(시각화|그래프|차트|그림|플롯)\s*(은|는|로)?\s*(말고|없이|빼고|필요\s*없|하지\s*마|안\s*해)"
+    r"|\b(no|without|don't|do not|not|instead of)\b[^.?!]{0,20}\b(chart|graph|plot|visuali)",
+    re.IGNORECASE,
+)
+# 시각화를 원할 수도 있지만 명시적이지 않은 단서 → LLM에게 맡김
+_WEAK_CUES = re.compile(
+    r"추이|추세|분포|비중|한눈에|\btrends?\b|\bdistribution\b|\bbreakdown\b|\bat a glance\b"
+    r"|\bplots?\b|\bcharts?\b(?!-)",
+    re.IGNORECASE,
+)
+
+# (chart_type, 패턴) - 앞쪽이 우선. 명시적인 차트 모양 → 데이터 성격에서 유추 순서
+_CHART_TYPES = [
+    ("pie", re.compile(r"파이|원형|원\s*그래프|도넛|\bpie\b|\bdonut\b", re.IGNORECASE)),
+    ("line", re.compile(r"선\s*그래프|꺾은선|라인\s*차트|\bline\b", re.IGNORECASE)),
+    ("scatter", re.compile(r"산점도|산포도|\bscatter", re.IGNORECASE)),
+    ("bar", re.compile(r"막대|바\s*차트|히스토그램|\bbar\b|\bcolumn chart|\bhistogram", re.IGNORECASE)),
+    ("table", re.compile(r"표로|테이블로|\b(as|in) a table\b", re.IGNORECASE)),
+    ("pie", re.compile(r"비율|비중|점유|\bshare\b|\bproportion|\bpercentage", re.IGNORECASE)),
+    ("line", re.compile(r"추이|추세|변화|시계열|월별|연도별|일별|\btrend|\bover time\b|\bmonthly\b|\byearly\b|\bdaily\b|\btime series"
+                         r"|\b(per|by|each|every)\s+(month|year|week|day|quarter)\b|\bmonth[\s-]+(over|by)[\s-]+month\b",
+                         re.IGNORECASE)),
+    ("scatter", re.compile(r"상관|\bcorrelat", re.IGNORECASE)),
+]
+
+# 임베딩 fallback용 예시 질문
+_VISUALIZATION_EXAMPLES = [
+    "카테고리별 영화 수를 시각화해줘",
+    "월별 매출을 그래프로 보여줘",
+    "Visualize the number of rentals per store",
+    "Create a chart of revenue by category",
+]
+_PLAIN_EXAMPLES = [
+    "영화는 총 몇 개야?",
+    "가장 많이 대여한 고객을 알려줘",
+    "How many actors are there?",
+    "Show me the top 5 customers by payment",
+]
+
+NO_VISUALIZATION = {"visualization_needed": False, "chart_type": "none"}
+
+
+def guess_chart_type(question: str) -> str:
+    """질문의 표현으로 차트 종류를 고릅니다 (단서가 없으면 bar)."""
+    for chart_type, pattern in _CHART_TYPES:
+        if pattern.search(question):
+            return chart_type
+    return "bar"
+
+
+def classify_intent_rules(question: str):
+    """
+    키워드 규칙으로 시각화 의도를 판단합니다.
+
+    Returns:
+        {"visualization_needed", "chart_type"} 또는 애매하면 None
+    """
+    if _NEGATION.search(question):
+        return None
+    if _EXPLICIT.search(question):
+        return {"visualization_needed": True, "chart_type": guess_chart_type(question)}
+    if _WEAK_CUES.search(question):
+        return None
+    return dict(NO_VISUALIZATION)
+
+
+def classify_intent_embedding(question: str, embed_texts):
+    """
+    예시 질문들과의 코사인 유사도로 시각화 의도를 판단합니다.
+
+    Args:
+        embed_texts: 텍스트 리스트를 받아 임베딩 리스트를 반환하는 함수 (chains.embed_queries)
+
+    Returns:
+        판단 결과 또는 두 그룹의 유사도 차이가 INTENT_EMBEDDING_MARGIN보다 작으면 None
+    """
+    vectors = np.asarray(embed_texts(_VISUALIZATION_EXAMPLES + _PLAIN_EXAMPLES + [question]), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarities = vectors[:-1] @ vectors[-1]
+    split = len(_VISUALIZATION_EXAMPLES)
+    margin = float(similarities[:split].max() - similarities[split:].max())
+    if abs(margin) < INTENT_EMBEDDING_MARGIN:
+        return None
+    if margin > 0:
+        return {"visualization_needed": True, "chart_type": guess_chart_type(question)}
+    return dict(NO_VISUALIZATION)
+
+
+def classify_intent(question: str, embed_texts=None):
+    """
+    규칙 → (설정된 경우) 임베딩 유사도 순으로 시각화 의도를 판단합니다.
+    둘 다 판단하지 못하면 None을 반환하며, 호출자는 LLM 의도 체인을 사용해야 합니다.
+    """
+    if INTENT_CLASSIFIER == "llm":
+        return None
+    decided = classify_intent_rules(question)
+    if decided is None and INTENT_EMBEDDING_FALLBACK and embed_texts is not None:
+        try:
+            decided = classify_intent_embedding(question, embed_texts)
+        except Exception as e:
+            print(f"Intent embedding fallback failed: {e}")
+    return decided
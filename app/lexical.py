@@ -0,0 +1,169 @@
+"""
+키워드 검색 + 벡터 검색 하이브리드 (reciprocal-rank fusion)
+
+정확한 이름이 들어간 질문("PENELOPE GUINESS", 영화 제목)은 임베딩 유사도보다 키워드 색인이 빠르고 정확합니다.
+unified_embeddings의 content에 대해 세 가지 검색을 한 SQL 문에서 함께 실행하고 순위를 RRF로 합칩니다.
+- vector: pgvector 코사인 거리
+- fulltext: 생성 컬럼 content_tsv(tsvector, GIN 인덱스)와 질문 단어의 OR tsquery
+- name: 질문에서 뽑은 이름 후보(대문자 단어열, 따옴표 문자열)와 pg_trgm word_similarity (오타 허용)
+
+이름 후보가 content에 거의 그대로 있으면(word_similarity ≥ HYBRID_SHORTCIRCUIT_SIMILARITY)
+임베딩 API를 호출하지 않고 키워드 결과만으로 답합니다.
+"""
+import os
+import re
+
+from dotenv import load_dotenv
+
+from .embedding_storage import QUERY_VECTOR, candidate_rows
+
+load_dotenv()
+
+# 하이브리드 검색에 키워드 검색 포함 여부 (false면 벡터 검색만)
+HYBRID_LEXICAL = os.getenv("HYBRID_LEXICAL", "true").lower() == "true"
+# RRF 점수 1 / (k + 순위)의 k
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# 검색 방식별로 합치기 전에 가져오는 후보 수
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# 이름 후보의 최소 word_similarity (pg_trgm)
+HYBRID_NAME_MIN_SIMILARITY = float(os.getenv("HYBRID_NAME_MIN_SIMILARITY", "0.5"))
+# 이 유사도 이상으로 이름이 일치하면 임베딩 없이 키워드 결과만 사용 (1보다 크면 사용 안 함)
+HYBRID_SHORTCIRCUIT_SIMILARITY = float(os.getenv("HYBRID_SHORTCIRCUIT_SIMILARITY", "0.9"))
+
+_QUOTED = re.compile(r"'([^']{2,})'|\"([^\"]{2,})\"|[‘“]([^’”]{2,})[’”]")
+# 대문자로 시작하는 단어 2개 이상의 연속 또는 3글자 이상 대문자 단어 (한국어 조사가 바로 붙어도 인식)
+_NAME_RUN = re.compile(
+    r"(?<![A-Za-z])(?:[A-Z][A-Za-z'\-]*(?:\s+[A-Z][A-Za-z'\-]*)+|[A-Z]{3,})(?![A-Za-z])"
+)
+_WORD = re.compile(r"[a-z0-9]{2,}")
+_STOPWORDS = frozenset("""
+    a an and are as at be by can could did do does for from give had has have how i in is it list me my
+    of on or show tell than that the their them there these this those to was were what when where which
+    who whom whose why will with would you your find get many much please about each all any
+""".split())
+# 문장 첫머리 등에서 대문자로 시작해 이름 후보에 섞이는 단어
+_LEADING_WORDS = frozenset("which what who whom whose how when where show list find tell give please "
+                           "the a an in of for did does do is are".split())
+
+
+def extract_name_phrases(question: str, limit: int = 3):
+    """질문에서 이름으로 보이는 구절(따옴표 문자열, 대문자 단어열)을 최대 limit개 반환합니다."""
+    phrases = [next(group for group in match.groups() if group) for match in _QUOTED.finditer(question)]
+    for match in _NAME_RUN.finditer(question):
+        words = match.group(0).split()
+        while words and words[0].lower() in _LEADING_WORDS:
+            words.pop(0)
+        if words and (len(words) > 1 or words[0].isupper()):
+            phrases.append(" ".join(words))
+
+    unique = []
+    for phrase in phrases:
+        phrase = phrase.strip()
+        if phrase and phrase.lower() not in (p.lower() for p in unique):
+            unique.append(phrase)
+    return unique[:limit]
+
+
+def build_tsquery(question: str, limit: int = 16):
+    """질문의 영문/숫자 단어(불용어 제외)를 OR로 묶은 to_tsquery 입력 (단어가 없으면 None)"""
+    terms = []
+    for word in _WORD.findall(question.lower()):
+        if word not in _STOPWORDS and word not in terms:
+            terms.append(word)
+    return " | ".join(terms[:limit]) or None
+
+
+def hybrid_sql(use_vector: bool, use_fulltext: bool, use_names: bool) -> str:
+    """
+    선택한 검색 방식들의 후보를 RRF로 합쳐 상위 top_k개를 반환하는 SQL
+
+    파라미터: embedding, tsquery, phrases, candidates, rerank_candidates, rrf_k, min_similarity, top_k
+    결과 컬럼: source_table, source_id, content, metadata, similarity, name_similarity, score, matched_by
+    """
+    ctes, ranked = [], []
+    if use_vector:
+        rows = candidate_rows("unified_embeddings", "source_table, source_id, embedding")
+        ctes.append(f"""
+        vector AS (
+            SELECT source_table, source_id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT source_table, source_id, embedding <=> {QUERY_VECTOR} AS distance
+                FROM {rows} u
+                ORDER BY embedding <=> {QUERY_VECTOR}
+                LIMIT %(candidates)s
+            ) v
+        )""")
+        ranked.append("SELECT source_table, source_id, rank, 'vector' AS retriever FROM vector")
+    if use_fulltext:
+        ctes.append("""
+        fulltext AS (
+            SELECT source_table, source_id, row_number() OVER (ORDER BY ts_rank_cd(content_tsv, q) DESC) AS rank
+            FROM unified_embeddings, to_tsquery('simple', %(tsquery)s) q
+            WHERE content_tsv @@ q
+            ORDER BY ts_rank_cd(content_tsv, q) DESC
+            LIMIT %(candidates)s
+        )""")
+        ranked.append("SELECT source_table, source_id, rank, 'fulltext' AS retriever FROM fulltext")
+    if use_names:
+        # <%% 연산자(word_similarity > pg_trgm.word_similarity_threshold)로 GIN 트라이그램 인덱스 사용
+        ctes.append("""
+        names AS (
+            SELECT source_table, source_id, similarity, row_number() OVER (ORDER BY similarity DESC) AS rank
+            FROM (
+                SELECT source_table, source_id, MAX(word_similarity(phrase, content)) AS similarity
+                FROM unified_embeddings, unnest(%(phrases)s::text[]) AS phrase
+                WHERE phrase <%% content
+                GROUP BY source_table, source_id
+            ) n
+            ORDER BY similarity DESC
+            LIMIT %(candidates)s
+        )""")
+        ranked.append("SELECT source_table, source_id, rank, 'name' AS retriever FROM names")
+
+    ctes.append(f"""
+        fused AS (
+            SELECT source_table, source_id, SUM(1.0 / (%(rrf_k)s + rank))::float8 AS score,
+                   array_agg(retriever ORDER BY rank) AS matched_by
+            FROM ({" UNION ALL ".join(ranked)}) r
+            GROUP BY source_table, source_id
+        )""")
+    similarity = f"1 - (u.embedding <=> {QUERY_VECTOR})" if use_vector else "NULL::float"
+    name_join = "LEFT JOIN names n USING (source_table, source_id)" if use_names else ""
+    name_similarity = "n.similarity" if use_names else "NULL::float"
+    return f"""
+        SET LOCAL pg_trgm.word_similarity_threshold = %(min_similarity)s;
+        WITH {",".join(ctes)}
+        SELECT u.source_table, u.source_id, u.content, u.metadata,
+               {similarity} AS similarity, {name_similarity} AS name_similarity,
+               f.score, f.matched_by
+        FROM fused f
+        JOIN unified_embeddings u USING (source_table, source_id)
+        {name_join}
+        ORDER BY f.score DESC
+        LIMIT %(top_k)s
+    """
+
+
+def is_confident_lexical_match(rows) -> bool:
+    """최상위 결과의 이름 일치도가 단축 기준 이상인지"""
+    return bool(rows) and (rows[0].get("name_similarity") or 0.0) >= HYBRID_SHORTCIRCUIT_SIMILARITY
+
+
+def reciprocal_rank_fusion(ranked_lists: dict, top_k: int, k: int = None):
+    """
+    {검색 방식: [결과 dict, ...]} 순위 목록들을 RRF로 합칩니다 (벡터 검색이 프로세스 내부 인덱스일 때 사용).
+    결과는 (source_table, source_id)로 식별하며 처음 본 dict에 score, matched_by를 더해 반환합니다.
+    """
+    k = HYBRID_RRF_K if k is None else k
+    fused = {}
+    for retriever, rows in ranked_lists.items():
+        for rank, row in enumerate(rows, 1):
+            key = (row["source_table"], row["source_id"])
+            entry = fused.setdefault(key, {**row, "score": 0.0, "matched_by": []})
+            entry["score"] += 1.0 / (k + rank)
+            # SQL에서 이미 합쳐진 목록이면 그 목록의 검색 방식들을 그대로 기록
+            entry["matched_by"].extend(row.get("matched_by") or [retriever])
+            for column in ("similarity", "name_similarity"):
+                if entry.get(column) is None and row.get(column) is not None:
+                    entry[column] = row[column]
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:top_k]
@@ -1,10 +1,23 @@
-from fastapi import FastAPI, HTTPException
-from .schemas import QueryRequest, QueryResponse, VectorSearchRequest, VectorSearchResponse, HybridSearchRequest
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from .schemas import (
+    QueryRequest, QueryResponse, VectorSearchRequest, VectorSearchResponse, HybridSearchRequest,
+    MultiVectorSearchRequest, MultiVectorSearchResponse, BatchQueryRequest, BatchQueryItem, ResultPageResponse
+)
 from .chains import (
-    get_full_chain, get_db, clean_json_response,
+    get_chain_stages, get_full_chain, get_db, invalidate_schema_cache, clean_json_response, clean_sql_query,
     vector_search_unified, vector_search_films, vector_search_actors, 
-    vector_search_customers, hybrid_search
+    vector_search_customers, vector_search_multi, hybrid_search, embed_queries
 )
+from .cache import embedding_cache, embedding_scope, get_answer_cache
+from .charts import build_chart_data
+from .db import get_pool, run_blocking
+from .embedding_storage import storage_summary
+from .intent import NO_VISUALIZATION
+from .results import SQL_MAX_ROWS, fetch_result_page, make_result, result_store, result_to_records, strip_sql
+from .sql_templates import sql_template_cache
+from .vector_index import vector_index_stats
+import asyncio
 import json
 
 # FastAPI 앱 인스턴스 생성
@@ -13,109 +26,390 @@ app = FastAPI(
     description="LangChain과 FastAPI를 사용하여 자연어 질문을 SQL로 변환하는 API",
 )
 
-# LangChain 체인 로드
-full_chain = get_full_chain()
+# LangChain 체인 로드 (스트리밍 API는 단계별 Runnable을 직접 사용)
+chain_stages = get_chain_stages()
+full_chain = get_full_chain(stages=chain_stages)
 
-@app.post("/query", response_model=QueryResponse)
-async def handle_query(request: QueryRequest):
-    """
-    사용자의 자연어 질문을 받아 SQL을 생성하고, 실행한 뒤, 자연어 답변과 차트 데이터를 반환합니다.
-    벡터 검색을 통해 관련 컨텍스트를 추가하여 더 정확한 SQL 생성을 지원합니다.
+def _parse_json_output(raw: str, label: str) -> dict:
+    """LLM이 생성한 JSON 문자열을 파싱합니다. 실패하면 빈 dict를 반환합니다."""
+    cleaned = clean_json_response(raw)
+    try:
+        return json.loads(cleaned) if cleaned.strip() else {}
+    except json.JSONDecodeError as e:
+        print(f"Failed to parse {label} JSON: {e}")
+        print(f"Raw {label} after cleaning: {cleaned}")
+        return {}
+
+def _get_used_tables(sql_query: str):
+    """SQL 쿼리에 등장하는 테이블 이름 목록을 반환합니다 (캐시된 스키마 사용)."""
+    db = get_db()
+    table_names = db.get_usable_table_names()
+    return [name for name in table_names if name in sql_query]
+
+async def _get_vector_context(question: str, top_k: int, ignore_errors: bool = True, query_embedding=None):
     """
-    question = request.question
-    language = request.language
-    
-    if not question:
-        raise HTTPException(status_code=400, detail="Question cannot be empty.")
+    벡터 검색으로 SQL 생성용 컨텍스트를 가져옵니다.
 
+    Returns:
+        (컨텍스트 문자열, 질문 임베딩, 키워드 검색으로 일치한 테이블 목록 또는 None) - 실패하면 ("", None, None)
+        키워드 검색만으로 답했으면 질문 임베딩은 None이고, 일치한 테이블로 스키마 검색을 대신합니다.
+    """
     try:
+        hybrid_result = await run_blocking(hybrid_search, question, top_k=top_k, query_embedding=query_embedding)
+        vector_context = hybrid_result["context"]
+        print(f"Vector context added: {vector_context[:200]}...")
+        lexical_tables = None
+        if hybrid_result.get("retrieval") == "lexical":
+            lexical_tables = sorted({row["source_table"] for row in hybrid_result["vector_results"]})
+        return vector_context, hybrid_result.get("query_embedding"), lexical_tables
+    except Exception as e:
+        if not ignore_errors:
+            raise
+        print(f"Vector search failed (continuing without context): {e}")
+        return "", None, None
+
+def _build_chain_input(question: str, language: str, vector_context: str, lexical_tables=None) -> dict:
+    """컨텍스트를 포함한 질문으로 체인 입력을 구성합니다 (의도 판단용 원래 질문도 함께 전달)."""
+    enhanced_question = question
+    if vector_context:
+        enhanced_question = f"{question}\n\n{vector_context}"
+    chain_input = {"question": enhanced_question, "user_question": question, "language": language}
+    if lexical_tables:
+        chain_input["lexical_tables"] = lexical_tables
+    return chain_input
+
+def _build_query_response(chain_result: dict) -> QueryResponse:
+    """체인 실행 결과를 QueryResponse로 변환합니다."""
+    # 디버깅을 위한 출력
+    print("Chain result:", chain_result)
+
+    # 체인 결과 파싱
+    # 의도 JSON을 파싱하지 못하면 차트 없이 답변 (시각화는 명시적으로 요청한 경우에만)
+    intent_data = _parse_json_output(chain_result.get("intent", '{}'), "intent") or dict(NO_VISUALIZATION)
+    chart_type = intent_data.get("chart_type", "none")
+
+    sql_query = chain_result.get("sql_query", "")
+    sql_result = chain_result.get("sql_result") or make_result()
+
+    # 답변 체인은 자연어 답변만 생성하고, 차트 데이터는 결과 행에서 직접 만든다
+    natural_language_response = (chain_result.get("final_response") or "").strip()
+    chart_data = build_chart_data(sql_result, chart_type) if intent_data.get("visualization_needed", False) else []
+
+    # 디버깅: 파싱된 데이터 출력
+    print(f"Parsed natural_language_response: {natural_language_response}")
+    print(f"Parsed chart_data: {chart_data}")
+    print(f"Chart type: {chart_type}")
+
+    # 전체 결과를 페이지 단위로 다시 조회할 수 있도록 정제된 SQL을 토큰으로 등록
+    result_token = None
+    if sql_result["columns"] and not sql_result["error"]:
+        result_token = result_store.register(strip_sql(clean_sql_query(sql_query)), len(sql_result["columns"]))
+
+    return QueryResponse(
+        sql_query=sql_query,
+        table_names=_get_used_tables(sql_query),
+        result=result_to_records(sql_result),
+        natural_language_response=natural_language_response,
+        chart_type=chart_type,
+        chart_data=chart_data,
+        result_token=result_token,
+        truncated=sql_result.get("truncated", False),
+    )
+
+async def _store_answer(answer_cache, question: str, language: str, chain_result: dict,
+                        response: QueryResponse, query_embedding):
+    """
+    성공한 응답을 답변 캐시에 저장합니다. SQL 실행에 실패한 응답은 캐시하지 않습니다.
+    result_token은 이 프로세스의 result_store에만 있으므로 저장하지 않고 캐시에서 꺼낼 때 새로 발급합니다.
+    """
+    if answer_cache and not (chain_result.get("sql_result") or {}).get("error"):
+        await run_blocking(answer_cache.store, question, language,
+                           response.model_dump(mode="json", exclude={"result_token"}), query_embedding)
+
+def _from_answer_cache(cached: dict) -> dict:
+    """캐시된 응답에 이 프로세스에서 조회할 수 있는 새 result_token을 붙입니다."""
+    cached = dict(cached)
+    cached["result_token"] = None
+    sql = strip_sql(clean_sql_query(cached.get("sql_query") or ""))
+    if sql:
+        records = cached.get("result") or []
+        cached["result_token"] = result_store.register(sql, len(records[0]) if records else 0)
+    return cached
+
+async def _run_query_pipeline(question: str, language: str, use_vector_context: bool = True,
+                              top_k: int = 3, ignore_vector_errors: bool = True) -> QueryResponse:
+    """
+    벡터 검색 → 체인 실행 → 결과 파싱으로 이어지는 질의 파이프라인을 비동기로 실행합니다.
+
+    LLM 호출은 ainvoke로, 동기 DB/임베딩 호출은 제한된 스레드 풀에서 실행되므로
+    처리 중에도 이벤트 루프가 다른 요청을 계속 받을 수 있습니다.
+    같은 질문(또는 semantic 모드에서 유사한 질문)은 답변 캐시에서 바로 반환합니다.
+    """
+    # 같은 요청 안의 모든 벡터 검색이 질문 임베딩을 공유하도록 요청 단위 캐시 범위를 연다
+    with embedding_scope():
+        answer_cache = get_answer_cache()
+        if answer_cache:
+            cached = await run_blocking(answer_cache.lookup, question, language)
+            if cached is not None:
+                print(f"Answer cache hit: {question}")
+                return QueryResponse(**_from_answer_cache(cached))
+
         # 벡터 검색으로 컨텍스트 가져오기
-        vector_context = ""
-        try:
-            hybrid_result = hybrid_search(question, top_k=3)
-            vector_context = hybrid_result["context"]
-            print(f"Vector context added: {vector_context[:200]}...")
-        except Exception as e:
-            print(f"Vector search failed (continuing without context): {e}")
-            vector_context = ""
-        
-        # 컨텍스트를 포함한 질문 구성
-        enhanced_question = question
-        if vector_context:
-            enhanced_question = f"{question}\n\n{vector_context}"
-        
+        vector_context, query_embedding, lexical_tables = "", None, None
+        if use_vector_context:
+            vector_context, query_embedding, lexical_tables = await _get_vector_context(
+                question, top_k, ignore_vector_errors)
+
+        if answer_cache:
+            cached = await run_blocking(answer_cache.lookup_similar, query_embedding, language)
+            if cached is not None:
+                print(f"Answer cache semantic hit: {question}")
+                return QueryResponse(**_from_answer_cache(cached))
+            answer_cache.record_miss()
+
         # 전체 체인 실행 (언어 파라미터 포함)
-        chain_result = full_chain.invoke({"question": enhanced_question, "language": language})
-        
-        # 디버깅을 위한 출력
-        print("Chain result:", chain_result)
+        chain_result = await full_chain.ainvoke(_build_chain_input(question, language, vector_context, lexical_tables))
+        response = _build_query_response(chain_result)
+        await _store_answer(answer_cache, question, language, chain_result, response, query_embedding)
+        return response
 
-        # 체인 결과 파싱
-        intent_str = chain_result.get("intent", '{}')
-        print(f"Intent string: {intent_str}")
-        
-        # JSON 정리
-        intent_str = clean_json_response(intent_str)
-        
-        try:
-            intent_data = json.loads(intent_str) if intent_str.strip() else {}
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse intent JSON: {e}")
-            intent_data = {}
-        
-        chart_type = intent_data.get("chart_type", "none")
+async def _stream_query_batch(request: BatchQueryRequest):
+    """
+    배치 질문을 처리하며 완료되는 순서대로 NDJSON 한 줄씩 내보냅니다.
 
-        sql_query = chain_result.get("sql_query", "")
-        sql_result_str = chain_result.get("sql_result", "[]")
-        
-        final_response_str = chain_result.get("final_response", '{}')
-        print(f"Final response string: {final_response_str}")
-        
-        # JSON 정리
-        final_response_str = clean_json_response(final_response_str)
-        
+    1. 답변 캐시에 있는 질문은 즉시 반환
+    2. 나머지 질문은 한 번의 임베딩 호출로 함께 임베딩
+    3. 벡터 검색은 커넥션 풀 크기 안에서 동시에 실행
+    4. LLM 체인은 abatch_as_completed로 max_concurrency만큼 동시에 실행
+    """
+    def line(index, response=None, error=None):
+        return BatchQueryItem(index=index, response=response, error=error).model_dump_json() + "\n"
+
+    answer_cache = get_answer_cache()
+    pending = []
+    for index, item in enumerate(request.queries):
+        if not item.question:
+            yield line(index, error="Question cannot be empty.")
+            continue
+        cached = await run_blocking(answer_cache.lookup, item.question, item.language) if answer_cache else None
+        if cached is not None:
+            yield line(index, response=QueryResponse(**_from_answer_cache(cached)))
+            continue
+        pending.append(index)
+
+    if not pending:
+        return
+
+    # 모든 질문을 한 번의 임베딩 API 호출로 처리
+    questions = [request.queries[index].question for index in pending]
+    try:
+        embeddings = await run_blocking(embed_queries, questions)
+    except Exception as e:
+        print(f"Batch embedding failed (continuing without context): {e}")
+        embeddings = [None] * len(pending)
+
+    contexts = await asyncio.gather(*(
+        _get_vector_context(question, top_k=request.top_k, query_embedding=embedding)
+        for question, embedding in zip(questions, embeddings)
+    ))
+
+    chain_indices, chain_inputs, chain_embeddings = [], [], []
+    for index, (vector_context, query_embedding, lexical_tables) in zip(pending, contexts):
+        item = request.queries[index]
+        if answer_cache:
+            cached = await run_blocking(answer_cache.lookup_similar, query_embedding, item.language)
+            if cached is not None:
+                yield line(index, response=QueryResponse(**_from_answer_cache(cached)))
+                continue
+            answer_cache.record_miss()
+        chain_indices.append(index)
+        chain_inputs.append(_build_chain_input(item.question, item.language, vector_context, lexical_tables))
+        chain_embeddings.append(query_embedding)
+
+    async for position, chain_result in full_chain.abatch_as_completed(
+        chain_inputs, config={"max_concurrency": request.max_concurrency}, return_exceptions=True
+    ):
+        index = chain_indices[position]
+        item = request.queries[index]
+        if isinstance(chain_result, Exception):
+            print(f"Batch item {index} failed: {chain_result}")
+            yield line(index, error=f"Failed to process query: {str(chain_result)}")
+            continue
         try:
-            final_response_data = json.loads(final_response_str) if final_response_str.strip() else {}
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse final_response JSON: {e}")
-            print(f"Raw final_response_str after cleaning: {final_response_str}")
-            final_response_data = {}
-        
-        natural_language_response = final_response_data.get("natural_language_response", "")
-        chart_data = final_response_data.get("chart_data", [])
-        
-        # 디버깅: 파싱된 데이터 출력
-        print(f"Parsed natural_language_response: {natural_language_response}")
-        print(f"Parsed chart_data: {chart_data}")
-        print(f"Chart type: {chart_type}")
+            response = _build_query_response(chain_result)
+            await _store_answer(answer_cache, item.question, item.language, chain_result,
+                                response, chain_embeddings[position])
+            yield line(index, response=response)
+        except Exception as e:
+            print(f"Batch item {index} failed: {e}")
+            yield line(index, error=f"Failed to process query: {str(e)}")
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
 
-        # SQL 결과 파싱
+async def _stream_query_events(question: str, language: str):
+    """
+    질의 파이프라인을 실행하며 단계가 끝날 때마다 Server-Sent Events를 내보냅니다.
+
+    이벤트 순서: intent / sql (완료 순서대로) → rows → token (답변 토큰, 여러 번) → result (최종 QueryResponse)
+    오류가 발생하면 error 이벤트를 보내고 종료합니다.
+    """
+    with embedding_scope():
         try:
-            result_list = json.loads(sql_result_str)
-        except (json.JSONDecodeError, TypeError):
-            result_list = [{"result": sql_result_str}]
-
-        # 사용된 테이블 이름 추출
-        db = get_db()
-        table_names = db.get_usable_table_names()
-        used_tables = [name for name in table_names if name in sql_query]
-
-        return QueryResponse(
-            sql_query=sql_query,
-            table_names=used_tables,
-            result=result_list,
-            natural_language_response=natural_language_response,
-            chart_type=chart_type,
-            chart_data=chart_data,
-        )
+            answer_cache = get_answer_cache()
+            if answer_cache:
+                cached = await run_blocking(answer_cache.lookup, question, language)
+                if cached is not None:
+                    yield _sse_event("result", _from_answer_cache(cached))
+                    return
+
+            vector_context, query_embedding, lexical_tables = await _get_vector_context(question, top_k=3)
+            if answer_cache:
+                cached = await run_blocking(answer_cache.lookup_similar, query_embedding, language)
+                if cached is not None:
+                    yield _sse_event("result", _from_answer_cache(cached))
+                    return
+                answer_cache.record_miss()
+
+            chain_result = _build_chain_input(question, language, vector_context, lexical_tables)
+
+            # 의도 파악과 SQL 생성을 동시에 실행하고 먼저 끝난 쪽부터 전송
+            tasks = {
+                asyncio.ensure_future(chain_stages["intent"].ainvoke(chain_result)): "intent",
+                asyncio.ensure_future(chain_stages["sql_query"].ainvoke(chain_result)): "sql_query",
+            }
+            try:
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        key = tasks[task]
+                        chain_result[key] = task.result()
+                        if key == "intent":
+                            intent_data = _parse_json_output(chain_result["intent"], "intent")
+                            yield _sse_event("intent", {
+                                "visualization_needed": intent_data.get("visualization_needed", False),
+                                "chart_type": intent_data.get("chart_type", "none"),
+                            })
+                        else:
+                            yield _sse_event("sql", {"sql_query": clean_sql_query(chain_result["sql_query"])})
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            chain_result["sql_result"] = await chain_stages["sql_result"].ainvoke(chain_result)
+            yield _sse_event("rows", {
+                "table_names": _get_used_tables(chain_result["sql_query"]),
+                "result": result_to_records(chain_result["sql_result"]),
+            })
+
+            # 자연어 답변을 토큰 단위로 전송
+            chunks = []
+            async for chunk in chain_stages["final_response"].astream(chain_result):
+                chunks.append(chunk)
+                if chunk:
+                    yield _sse_event("token", {"text": chunk})
+            chain_result["final_response"] = "".join(chunks)
+
+            response = _build_query_response(chain_result)
+            await _store_answer(answer_cache, question, language, chain_result, response, query_embedding)
+            yield _sse_event("result", response.model_dump(mode="json"))
+        except Exception as e:
+            print(f"Streaming query error: {e}")
+            yield _sse_event("error", {"detail": f"Failed to process query: {str(e)}"})
+
+@app.post("/query", response_model=QueryResponse)
+async def handle_query(request: QueryRequest):
+    """
+    사용자의 자연어 질문을 받아 SQL을 생성하고, 실행한 뒤, 자연어 답변과 차트 데이터를 반환합니다.
+    벡터 검색을 통해 관련 컨텍스트를 추가하여 더 정확한 SQL 생성을 지원합니다.
+    """
+    if not request.question:
+        raise HTTPException(status_code=400, detail="Question cannot be empty.")
+
+    try:
+        return await _run_query_pipeline(request.question, request.language, top_k=3)
     except Exception as e:
         print(f"An error occurred: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to process query: {str(e)}")
 
+@app.post("/query/stream")
+async def handle_query_stream(request: QueryRequest):
+    """
+    /query의 스트리밍 버전 (Server-Sent Events)
+    의도, 정제된 SQL, 결과 행, 답변 토큰을 단계가 끝나는 대로 전송하고 마지막에 전체 QueryResponse를 보냅니다.
+    """
+    if not request.question:
+        raise HTTPException(status_code=400, detail="Question cannot be empty.")
+    return StreamingResponse(
+        _stream_query_events(request.question, request.language),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/query/results/{token}", response_model=ResultPageResponse)
+async def get_query_results(token: str, page: int = Query(1, ge=1), page_size: int = Query(100, ge=1, le=SQL_MAX_ROWS)):
+    """
+    /query 응답의 result_token으로 SQL 결과를 페이지 단위로 조회합니다.
+    LLM 체인은 다시 실행하지 않고 저장된 SQL에 LIMIT/OFFSET만 적용합니다.
+    """
+    entry = result_store.get(token)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired result token.")
+
+    sql, column_count = entry
+    page_result = await run_blocking(fetch_result_page, get_db(), sql, page, page_size, column_count)
+    if page_result["error"]:
+        raise HTTPException(status_code=500, detail=page_result["error"])
+    return ResultPageResponse(
+        result_token=token,
+        page=page,
+        page_size=page_size,
+        columns=page_result["columns"],
+        result=result_to_records(page_result),
+        has_more=page_result["has_more"],
+        truncated=page_result["truncated"],
+    )
+
+@app.post("/query/batch")
+async def handle_query_batch(request: BatchQueryRequest):
+    """
+    여러 질문을 한 번에 처리하는 배치 API
+    각 질문의 결과를 완료되는 순서대로 NDJSON(한 줄에 하나의 {"index", "response", "error"})으로 스트리밍합니다.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="Queries cannot be empty.")
+    return StreamingResponse(_stream_query_batch(request), media_type="application/x-ndjson")
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Text-to-SQL API with Vector Search!"}
 
+@app.get("/metrics")
+def read_metrics():
+    """모니터링용 내부 지표 (커넥션 풀 상태 등)"""
+    answer_cache = get_answer_cache()
+    return {
+        "db_pool": get_pool().stats(),
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "embedding_cache": embedding_cache.stats(),
+        "sql_templates": sql_template_cache.stats(),
+        "vector_index": vector_index_stats(),
+        "embedding_storage": storage_summary(),
+    }
+
+@app.post("/schema/invalidate")
+async def invalidate_schema():
+    """
+    데이터베이스 스키마가 변경된 뒤 호출하여 캐시된 스키마 정보를 다시 불러옵니다.
+    """
+    try:
+        await run_blocking(invalidate_schema_cache)
+        return {"status": "ok", "table_count": len(get_db().get_usable_table_names())}
+    except Exception as e:
+        print(f"Schema invalidation error: {e}")
+        raise HTTPException(status_code=500, detail=f"Schema invalidation failed: {str(e)}")
+
 @app.post("/vector-search", response_model=VectorSearchResponse)
 async def vector_search_endpoint(request: VectorSearchRequest):
     """
@@ -123,7 +417,8 @@ async def vector_search_endpoint(request: VectorSearchRequest):
     모든 테이블에서 의미 기반 검색을 수행합니다.
     """
     try:
-        results = vector_search_unified(
+        results = await run_blocking(
+            vector_search_unified,
             query=request.query,
             top_k=request.top_k,
             source_filter=request.source_filter
@@ -144,7 +439,8 @@ async def vector_search_films_endpoint(request: VectorSearchRequest):
     영화 데이터에서만 의미 기반 검색을 수행합니다.
     """
     try:
-        results = vector_search_films(
+        results = await run_blocking(
+            vector_search_films,
             query=request.query,
             top_k=request.top_k
         )
@@ -164,7 +460,8 @@ async def vector_search_actors_endpoint(request: VectorSearchRequest):
     배우 데이터에서만 의미 기반 검색을 수행합니다.
     """
     try:
-        results = vector_search_actors(
+        results = await run_blocking(
+            vector_search_actors,
             query=request.query,
             top_k=request.top_k
         )
@@ -184,7 +481,8 @@ async def vector_search_customers_endpoint(request: VectorSearchRequest):
     고객 데이터에서만 의미 기반 검색을 수행합니다.
     """
     try:
-        results = vector_search_customers(
+        results = await run_blocking(
+            vector_search_customers,
             query=request.query,
             top_k=request.top_k
         )
@@ -197,76 +495,36 @@ async def vector_search_customers_endpoint(request: VectorSearchRequest):
         print(f"Customer vector search error: {e}")
         raise HTTPException(status_code=500, detail=f"Customer vector search failed: {str(e)}")
 
+@app.post("/vector-search/multi", response_model=MultiVectorSearchResponse)
+async def vector_search_multi_endpoint(request: MultiVectorSearchRequest):
+    """
+    다중 테이블 벡터 검색 API
+    쿼리를 한 번만 임베딩하고, 여러 테이블의 검색을 한 번의 데이터베이스 왕복으로 수행합니다.
+    """
+    try:
+        return await run_blocking(vector_search_multi, request.query, request.top_k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Multi-table vector search error: {e}")
+        raise HTTPException(status_code=500, detail=f"Multi-table vector search failed: {str(e)}")
+
 @app.post("/hybrid-query", response_model=QueryResponse)
 async def hybrid_query_endpoint(request: HybridSearchRequest):
     """
     하이브리드 검색 API
     벡터 검색 결과를 컨텍스트로 활용하여 SQL 쿼리를 생성합니다.
     """
-    question = request.question
-    language = request.language
-    
-    if not question:
+    if not request.question:
         raise HTTPException(status_code=400, detail="Question cannot be empty.")
 
     try:
-        # 벡터 검색으로 컨텍스트 가져오기
-        vector_context = ""
-        if request.use_vector_context:
-            hybrid_result = hybrid_search(question, top_k=request.top_k)
-            vector_context = hybrid_result["context"]
-            print(f"Vector context added: {vector_context[:200]}...")
-        
-        # 컨텍스트를 포함한 질문 구성
-        enhanced_question = question
-        if vector_context:
-            enhanced_question = f"{question}\n\n{vector_context}"
-        
-        # 체인 실행
-        chain_result = full_chain.invoke({"question": enhanced_question, "language": language})
-        
-        # 기존 코드와 동일한 처리
-        intent_str = chain_result.get("intent", '{}')
-        intent_str = clean_json_response(intent_str)
-        
-        try:
-            intent_data = json.loads(intent_str) if intent_str.strip() else {}
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse intent JSON: {e}")
-            intent_data = {}
-        
-        chart_type = intent_data.get("chart_type", "none")
-        sql_query = chain_result.get("sql_query", "")
-        sql_result_str = chain_result.get("sql_result", "[]")
-        
-        final_response_str = chain_result.get("final_response", '{}')
-        final_response_str = clean_json_response(final_response_str)
-        
-        try:
-            final_response_data = json.loads(final_response_str) if final_response_str.strip() else {}
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse final_response JSON: {e}")
-            final_response_data = {}
-        
-        natural_language_response = final_response_data.get("natural_language_response", "")
-        chart_data = final_response_data.get("chart_data", [])
-
-        try:
-            result_list = json.loads(sql_result_str)
-        except (json.JSONDecodeError, TypeError):
-            result_list = [{"result": sql_result_str}]
-
-        db = get_db()
-        table_names = db.get_usable_table_names()
-        used_tables = [name for name in table_names if name in sql_query]
-
-        return QueryResponse(
-            sql_query=sql_query,
-            table_names=used_tables,
-            result=result_list,
-            natural_language_response=natural_language_response,
-            chart_type=chart_type,
-            chart_data=chart_data,
+        return await _run_query_pipeline(
+            request.question,
+            request.language,
+            use_vector_context=request.use_vector_context,
+            top_k=request.top_k,
+            ignore_vector_errors=False,
         )
     except Exception as e:
         print(f"Hybrid query error: {e}")
@@ -0,0 +1,368 @@
+import datetime
+import decimal
+import json
+import os
+import re
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 생성된 SQL 실행 제한 (행 수, 결과 크기, 실행 시간)
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "1000"))
+SQL_MAX_BYTES = int(os.getenv("SQL_MAX_BYTES", str(5 * 1024 * 1024)))
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "15000"))
+SQL_FETCH_SIZE = 500
+
+# 답변 프롬프트에 넣는 SQL 결과의 토큰 예산
+ANSWER_PROMPT_RESULT_TOKENS = int(os.getenv("ANSWER_PROMPT_RESULT_TOKENS", "1000"))
+# 답변 프롬프트에서 셀 값 / 요약의 상위 값을 자르는 길이(글자)
+PROMPT_CELL_CHARS = 200
+PROMPT_TOP_VALUE_CHARS = 40
+
+# ============================================
+# SQL 실행 결과 (구조화된 행)
+# ============================================
+
+def _to_jsonable(value):
+    """드라이버가 반환한 값을 JSON으로 그대로 내보낼 수 있는 값으로 변환합니다."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _to_jsonable(item) for key, item in value.items()}
+    return str(value)
+
+def make_result(columns=None, rows=None, error=None, truncated=False) -> dict:
+    """
+    SQL 실행 결과 dict
+
+    - columns: 컬럼 이름 리스트
+    - rows: 행 리스트 (각 행은 columns 순서의 값 리스트)
+    - error: 실행 실패 시 오류 메시지, 성공하면 None
+    - truncated: 행 수/크기 제한 때문에 일부 행만 가져온 경우 True
+    """
+    rows = rows or []
+    return {"columns": list(columns or []), "rows": rows, "row_count": len(rows), "error": error, "truncated": truncated}
+
+_QUERY_PREFIX = re.compile(r"^\s*(\(\s*)*(select|with|values|table)\b", re.IGNORECASE)
+
+def _is_query(sql: str) -> bool:
+    """서버 측 커서(DECLARE ... CURSOR)로 실행할 수 있는 조회문인지 확인합니다."""
+    return bool(_QUERY_PREFIX.match(sql))
+
+def strip_sql(sql: str) -> str:
+    """끝의 세미콜론과 공백을 제거합니다 (서브쿼리로 감쌀 수 있도록)."""
+    return sql.strip().rstrip(";").strip()
+
+def _fetch_result(cursor_result, max_rows: int, max_bytes: int) -> dict:
+    """커서에서 SQL_FETCH_SIZE 행씩 읽어 max_rows 행 / max_bytes 바이트 제한 안의 결과를 만듭니다."""
+    columns = list(cursor_result.keys())
+    rows, size, truncated = [], 0, False
+    while not truncated:
+        chunk = cursor_result.fetchmany(SQL_FETCH_SIZE)
+        if not chunk:
+            break
+        for row in chunk:
+            if len(rows) >= max_rows:
+                truncated = True
+                break
+            values = [_to_jsonable(value) for value in row]
+            size += len(json.dumps(values, ensure_ascii=False))
+            if size > max_bytes and rows:
+                truncated = True
+                break
+            rows.append(values)
+    cursor_result.close()
+    return make_result(columns, rows, truncated=truncated)
+
+def run_sql(db, sql: str, max_rows: int = None, max_bytes: int = None, timeout_ms: int = None) -> dict:
+    """
+    SQL을 실행하고 커서에서 바로 컬럼 이름과 행을 꺼내 구조화된 결과로 반환합니다.
+
+    SQLDatabase.run처럼 결과를 파이썬 repr 문자열로 만들지 않으므로
+    다시 파싱할 필요가 없고, 값은 JSON으로 내보낼 수 있는 타입으로 변환됩니다.
+
+    PostgreSQL에서는 조회문을 서버 측(named) 커서로 실행하여 SQL_FETCH_SIZE 행씩 가져오고,
+    max_rows 행 또는 max_bytes 바이트(JSON 기준 추정치)에 도달하면 나머지를 읽지 않고 멈춥니다.
+    statement_timeout도 트랜잭션 단위로 적용됩니다.
+    """
+    max_rows = SQL_MAX_ROWS if max_rows is None else max_rows
+    max_bytes = SQL_MAX_BYTES if max_bytes is None else max_bytes
+    timeout_ms = SQL_STATEMENT_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    is_postgres = db.dialect == "postgresql"
+
+    try:
+        with db._engine.begin() as connection:
+            if is_postgres and timeout_ms:
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+            if is_postgres and _is_query(sql):
+                connection = connection.execution_options(stream_results=True, max_row_buffer=SQL_FETCH_SIZE)
+            cursor_result = connection.exec_driver_sql(sql)
+            if not cursor_result.returns_rows:
+                return make_result()
+            return _fetch_result(cursor_result, max_rows, max_bytes)
+    except Exception as e:
+        return make_result(error=f"Error executing query: {str(e)}")
+
+def run_prepared(db, statement_name: str, template: str, params, max_rows: int = None,
+                 max_bytes: int = None, timeout_ms: int = None) -> dict:
+    """
+    $1, $2 ... 자리표시자가 있는 SQL 템플릿을 서버 측 prepared statement로 실행합니다.
+
+    템플릿은 LIMIT max_rows + 1로 감싸 커넥션마다 한 번만 PREPARE하고, 이후에는 EXECUTE만 보내므로
+    파싱/계획 비용 없이 실행됩니다. 같은 커넥션에서 준비된 이름은 커넥션의 info에 기록합니다.
+    PostgreSQL 전용입니다.
+    """
+    max_rows = SQL_MAX_ROWS if max_rows is None else max_rows
+    max_bytes = SQL_MAX_BYTES if max_bytes is None else max_bytes
+    timeout_ms = SQL_STATEMENT_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    name = f"{statement_name}_{int(max_rows)}"
+    try:
+        with db._engine.begin() as connection:
+            if timeout_ms:
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+            prepared = connection.info.setdefault("prepared_statements", set())
+            if name not in prepared:
+                connection.exec_driver_sql(
+                    f"PREPARE {name} AS SELECT * FROM ({template}) AS limited_result LIMIT {int(max_rows) + 1}"
+                )
+                prepared.add(name)
+            placeholders = ", ".join(["%s"] * len(params))
+            execute_sql = f"EXECUTE {name}({placeholders})" if params else f"EXECUTE {name}"
+            cursor_result = connection.exec_driver_sql(execute_sql, tuple(params))
+            return _fetch_result(cursor_result, max_rows, max_bytes)
+    except Exception as e:
+        return make_result(error=f"Error executing query: {str(e)}")
+
+# ============================================
+# 결과 페이지네이션
+# ============================================
+
+class ResultStore:
+    """
+    결과 토큰 → (정제된 SQL, 컬럼 수) 저장소 (LRU + TTL)
+
+    /query 응답의 result_token으로 LLM 체인을 다시 실행하지 않고 같은 SQL의 다른 페이지를 조회할 수 있습니다.
+    프로세스 내부 저장소이므로 답변 캐시에서 꺼낸 응답에는 저장된 토큰 대신 새 토큰을 발급합니다.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (created_at, sql, column_count)
+        self._lock = threading.Lock()
+
+    def register(self, sql: str, column_count: int = 0) -> str:
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._entries[token] = (time.monotonic(), sql, column_count)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token: str):
+        """(SQL, 컬럼 수) 또는 없거나 만료되었으면 None"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[1], entry[2]
+
+result_store = ResultStore(ttl=float(os.getenv("RESULT_TOKEN_TTL", "3600")))
+
+_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_ORDER_BY_TOKENS = re.compile(r"\(|\)|\border\s+by\b", re.IGNORECASE)
+
+def has_top_level_order_by(sql: str) -> bool:
+    """서브쿼리/윈도 함수가 아닌 최상위 ORDER BY가 있는지 (문자열과 따옴표 식별자 안은 무시)"""
+    depth = 0
+    for match in _ORDER_BY_TOKENS.finditer(_QUOTED.sub("''", sql)):
+        token = match.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            return True
+    return False
+
+def fetch_result_page(db, sql: str, page: int, page_size: int, column_count: int = 0) -> dict:
+    """
+    저장된 SQL의 page번째 페이지(1부터 시작)를 조회합니다.
+
+    SQL을 서브쿼리로 감싸 LIMIT/OFFSET을 적용하며, 다음 페이지 존재 여부를 알기 위해 한 행을 더 읽습니다.
+    페이지마다 SQL을 다시 실행하므로 SQL에 ORDER BY가 없으면 모든 컬럼 순서(ORDER BY 1..n)로 정렬해
+    페이지가 겹치거나 행이 빠지지 않게 합니다. 정렬할 수 없는 타입(json 등)이면 정렬 없이 다시 실행합니다.
+    SQL_MAX_BYTES에 걸려 페이지가 짧게 끝나면 truncated와 has_more가 True입니다.
+    """
+    base_sql = f"SELECT * FROM ({strip_sql(sql)}) AS paged_result"
+    limit = f" LIMIT {int(page_size) + 1} OFFSET {(int(page) - 1) * int(page_size)}"
+    result = None
+    if column_count and not has_top_level_order_by(sql):
+        order_by = " ORDER BY " + ", ".join(str(i) for i in range(1, int(column_count) + 1))
+        result = run_sql(db, base_sql + order_by + limit, max_rows=page_size + 1)
+    if result is None or "ordering operator" in (result["error"] or ""):
+        result = run_sql(db, base_sql + limit, max_rows=page_size + 1)
+    truncated = result["truncated"]
+    has_more = truncated or len(result["rows"]) > page_size
+    if len(result["rows"]) > page_size:
+        result = make_result(result["columns"], result["rows"][:page_size], result["error"], truncated)
+    result["has_more"] = has_more
+    return result
+
+def result_to_records(result: dict) -> list:
+    """구조화된 결과를 QueryResponse.result 형식(컬럼명 → 값 dict 리스트)으로 변환합니다."""
+    if result.get("error"):
+        return [{"error": result["error"]}]
+    columns = result["columns"]
+    return [dict(zip(columns, row)) for row in result["rows"]]
+
+def _clip(text: str, limit: int = None) -> str:
+    """limit 글자를 넘는 문자열을 잘라 …로 표시합니다 (limit이 없으면 그대로)."""
+    if limit is None or len(text) <= limit:
+        return text
+    return text[:max(limit - 1, 0)] + "…"
+
+def format_result_for_prompt(result: dict, max_chars: int = 4000, max_cell_chars: int = None) -> str:
+    """
+    LLM 프롬프트에 넣을 간결한 표 형식 문자열 (최대 max_chars 글자)
+
+    헤더 한 줄과 ' | '로 구분된 행들로 구성하며, 길이를 넘는 행은 생략하고 생략된 행 수를 표시합니다.
+    max_cell_chars를 주면 긴 셀 값은 그 길이로 자릅니다.
+    """
+    if result.get("error"):
+        return result["error"]
+    if not result["columns"]:
+        return "(no rows returned)"
+    if not result["rows"]:
+        return " | ".join(result["columns"]) + "\n(0 rows)"
+
+    lines = [" | ".join(result["columns"])]
+    length = len(lines[0])
+    shown = 0
+    for row in result["rows"]:
+        line = " | ".join("NULL" if value is None else _clip(str(value), max_cell_chars) for value in row)
+        if length + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        length += len(line) + 1
+        shown += 1
+
+    omitted = result["row_count"] - shown
+    if omitted > 0:
+        lines.append(f"... ({omitted} more rows omitted, {result['row_count']} rows total)")
+    if result.get("truncated"):
+        lines.append(f"... (result truncated by the server after {result['row_count']} rows)")
+    return "\n".join(lines)
+
+# ============================================
+# 답변 프롬프트용 결과 요약
+# ============================================
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken이 없거나 인코딩 파일을 받을 수 없는 환경
+    _encoding = None
+
+def estimate_tokens(text: str) -> int:
+    """프롬프트 토큰 수 (tiktoken이 없으면 4글자당 1토큰으로 추정)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def _fit_rows(result: dict, token_budget: int):
+    """token_budget 안에 들어가는 만큼의 앞쪽 행을 표 형식으로 렌더링합니다 (한 행도 안 들어가면 None)."""
+    max_chars = max(token_budget * 4, 1)
+    while max_chars >= 20:
+        table = format_result_for_prompt(result, max_chars=max_chars, max_cell_chars=PROMPT_CELL_CHARS)
+        if estimate_tokens(table) <= token_budget:
+            lines = table.split("\n")
+            # 헤더 다음 줄이 생략 표시면 한 행도 들어가지 않은 것
+            return None if len(lines) < 2 or lines[1].startswith("... (") else table
+        max_chars //= 2
+    return None
+
+def summarize_result(result: dict, top_n: int = 3) -> str:
+    """
+    결과 전체에 대한 컬럼별 통계 요약
+
+    - 숫자 컬럼: 합계, 평균, 최소, 최대, NULL 수 (NumPy/pandas 벡터 연산)
+    - 그 외 컬럼: 고유값 수, 상위 top_n 값과 빈도
+    """
+    df = pd.DataFrame(result["rows"], columns=result["columns"])
+    lines = [f"Total rows: {len(df)}" + (" (server row limit reached; more rows exist)" if result.get("truncated") else "")]
+    for column in df.columns:
+        series = df[column]
+        numeric = pd.to_numeric(series, errors="coerce")
+        nulls = int(series.isna().sum())
+        if series.notna().any() and numeric.notna().sum() == series.notna().sum():
+            values = numeric.to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            lines.append(
+                f"- {column} (numeric): sum={values.sum():.6g}, mean={values.mean():.6g}, "
+                f"min={values.min():.6g}, max={values.max():.6g}, nulls={nulls}"
+            )
+        else:
+            counts = series.astype("string").value_counts(dropna=True)
+            top = ", ".join(f"{_clip(value, PROMPT_TOP_VALUE_CHARS)} ({count})"
+                            for value, count in counts.head(top_n).items())
+            lines.append(f"- {column}: distinct={len(counts)}, nulls={nulls}, top: {top}")
+    return "\n".join(lines)
+
+def _fit_summary(summary: str, token_budget: int) -> str:
+    """요약이 token_budget을 넘으면 뒤쪽 컬럼 줄부터 빼고 뺀 컬럼 수를 표시합니다."""
+    if estimate_tokens(summary) <= token_budget:
+        return summary
+    lines = summary.split("\n")
+    for keep in range(len(lines) - 1, 0, -1):
+        trimmed = "\n".join(lines[:keep] + [f"- ... ({len(lines) - keep} more columns omitted)"])
+        if estimate_tokens(trimmed) <= token_budget:
+            return trimmed
+    return _clip(lines[0], token_budget * 4)
+
+def compact_result_for_prompt(result: dict, token_budget: int = None) -> str:
+    """
+    SQL 결과를 답변 프롬프트의 토큰 예산에 맞게 압축합니다.
+
+    전체 표가 예산 안에 들어가면 그대로 사용하고, 넘으면 컬럼 통계 요약과
+    남은 예산에 들어가는 앞쪽 행들만 LLM에 전달합니다.
+    긴 셀 값과 상위 값은 잘라서 표시하며, 반환 문자열은 항상 token_budget 이내입니다.
+    """
+    token_budget = ANSWER_PROMPT_RESULT_TOKENS if token_budget is None else token_budget
+    if result.get("error") or not result["rows"]:
+        return format_result_for_prompt(result)
+
+    full_table = format_result_for_prompt(result, max_chars=token_budget * 8, max_cell_chars=PROMPT_CELL_CHARS)
+    if estimate_tokens(full_table) <= token_budget and "more rows omitted" not in full_table:
+        return full_table
+
+    summary = _fit_summary("Summary of the full result:\n" + summarize_result(result), token_budget)
+    header = "\n\nFirst rows:\n"
+    rows = _fit_rows(result, token_budget - estimate_tokens(summary + header))
+    if rows and estimate_tokens(summary + header + rows) <= token_budget:
+        return summary + header + rows
+    return summary
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Any, Dict, Optional
 
 class QueryRequest(BaseModel):
@@ -12,6 +12,33 @@ class QueryResponse(BaseModel):
     natural_language_response: str
     chart_type: Optional[str] = None
     chart_data: Optional[List[Dict[str, Any]]] = None
+    result_token: Optional[str] = None  # /query/results/{token}?page=N 로 전체 결과를 페이지 단위 조회
+    truncated: bool = False  # 행 수/크기 제한으로 result에 일부 행만 담긴 경우 True
+
+# 배치 질의 스키마
+# 배치 요청 한도 (범위를 벗어나면 스트리밍을 시작하기 전에 422)
+BATCH_MAX_QUERIES = 100
+BATCH_MAX_CONCURRENCY = 16
+BATCH_MAX_TOP_K = 20
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest] = Field(..., max_length=BATCH_MAX_QUERIES)
+    max_concurrency: int = Field(4, ge=1, le=BATCH_MAX_CONCURRENCY)  # 동시에 실행할 LLM 체인 수
+    top_k: int = Field(3, ge=1, le=BATCH_MAX_TOP_K)
+
+class BatchQueryItem(BaseModel):
+    index: int  # 요청의 queries 안에서의 위치
+    response: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+class ResultPageResponse(BaseModel):
+    result_token: str
+    page: int
+    page_size: int
+    columns: List[str]
+    result: List[Dict[str, Any]]
+    has_more: bool
+    truncated: bool = False  # SQL_MAX_BYTES에 걸려 이 페이지의 일부 행만 담김 (page_size를 줄여 다시 조회)
 
 # 벡터 검색 스키마
 class VectorSearchRequest(BaseModel):
@@ -28,3 +55,18 @@ class HybridSearchRequest(BaseModel):
     language: Optional[str] = "한국어"
     use_vector_context: Optional[bool] = True
     top_k: Optional[int] = 3
+
+class MultiVectorSearchRequest(BaseModel):
+    query: str
+    # 테이블별 반환할 결과 수 ('film', 'actor', 'customer', 'category')
+    top_k: Dict[str, int] = {"film": 5, "actor": 5, "customer": 5}
+
+class TableSearchResult(BaseModel):
+    results: List[Dict[str, Any]]
+    count: int
+    elapsed_ms: float
+
+class MultiVectorSearchResponse(BaseModel):
+    results: Dict[str, TableSearchResult]
+    embedding_ms: float
+    query_ms: float
@@ -0,0 +1,190 @@
+"""
+생성된 SQL 템플릿 캐시
+
+리터럴만 다른 질문("'R' 등급 영화" vs "'PG' 등급 영화", "상위 5개" vs "상위 10개")은 같은 SQL 구조를 가집니다.
+질문에서 리터럴(따옴표 문자열, 날짜, 숫자)을 뽑아 자리표시자로 바꾼 문장을 키로 하고,
+정제된 SQL에서 같은 리터럴을 $1, $2 ... 로 바꾼 템플릿을 저장합니다.
+같은 구조의 질문이 다시 오면 SQL 생성 LLM 호출 없이 템플릿을 서버 측 prepared statement로 실행합니다.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from .cache import normalize_question
+
+load_dotenv()
+
+SQL_TEMPLATE_CACHE = os.getenv("SQL_TEMPLATE_CACHE", "true").lower() == "true"
+SQL_TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("SQL_TEMPLATE_CACHE_MAX_ENTRIES", "1000"))
+
+# 따옴표 문자열 → 날짜 → 숫자 순서로 매칭 ("5개", "2006년"처럼 뒤에 글자가 붙은 숫자도 포함)
+_QUESTION_LITERAL = re.compile(
+    r"'(?P<single>[^']*)'|\"(?P<double>[^\"]*)\"|[‘“](?P<curly>[^’”]*)[’”]"
+    r"|(?P<date>\b\d{4}-\d{2}-\d{2}\b)"
+    r"|(?<![\w.])(?P<number>\d+(?:\.\d+)?)(?![\d.])"
+)
+_PARAMETER = re.compile(r"\$(\d+)")
+
+
+def extract_literals(question: str):
+    """
+    질문에서 리터럴을 뽑아 (자리표시자로 바꾼 질문, 리터럴 리스트)를 반환합니다.
+    숫자는 문자열 그대로 보관하여 SQL에서 같은 표기를 찾습니다.
+    """
+    literals = []
+
+    def replace(match):
+        if match.group("number") is not None:
+            literals.append(("number", match.group("number")))
+            return "<num>"
+        value = next(group for group in (match.group("single"), match.group("double"),
+                                         match.group("curly"), match.group("date")) if group is not None)
+        literals.append(("string", value))
+        return "<str>"
+
+    return _QUESTION_LITERAL.sub(replace, question), literals
+
+
+def _sql_literal(kind: str, value: str) -> str:
+    return value if kind == "number" else "'" + value.replace("'", "''") + "'"
+
+
+def _outside_quotes(sql: str, position: int) -> bool:
+    # ''로 이스케이프된 따옴표는 개수가 짝수이므로 홀짝만으로 문자열 안인지 판단할 수 있다
+    return sql.count("'", 0, position) % 2 == 0
+
+
+def parameterize_sql(sql: str, literals) -> str:
+    """
+    SQL에서 질문의 리터럴을 $1, $2 ... 로 바꾼 템플릿을 반환합니다.
+
+    각 리터럴이 SQL에 정확히 한 번(숫자는 문자열 밖에서) 나타나고 서로 다른 경우에만 템플릿을 만들고,
+    그렇지 않으면 어느 위치를 바꿔야 할지 확실하지 않으므로 None을 반환합니다.
+    """
+    if "$" in sql or len(set(literals)) != len(literals):
+        return None
+    replacements = []
+    for index, (kind, value) in enumerate(literals, 1):
+        if kind == "number":
+            pattern = re.compile(r"(?<![\w.'$])" + re.escape(value) + r"(?![\w.'])")
+            positions = [m.span() for m in pattern.finditer(sql) if _outside_quotes(sql, m.start())]
+        else:
+            literal = _sql_literal(kind, value)
+            positions = [m.span() for m in re.finditer(re.escape(literal), sql)]
+        if len(positions) != 1:
+            return None
+        replacements.append((positions[0], f"${index}"))
+
+    template = sql
+    for (start, end), placeholder in sorted(replacements, reverse=True):
+        template = template[:start] + placeholder + template[end:]
+    return template
+
+
+def render_sql(template: str, literals) -> str:
+    """템플릿의 $n 자리에 리터럴을 SQL 표기로 넣은 SQL (응답 표시, 페이지 조회용)"""
+    return _PARAMETER.sub(lambda m: _sql_literal(*literals[int(m.group(1)) - 1]), template)
+
+
+class SQLTemplateHit:
+    """템플릿 캐시 조회 결과"""
+
+    def __init__(self, statement_name: str, template: str, literals):
+        self.statement_name = statement_name
+        self.template = template
+        self.params = [value for _, value in literals]
+        self.sql = render_sql(template, literals)
+
+
+class SQLTemplateCache:
+    """
+    (리터럴을 자리표시자로 바꾼 정규화된 질문) → SQL 템플릿 LRU 캐시
+
+    스키마가 바뀌면 clear()로 비우며, 세대 번호가 바뀌므로 커넥션에 남아 있는
+    이전 prepared statement 이름도 더 이상 사용되지 않습니다.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (statement_name, template, literal kinds)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._rejected = 0
+
+    @staticmethod
+    def _key(question_template: str) -> str:
+        return hashlib.sha256(normalize_question(question_template).encode("utf-8")).hexdigest()
+
+    def lookup(self, question: str):
+        """같은 구조의 질문이 캐시되어 있으면 SQLTemplateHit, 아니면 None"""
+        question_template, literals = extract_literals(question)
+        key = self._key(question_template)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] != [kind for kind, _ in literals]:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return SQLTemplateHit(entry[0], entry[1], literals)
+
+    def peek(self, question: str):
+        """통계를 바꾸지 않는 lookup (SQL 실행 단계에서 템플릿 사용 여부 확인용)"""
+        question_template, literals = extract_literals(question)
+        with self._lock:
+            entry = self._entries.get(self._key(question_template))
+        if entry is None or entry[2] != [kind for kind, _ in literals]:
+            return None
+        return SQLTemplateHit(entry[0], entry[1], literals)
+
+    def store(self, question: str, sql: str) -> bool:
+        """성공적으로 실행된 SQL을 템플릿으로 저장합니다. 템플릿으로 만들 수 없으면 False."""
+        question_template, literals = extract_literals(question)
+        template = parameterize_sql(sql, literals)
+        with self._lock:
+            if template is None:
+                self._rejected += 1
+                return False
+            key = self._key(question_template)
+            statement_name = f"sqltpl_{self._generation}_{key[:16]}"
+            self._entries[key] = (statement_name, template, [kind for kind, _ in literals])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._stores += 1
+        return True
+
+    def discard(self, question: str):
+        """실행에 실패한 템플릿을 제거합니다."""
+        question_template, _ = extract_literals(question)
+        with self._lock:
+            self._entries.pop(self._key(question_template), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "generation": self._generation,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "stored": self._stores,
+                "rejected": self._rejected,
+            }
+
+
+sql_template_cache = SQLTemplateCache(max_entries=SQL_TEMPLATE_CACHE_MAX_ENTRIES)
@@ -0,0 +1,282 @@
+"""
+프로세스 내부 벡터 검색 인덱스 (NumPy)
+
+임베딩 테이블마다 L2 정규화한 float32 행렬을 파일로 저장해 두고 메모리 맵으로 열어,
+질문 임베딩과의 내적(= 코사인 유사도)으로 top-k를 계산합니다.
+영화 1000편, 배우 200명 규모에서는 Postgres 왕복 없이 전체를 비교하는 편이 빠르고 결과도 정확합니다.
+행 수가 VECTOR_INDEX_HNSW_MIN_ROWS 이상이고 hnswlib이 설치되어 있으면 HNSW 그래프를 함께 만들어 사용합니다.
+
+스냅샷 파일 (VECTOR_INDEX_DIR/{이름}.*):
+- .{버전}.f32: (행 수, 차원) float32 행렬 (정규화됨)
+- .{버전}.hnsw: HNSW 그래프 (선택)
+- .json: 현재 버전의 행렬/그래프 파일 이름, 차원, 행 수, 생성 시각, 행별 반환 컬럼(payload)
+
+임베딩 생성 스크립트가 Postgres에 쓴 뒤 refresh_vector_indexes()로 스냅샷을 다시 만들고,
+검색하는 프로세스는 .json 파일이 바뀐 것을 보고 다시 엽니다.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from psycopg2.extras import RealDictCursor
+
+from .db import get_pool
+
+load_dotenv()
+
+# 벡터 검색 백엔드: pgvector (Postgres에서 검색) | numpy (프로세스 내부 인덱스)
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "pgvector").lower()
+# 스냅샷 파일을 저장할 디렉터리
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", ".vector_index")
+# 스냅샷 파일이 바뀌었는지 확인하는 간격(초)
+VECTOR_INDEX_CHECK_INTERVAL = float(os.getenv("VECTOR_INDEX_CHECK_INTERVAL", "5"))
+# 이 행 수 이상이면 HNSW 그래프 사용 (hnswlib 설치 필요)
+VECTOR_INDEX_HNSW_MIN_ROWS = int(os.getenv("VECTOR_INDEX_HNSW_MIN_ROWS", "100000"))
+# HNSW 검색 시 후보 목록 크기 (클수록 정확하고 느림)
+VECTOR_INDEX_HNSW_EF = int(os.getenv("VECTOR_INDEX_HNSW_EF", "64"))
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+# 인덱스 이름 → 스냅샷 쿼리 (embedding 외의 컬럼은 검색 결과로 그대로 반환)
+# 반환 컬럼은 chains.py의 pgvector 검색 함수와 같습니다. (halfvec 저장이어도 float32로 읽음)
+SNAPSHOT_QUERIES = {
+    "unified": """
+        SELECT source_table, source_id, content, metadata, embedding::vector AS embedding
+        FROM unified_embeddings
+        ORDER BY source_table, source_id
+    """,
+    "film": """
+        SELECT fe.film_id, fe.content, f.title, f.description, f.release_year, f.rating, fe.embedding::vector AS embedding
+        FROM film_embeddings fe
+        JOIN film f ON fe.film_id = f.film_id
+        ORDER BY fe.film_id
+    """,
+    "actor": """
+        SELECT ae.actor_id, ae.content, a.first_name, a.last_name, ae.embedding::vector AS embedding
+        FROM actor_embeddings ae
+        JOIN actor a ON ae.actor_id = a.actor_id
+        ORDER BY ae.actor_id
+    """,
+    "customer": """
+        SELECT ce.customer_id, ce.content, c.first_name, c.last_name, c.email, ce.embedding::vector AS embedding
+        FROM customer_embeddings ce
+        JOIN customer c ON ce.customer_id = c.customer_id
+        ORDER BY ce.customer_id
+    """,
+    "category": """
+        SELECT cae.category_id, cae.content, ca.name, cae.embedding::vector AS embedding
+        FROM category_embeddings cae
+        JOIN category ca ON cae.category_id = ca.category_id
+        ORDER BY cae.category_id
+    """,
+}
+
+
+def _paths(name: str, directory: str):
+    base = os.path.join(directory, name)
+    return {"matrix": base + ".f32", "meta": base + ".json", "hnsw": base + ".hnsw"}
+
+
+def _versioned_files(name: str, directory: str):
+    """디렉터리에 있는 이 스냅샷의 버전별 파일 이름 ({이름}.{버전}.f32 / .hnsw)"""
+    pattern = re.compile(re.escape(name) + r"\.(\d+)\.(f32|hnsw)$")
+    files = []
+    for entry in os.listdir(directory):
+        match = pattern.match(entry)
+        if match:
+            files.append((match.group(1), entry))
+    return files
+
+
+def _read_meta(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def write_snapshot(name: str, payloads, embeddings, directory: str = None):
+    """
+    payload 리스트와 임베딩 행렬을 스냅샷 파일로 저장합니다.
+
+    행렬과 HNSW 그래프는 새 버전 이름({이름}.{버전}.f32 / .hnsw)으로 쓰고, 이 파일 이름을 담은
+    .json을 마지막에 os.replace로 바꿉니다. 읽는 프로세스는 .json 하나만 보고 파일을 고르므로
+    이전 버전 또는 새 버전의 파일 묶음 중 하나만 엽니다. 바로 이전 버전의 파일은 .json을 막 읽은
+    프로세스를 위해 남겨 두고, 그보다 오래된 버전은 지웁니다.
+    """
+    directory = directory or VECTOR_INDEX_DIR
+    os.makedirs(directory, exist_ok=True)
+    paths = _paths(name, directory)
+    matrix = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(payloads), -1))
+    previous = _read_meta(paths["meta"]) or {}
+    version = str(time.time_ns())
+
+    matrix_file = f"{name}.{version}.f32"
+    matrix.tofile(os.path.join(directory, matrix_file))
+
+    hnsw_file = None
+    if hnswlib is not None and len(payloads) >= VECTOR_INDEX_HNSW_MIN_ROWS:
+        graph = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        graph.init_index(max_elements=len(payloads), ef_construction=200, M=16)
+        graph.add_items(matrix, np.arange(len(payloads)))
+        hnsw_file = f"{name}.{version}.hnsw"
+        graph.save_index(os.path.join(directory, hnsw_file))
+
+    meta = {"rows": len(payloads), "dims": int(matrix.shape[1]), "hnsw": hnsw_file is not None,
+            "matrix_file": matrix_file, "hnsw_file": hnsw_file, "version": version,
+            "built_at": time.time(), "payloads": payloads}
+    with open(paths["meta"] + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, default=str)
+    os.replace(paths["meta"] + ".tmp", paths["meta"])
+
+    # 이전 형식(버전 없는 .f32 / .hnsw)과 바로 이전 버전보다 오래된 파일 정리
+    keep = {version, previous.get("version")}
+    stale = [entry for file_version, entry in _versioned_files(name, directory) if file_version not in keep]
+    if previous and "version" in previous:
+        stale += [os.path.basename(paths["matrix"]), os.path.basename(paths["hnsw"])]
+    for entry in stale:
+        try:
+            os.remove(os.path.join(directory, entry))
+        except FileNotFoundError:
+            pass
+
+
+def build_snapshot(name: str, directory: str = None) -> int:
+    """Postgres에서 임베딩 테이블을 읽어 스냅샷을 다시 만들고 행 수를 반환합니다."""
+    with get_pool().connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(SNAPSHOT_QUERIES[name])
+        rows = cur.fetchall()
+    embeddings = [row.pop("embedding") for row in rows]
+    write_snapshot(name, [dict(row) for row in rows], embeddings, directory)
+    return len(rows)
+
+
+class VectorIndex:
+    """스냅샷 하나를 메모리 맵으로 열어 top-k 내적 검색을 수행합니다."""
+
+    def __init__(self, name: str, directory: str = None):
+        directory = directory or VECTOR_INDEX_DIR
+        paths = _paths(name, directory)
+        self.name = name
+        self.meta_path = paths["meta"]
+        self.mtime = os.stat(self.meta_path).st_mtime_ns
+        with open(self.meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        # .json이 가리키는 버전의 파일을 엶 (버전이 없는 이전 형식 스냅샷이면 고정 이름)
+        matrix_path = os.path.join(directory, meta["matrix_file"]) if meta.get("matrix_file") else paths["matrix"]
+        hnsw_path = os.path.join(directory, meta["hnsw_file"]) if meta.get("hnsw_file") else paths["hnsw"]
+        self.payloads = meta["payloads"]
+        self.dims = meta["dims"]
+        self.matrix = (np.memmap(matrix_path, dtype=np.float32, mode="r", shape=(meta["rows"], self.dims))
+                       if meta["rows"] else np.empty((0, self.dims), dtype=np.float32))
+        self.graph = None
+        if meta.get("hnsw") and hnswlib is not None:
+            self.graph = hnswlib.Index(space="ip", dim=self.dims)
+            self.graph.load_index(hnsw_path, max_elements=meta["rows"])
+            self.graph.set_ef(VECTOR_INDEX_HNSW_EF)
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def column(self, key: str) -> np.ndarray:
+        """payload 컬럼 값 배열 (필터용, 처음 사용할 때 만듦)"""
+        values = self._columns.get(key)
+        if values is None:
+            values = self._columns[key] = np.array([payload.get(key) for payload in self.payloads], dtype=object)
+        return values
+
+    def search(self, query_embedding, top_k: int = 5, where: dict = None):
+        """
+        코사인 유사도가 높은 순서로 top_k개 payload를 반환합니다 (각 항목에 similarity 추가).
+
+        where: {컬럼: 값} 일치 조건 (예: {"source_table": "film"})
+        """
+        if not len(self) or top_k <= 0:
+            return []
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        mask = None
+        for key, value in (where or {}).items():
+            matches = self.column(key) == value
+            mask = matches if mask is None else mask & matches
+
+        if self.graph is not None:
+            k = min(top_k, len(self) if mask is None else int(mask.sum()))
+            if k == 0:
+                return []
+            labels, distances = self.graph.knn_query(
+                query, k=k, filter=None if mask is None else (lambda label: bool(mask[label])))
+            # ip 공간의 거리는 1 - 내적
+            indices, scores = labels[0], 1.0 - distances[0]
+        else:
+            scores = self.matrix @ query
+            if mask is not None:
+                scores = np.where(mask, scores, -np.inf)
+            k = min(top_k, len(self))
+            indices = np.argpartition(-scores, k - 1)[:k]
+            indices = indices[np.argsort(-scores[indices])]
+            if mask is not None:
+                indices = indices[mask[indices]]
+            scores = scores[indices]
+
+        return [{**self.payloads[i], "similarity": float(score)} for i, score in zip(indices, scores)]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_last_checked = {}
+
+
+def get_index(name: str) -> VectorIndex:
+    """
+    이름에 해당하는 인덱스를 반환합니다.
+
+    스냅샷이 없으면 Postgres에서 만들고, VECTOR_INDEX_CHECK_INTERVAL초마다
+    스냅샷 파일이 바뀌었는지 확인해 다른 프로세스가 갱신한 내용을 다시 엽니다.
+    """
+    index = _indexes.get(name)
+    now = time.monotonic()
+    if index is not None and now - _last_checked.get(name, 0.0) < VECTOR_INDEX_CHECK_INTERVAL:
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(name)
+        _last_checked[name] = now
+        meta_path = _paths(name, VECTOR_INDEX_DIR)["meta"]
+        if not os.path.exists(meta_path):
+            build_snapshot(name)
+        if index is None or os.stat(meta_path).st_mtime_ns != index.mtime:
+            index = _indexes[name] = VectorIndex(name)
+    return index
+
+
+def refresh_vector_indexes(names=None):
+    """임베딩 테이블이 바뀐 뒤 호출합니다. 스냅샷을 다시 만들고 이 프로세스의 인덱스를 다시 엽니다."""
+    for name in names or SNAPSHOT_QUERIES:
+        rows = build_snapshot(name)
+        with _indexes_lock:
+            _indexes.pop(name, None)
+        print(f"✓ Refreshed vector index '{name}' ({rows} rows)")
+
+
+def vector_index_stats() -> dict:
+    """모니터링용: 열려 있는 인덱스별 행 수와 HNSW 사용 여부"""
+    return {
+        "backend": VECTOR_SEARCH_BACKEND,
+        "indexes": {name: {"rows": len(index), "dims": index.dims, "hnsw": index.graph is not None}
+                    for name, index in list(_indexes.items())},
+    }
@@ -0,0 +1,77 @@
+"""
+pgvector 인덱스 재현율/지연 시간 벤치마크
+
+임베딩 테이블 하나에 지정한 방식(ivfflat / HNSW)의 인덱스를 만들고, 저장된 임베딩을 질문으로 사용해
+ivfflat.probes / hnsw.ef_search 값별 recall@k와 평균 지연 시간을 인덱스 없는 정확한 검색과 비교합니다.
+목표 재현율별로 인덱스 관리자가 고르는 값도 함께 출력합니다.
+끝나면 인덱스 관리자의 기본 계획으로 되돌립니다 (--keep이면 그대로 둠).
+.env의 PostgreSQL 설정을 사용하며, 먼저 `python -m app.embeddings`로 임베딩을 채워야 합니다.
+
+사용법:
+    python -m benchmarks.ann_indexes --table unified_embeddings_film --method hnsw
+    python -m benchmarks.ann_indexes --table film_embeddings --method ivfflat --lists 30 --top-k 10
+"""
+import argparse
+import time
+
+from app.db import get_pool
+from app.index_manager import (
+    EMBEDDING_TABLES, SEARCH_PARAMETERS, calibrate, choose_search_value, manage_vector_indexes, plan_index,
+    rebuild_index,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", choices=EMBEDDING_TABLES, default="unified_embeddings_film")
+    parser.add_argument("--method", choices=("auto", "hnsw", "ivfflat"), default="hnsw")
+    parser.add_argument("--lists", type=int, help="ivfflat lists (기본: 인덱스 관리자 계산값)")
+    parser.add_argument("--m", type=int, help="HNSW m (기본: 인덱스 관리자 계산값)")
+    parser.add_argument("--ef-construction", type=int, help="HNSW ef_construction (기본: 인덱스 관리자 계산값)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="측정한 인덱스를 그대로 둠")
+    args = parser.parse_args()
+
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM {args.table} WHERE embedding IS NOT NULL")
+        rows = cur.fetchone()[0]
+
+    plan = plan_index(rows)
+    if args.method != "auto" and plan["method"] != args.method:
+        # 행 수가 작아도 강제로 해당 방식을 쓰도록, 그 방식이 선택되는 최소 규모의 파라미터로 시작
+        plan = plan_index(10 ** 7) if args.method == "ivfflat" else plan_index(max(rows, 10 ** 4))
+        if args.method == "ivfflat":
+            plan["params"]["lists"] = max(rows // 1000, 1)
+    if args.lists:
+        plan["params"]["lists"] = args.lists
+    if args.m:
+        plan["params"]["m"] = args.m
+    if args.ef_construction:
+        plan["params"]["ef_construction"] = args.ef_construction
+
+    start = time.perf_counter()
+    rebuild_index(args.table, plan)
+    build_seconds = time.perf_counter() - start
+    print(f"{args.table}: {rows} rows, {plan['method']} {plan['params']} built in {build_seconds:.1f}s")
+
+    curve, exact_ms = calibrate(args.table, plan["method"], plan["params"], queries=args.queries, top_k=args.top_k)
+    parameter = SEARCH_PARAMETERS.get(plan["method"], "-")
+    print(f"\n{parameter:>16} | {'recall@' + str(args.top_k):>9} | {'avg ms':>8} | {'vs exact':>8}")
+    print(f"{'exact':>16} | {1.0:>9.3f} | {exact_ms:>8.2f} | {1.0:>7.2f}x")
+    for value, recall, ms in curve:
+        print(f"{value:>16} | {recall:>9.3f} | {ms:>8.2f} | {ms / exact_ms if exact_ms else 0:>7.2f}x")
+
+    print()
+    for target in (0.9, 0.95, 0.99):
+        chosen = choose_search_value(curve, target)
+        if chosen:
+            print(f"target recall {target:.2f} → {parameter} = {chosen[0]} (recall {chosen[1]:.3f}, {chosen[2]:.2f} ms)")
+
+    if not args.keep:
+        print("\nRestoring the index manager's plan...")
+        manage_vector_indexes([args.table], force=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+답변 프롬프트 크기 벤치마크
+
+결과 크기별로 SQL 결과를 답변 프롬프트에 넣는 세 가지 방식의 토큰 수와 처리 시간을 비교합니다.
+- full: 모든 행을 표로 렌더링 (제한 없음)
+- head: 이전 방식 (앞쪽 4000글자까지만)
+- compact: compact_result_for_prompt (컬럼 통계 요약 + 예산 안의 앞쪽 행)
+
+--llm 옵션을 주면 head/compact 프롬프트로 실제 LLM을 호출해 응답 지연도 측정합니다 (OPENAI_API_KEY 필요).
+
+사용법:
+    python -m benchmarks.answer_prompt --sizes 10 100 1000 10000 100000
+    python -m benchmarks.answer_prompt --sizes 100 10000 --llm
+"""
+import argparse
+import random
+import time
+
+from app.results import (
+    ANSWER_PROMPT_RESULT_TOKENS,
+    compact_result_for_prompt,
+    estimate_tokens,
+    format_result_for_prompt,
+    make_result,
+)
+
+QUESTION = "지난 달 카테고리별 매출을 알려줘"
+LEGACY_MAX_CHARS = 4000
+
+
+def make_synthetic_result(rows: int) -> dict:
+    categories = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Family", "Sports"]
+    return make_result(
+        ["payment_id", "category", "customer", "amount", "payment_date"],
+        [
+            [i, random.choice(categories), f"customer {i % 599}", round(random.uniform(0.99, 11.99), 2), f"2005-07-{i % 28 + 1:02d}"]
+            for i in range(rows)
+        ],
+    )
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    return value, (time.perf_counter() - start) * 1000
+
+
+def answer_latency(llm, table: str) -> float:
+    prompt = f"Answer the question using the SQL result.\nQuestion: {QUESTION}\nSQL Result:\n{table}"
+    _, elapsed = timed(llm.invoke, prompt)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000], help="결과 행 수")
+    parser.add_argument("--budget", type=int, default=ANSWER_PROMPT_RESULT_TOKENS, help="compact 방식의 토큰 예산")
+    parser.add_argument("--llm", action="store_true", help="실제 LLM 호출 지연도 측정")
+    args = parser.parse_args()
+
+    llm = None
+    if args.llm:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+
+    header = f"{'rows':>8} | {'mode':<8} | {'tokens':>8} | {'render (ms)':>11}"
+    if llm is not None:
+        header += f" | {'llm (ms)':>9}"
+    print(header)
+    for rows in args.sizes:
+        result = make_synthetic_result(rows)
+        renderings = (
+            ("full", lambda: format_result_for_prompt(result, max_chars=float("inf"))),
+            ("head", lambda: format_result_for_prompt(result, max_chars=LEGACY_MAX_CHARS)),
+            ("compact", lambda: compact_result_for_prompt(result, token_budget=args.budget)),
+        )
+        for mode, render in renderings:
+            table, elapsed = timed(render)
+            line = f"{rows:>8} | {mode:<8} | {estimate_tokens(table):>8} | {elapsed:>11.1f}"
+            if llm is not None:
+                line += f" | {answer_latency(llm, table):>9.0f}" if mode != "full" else f" | {'-':>9}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
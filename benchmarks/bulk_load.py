@@ -0,0 +1,86 @@
+"""
+임베딩 벌크 쓰기 벤치마크
+
+같은 행들을 임시 테이블에 쓰며 기존 방식(execute_values, 벡터를 파이썬 리스트 → SQL 텍스트)과
+바이너리 COPY(float32 버퍼 → 스테이징 테이블 → INSERT ... ON CONFLICT)의 rows/s와
+클라이언트 메모리 사용량(tracemalloc 최대치)을 배치 단위로 비교합니다.
+.env의 PostgreSQL 설정을 사용합니다.
+
+사용법:
+    python -m benchmarks.bulk_load --rows 10000 --batch-size 100
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from app.db import copy_upsert, get_pool
+
+TABLE = "bench_bulk_embeddings"
+COLUMNS = ("id", "content", "content_hash", "embedding")
+
+
+def make_batches(rows: int, batch_size: int, dims: int):
+    rng = np.random.default_rng(0)
+    for start in range(0, rows, batch_size):
+        count = min(batch_size, rows - start)
+        # 임베딩 API 응답처럼 파이썬 float 리스트로 준비
+        vectors = rng.standard_normal((count, dims), dtype=np.float32).tolist()
+        yield [(start + i, f"content {start + i}", f"{start + i:032x}", vectors[i]) for i in range(count)]
+
+
+def write_execute_values(cur, batch):
+    execute_values(
+        cur,
+        f"INSERT INTO {TABLE} (id, content, content_hash, embedding) VALUES %s "
+        "ON CONFLICT (id) DO UPDATE SET content = EXCLUDED.content, "
+        "content_hash = EXCLUDED.content_hash, embedding = EXCLUDED.embedding",
+        batch,
+    )
+
+
+def write_copy(cur, batch):
+    vectors = np.asarray([row[3] for row in batch], dtype=np.float32)
+    copy_upsert(cur, TABLE, "id", COLUMNS, ("int4", "text", "text", "vector"),
+                [row[:3] + (vector,) for row, vector in zip(batch, vectors)])
+
+
+def run(name, writer, args):
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {TABLE} "
+                    f"(id INTEGER PRIMARY KEY, content TEXT, content_hash TEXT, embedding vector({args.dims}))")
+        cur.execute(f"TRUNCATE {TABLE}")
+        conn.commit()
+
+        elapsed, peak = 0.0, 0
+        for batch in make_batches(args.rows, args.batch_size, args.dims):
+            tracemalloc.start()
+            start = time.perf_counter()
+            writer(cur, batch)
+            conn.commit()
+            elapsed += time.perf_counter() - start
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        cur.execute(f"SELECT COUNT(*) FROM {TABLE}")
+        written = cur.fetchone()[0]
+        cur.execute(f"DROP TABLE {TABLE}")
+    print(f"{name:<15} | {written:>8} | {elapsed:>8.2f} | {written / elapsed:>10.0f} | {peak / 1024 / 1024:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dims", type=int, default=1536)
+    args = parser.parse_args()
+
+    print(f"{'writer':<15} | {'rows':>8} | {'time (s)':>8} | {'rows/s':>10} | {'peak batch MB':>14}")
+    run("execute_values", write_execute_values, args)
+    run("binary COPY", write_copy, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+get_full_chain 지연 시간 벤치마크
+
+LLM 한 번의 왕복 시간을 `--delay`로 고정한 가짜 LLM을 사용하여
+전체 체인의 임계 경로가 LLM 왕복 몇 번에 해당하는지 측정합니다.
+의도 판단은 항상 LLM으로 실행하여(INTENT_CLASSIFIER=llm) 의도/SQL 생성 호출이 병렬로 실행되는지 확인합니다.
+
+사용법:
+    python -m benchmarks.chain_latency --delay 0.5 --runs 5
+"""
+import argparse
+import statistics
+import time
+
+import app.intent as intent
+from app.chains import get_full_chain
+from app.sql_templates import sql_template_cache
+from benchmarks.fakes import DelayedFakeChatModel, get_fake_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delay", type=float, default=0.5, help="LLM 호출 1회당 지연 시간(초)")
+    parser.add_argument("--runs", type=int, default=5, help="측정 반복 횟수")
+    args = parser.parse_args()
+
+    # 규칙 기반 의도 판단이 질문을 처리하면 의도 LLM 호출이 사라져 병렬 실행을 측정할 수 없으므로 항상 LLM 사용
+    intent.INTENT_CLASSIFIER = "llm"
+    chain = get_full_chain(llm=DelayedFakeChatModel(delay=args.delay), db=get_fake_db())
+
+    latencies = []
+    for _ in range(args.runs):
+        # 같은 질문을 반복하므로 SQL 템플릿 캐시가 SQL 생성 호출을 건너뛰지 않도록 비운다
+        sql_template_cache.clear()
+        start = time.perf_counter()
+        chain.invoke({"question": "How many films are there?", "language": "English"})
+        latencies.append(time.perf_counter() - start)
+
+    mean = statistics.mean(latencies)
+    print(f"LLM delay per call      : {args.delay:.3f}s")
+    print(f"Sequential (3 calls)    : {3 * args.delay:.3f}s")
+    print(f"Critical path (2 calls) : {2 * args.delay:.3f}s")
+    print(f"Measured mean latency   : {mean:.3f}s ({mean / args.delay:.2f} LLM round-trips)")
+    print(f"Measured min / max      : {min(latencies):.3f}s / {max(latencies):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
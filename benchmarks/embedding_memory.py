@@ -0,0 +1,127 @@
+"""
+임베딩 생성 메모리 프로파일
+
+원본 행 수를 늘려 가며 스트리밍 파이프라인의 클라이언트 최대 메모리(tracemalloc)를 측정하고,
+최대 메모리가 테이블 크기에 비례해 늘지 않는지(가장 큰 크기 / 가장 작은 크기 < --max-growth) 확인합니다.
+임베딩 API 대신 무작위 벡터를 반환하는 로컬 가짜 모델을 사용합니다.
+
+- 기본: 생성기 원본 + 쓰기 없음 (DB 불필요)
+- --db: .env의 PostgreSQL에서 generate_series 원본을 서버 측 커서로 읽고
+        실제 테이블에 COPY로 쓰는 _sync_embeddings 전체 경로
+- --legacy: 비교용으로 이전 방식(fetchall + 모든 임베딩을 리스트에 모은 뒤 한 번에 저장)도 측정
+
+사용법:
+    python -m benchmarks.embedding_memory --sizes 1000 5000 20000
+    python -m benchmarks.embedding_memory --db --sizes 1000 10000 50000
+    python -m benchmarks.embedding_memory --legacy --sizes 1000 5000
+"""
+import argparse
+import sys
+import tracemalloc
+
+import numpy as np
+
+import app.embeddings as embeddings
+from app.embedding_pipeline import EMBEDDING_BATCH_SIZE, RateLimitedEmbedder, run_embedding_pipeline
+
+BENCH_TABLE = "bench_stream_embeddings"
+
+
+class LocalFakeEmbeddings:
+    """임베딩 API처럼 파이썬 float 리스트를 반환하는 가짜 모델"""
+
+    def __init__(self, dims: int):
+        self.dims = dims
+        self.rng = np.random.default_rng(0)
+
+    def embed_documents(self, texts):
+        return self.rng.standard_normal((len(texts), self.dims), dtype=np.float32).tolist()
+
+
+def content_for(i: int) -> str:
+    return f"Customer: CUSTOMER {i}\nEmail: customer{i}@example.com\nLocation: {i} Main St, City, Country\nTotal Rentals: {i % 50}"
+
+
+def profile(func) -> float:
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def streaming_in_memory(rows: int, embedder):
+    def batches():
+        batch = []
+        for i in range(rows):
+            batch.append((i, content_for(i), None))
+            if len(batch) >= EMBEDDING_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    run_embedding_pipeline(batches(), embedder, lambda batch, vectors: None, desc="streaming")
+
+
+def legacy_in_memory(rows: int, model):
+    source = [(i, content_for(i)) for i in range(rows)]  # fetchall()
+    embeddings_data = []
+    for start in range(0, len(source), 100):
+        batch = source[start:start + 100]
+        vectors = model.embed_documents([content for _, content in batch])
+        embeddings_data.extend((i, content, vector) for (i, content), vector in zip(batch, vectors))
+    return len(embeddings_data)
+
+
+def streaming_db(rows: int, dims: int):
+    from app.db import get_pool
+
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cur.execute(f"CREATE TABLE {BENCH_TABLE} (id INTEGER PRIMARY KEY, content TEXT NOT NULL, "
+                    f"content_hash TEXT, embedding vector({dims}))")
+    query = f"SELECT g AS id FROM generate_series(1, {int(rows)}) AS g"
+    try:
+        embeddings._sync_embeddings(BENCH_TABLE, "id", query, lambda row: (row[0], content_for(row[0])), "db streaming")
+    finally:
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="원본 행 수")
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--db", action="store_true", help="PostgreSQL을 사용하는 전체 경로 측정")
+    parser.add_argument("--legacy", action="store_true", help="이전 방식도 측정")
+    parser.add_argument("--max-growth", type=float, default=1.5, help="허용하는 최대 메모리 증가 배율")
+    args = parser.parse_args()
+
+    model = LocalFakeEmbeddings(args.dims)
+    embedder = RateLimitedEmbedder(model, rpm=1e9, tpm=1e12)
+    embeddings.embedder = embedder
+
+    peaks = []
+    print(f"{'rows':>8} | {'streaming peak MB':>17}" + (f" | {'legacy peak MB':>14}" if args.legacy else ""))
+    for rows in args.sizes:
+        if args.db:
+            peak = profile(lambda: streaming_db(rows, args.dims))
+        else:
+            peak = profile(lambda: streaming_in_memory(rows, embedder))
+        peaks.append(peak)
+        line = f"{rows:>8} | {peak:>17.1f}"
+        if args.legacy:
+            line += f" | {profile(lambda: legacy_in_memory(rows, model)):>14.1f}"
+        print(line)
+
+    growth = peaks[-1] / peaks[0]
+    verdict = "PASS" if growth < args.max_growth else "FAIL"
+    print(f"\n{verdict}: streaming peak grew {growth:.2f}x from {args.sizes[0]} to {args.sizes[-1]} rows "
+          f"(limit {args.max_growth}x)")
+    if verdict == "FAIL":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+임베딩 저장 형식 벤치마크 (차원 256 / 512 / 1536 × float32 / float16 / binary)
+
+같은 벡터를 차원별로 앞부분만 잘라 L2 정규화하고 (text-embedding-3의 차원 축소와 같은 방식)
+저장 형식별 임시 테이블에 적재한 뒤 다음을 비교합니다.
+- 행당 저장 바이트와 1단계 검색이 읽는 바이트, 테이블(힙 + TOAST)/인덱스 크기
+- 검색 지연 시간 p50 / p95 (binary는 비트 해밍 거리 후보 top_k × rerank-factor개 → halfvec 코사인 재정렬)
+- 1536차원 float32 전체 비교 대비 recall@k (차원 축소와 양자화 손실을 함께 반영)
+
+--table을 주면 저장된 1536차원 임베딩을 사용하고 (없으면 앞부분 차원이 더 중요한 합성 벡터),
+질문은 적재하지 않은 행(--queries개)을 사용합니다. 합성 벡터의 recall은 실제 임베딩과 다를 수 있습니다.
+--offline이면 DB 없이 NumPy로 recall과 바이트 수만 계산합니다.
+
+사용법:
+    python -m benchmarks.embedding_storage --offline --rows 20000
+    python -m benchmarks.embedding_storage --table film_embeddings --index hnsw
+    python -m benchmarks.embedding_storage --rows 100000 --dims 256 1536 --storage float32 binary
+"""
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+
+from app.db import encode_copy_binary, get_pool
+
+TABLE = "bench_embedding_storage"
+MODES = ("float32", "float16", "binary")
+# 바이트당 1의 개수
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def generate(rows: int, dims: int = 1536, seed: int = 0) -> np.ndarray:
+    """군집이 있고 앞쪽 차원일수록 분산이 큰 벡터 (차원을 잘라도 이웃 관계가 어느 정도 유지됨)"""
+    rng = np.random.default_rng(seed)
+    scale = (1.0 + np.arange(dims, dtype=np.float32)) ** -0.5
+    centers = rng.standard_normal((max(rows // 100, 8), dims), dtype=np.float32)
+    vectors = centers[rng.integers(0, len(centers), rows)] + 0.7 * rng.standard_normal((rows, dims), dtype=np.float32)
+    vectors *= scale
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_table(table: str) -> np.ndarray:
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT embedding::vector FROM {table} WHERE embedding IS NOT NULL ORDER BY random()")
+        return np.asarray([row[0] for row in cur.fetchall()], dtype=np.float32)
+
+
+def shorten(vectors: np.ndarray, dims: int) -> np.ndarray:
+    short = vectors[:, :dims]
+    return (short / np.linalg.norm(short, axis=1, keepdims=True)).astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """행별 점수 상위 k개의 열 번호 (점수 내림차순)"""
+    picks = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, picks, axis=1), axis=1)
+    return np.take_along_axis(picks, order, axis=1)
+
+
+def row_bytes(mode: str, dims: int):
+    """(행당 저장 바이트, 1단계 검색이 읽는 바이트) — pgvector 값 크기 (varlena 헤더 포함)"""
+    bits = 8 + (dims + 7) // 8
+    if mode == "float16":
+        return 8 + 2 * dims, 8 + 2 * dims
+    if mode == "binary":
+        return 8 + 2 * dims + bits, bits
+    return 8 + 4 * dims, 8 + 4 * dims
+
+
+def offline_search(corpus: np.ndarray, queries: np.ndarray, mode: str, k: int, factor: int) -> np.ndarray:
+    """저장 형식별 검색 결과를 NumPy로 재현"""
+    if mode == "float16":
+        return top_k(queries.astype(np.float16).astype(np.float32) @ corpus.astype(np.float16).astype(np.float32).T, k)
+    if mode == "float32":
+        return top_k(queries @ corpus.T, k)
+    corpus_bits = np.packbits(corpus > 0, axis=1)
+    # 재정렬은 halfvec으로 저장된 embedding으로
+    rerank = corpus.astype(np.float16).astype(np.float32)
+    results = []
+    for query in queries:
+        distance = POPCOUNT[np.bitwise_xor(corpus_bits, np.packbits(query > 0))].sum(axis=1, dtype=np.int32)
+        candidates = np.argpartition(distance, min(k * factor, len(corpus)) - 1)[:k * factor]
+        scores = rerank[candidates] @ query
+        results.append(candidates[np.argsort(-scores)[:k]])
+    return np.asarray(results)
+
+
+def create_table(cur, mode: str, dims: int) -> str:
+    """저장 형식의 벤치마크 테이블을 만들고 COPY 인코딩 타입을 반환"""
+    column = f"vector({dims})" if mode == "float32" else f"halfvec({dims})"
+    bits = (f", embedding_bits bit({dims}) GENERATED ALWAYS AS (binary_quantize(embedding)::bit({dims})) STORED"
+            if mode == "binary" else "")
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cur.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, embedding {column}{bits})")
+    return "vector" if mode == "float32" else "halfvec"
+
+
+def build_index(cur, mode: str, index: str):
+    if index == "none":
+        return
+    target = {"float32": "embedding vector_cosine_ops", "float16": "embedding halfvec_cosine_ops",
+              "binary": "embedding_bits bit_hamming_ops"}[mode]
+    cur.execute(f"CREATE INDEX ON {TABLE} USING {index} ({target})")
+
+
+def search_sql(mode: str, dims: int) -> str:
+    cast = "vector" if mode == "float32" else "halfvec"
+    if mode != "binary":
+        return f"SELECT id FROM {TABLE} ORDER BY embedding <=> %(q)s::{cast} LIMIT %(k)s"
+    return f"""
+        SELECT id FROM (
+            SELECT id, embedding FROM {TABLE}
+            ORDER BY embedding_bits <~> binary_quantize(%(q)s::vector)::bit({dims})
+            LIMIT %(candidates)s
+        ) c
+        ORDER BY embedding <=> %(q)s::halfvec
+        LIMIT %(k)s
+    """
+
+
+def run_db(corpus: np.ndarray, queries: np.ndarray, mode: str, k: int, factor: int, index: str):
+    """임시 테이블에 적재하고 검색해 (크기 dict, 지연 시간 목록, 결과) 반환"""
+    dims = corpus.shape[1]
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        copy_type = create_table(cur, mode, dims)
+        for start in range(0, len(corpus), 10000):
+            rows = [(i, corpus[i]) for i in range(start, min(start + 10000, len(corpus)))]
+            cur.copy_expert(f"COPY {TABLE} (id, embedding) FROM STDIN WITH (FORMAT binary)",
+                            io.BytesIO(encode_copy_binary(rows, ("int4", copy_type))))
+        build_index(cur, mode, index)
+        cur.execute(f"ANALYZE {TABLE}")
+        cur.execute(f"SELECT pg_table_size('{TABLE}'), pg_indexes_size('{TABLE}')")
+        table_bytes, index_bytes = cur.fetchone()
+        conn.commit()
+
+        candidates = k * factor if mode == "binary" else k
+        # HNSW는 ef_search개까지만 반환하므로 후보 수 이상으로
+        settings = f"SET LOCAL hnsw.ef_search = {min(max(40, candidates), 1000)};\n" if index == "hnsw" else ""
+        sql = settings + search_sql(mode, dims)
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            cur.execute(sql, {"q": query, "k": k, "candidates": candidates})
+            results.append([row[0] for row in cur.fetchall()])
+            latencies.append((time.perf_counter() - start) * 1000)
+            conn.rollback()
+    # 인덱스 크기에는 기본 키 인덱스가 포함됨 (모든 형식에서 같은 크기)
+    return {"table": table_bytes, "index": index_bytes}, latencies, results
+
+
+def recall(results, truth) -> float:
+    return statistics.mean(len(set(found) & set(expected)) / len(expected) for found, expected in zip(results, truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", help="저장된 임베딩을 읽을 테이블 (예: film_embeddings)")
+    parser.add_argument("--rows", type=int, default=20000, help="합성 벡터 수 (--table이 없을 때)")
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1536])
+    parser.add_argument("--storage", choices=MODES, nargs="+", default=list(MODES))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=10, help="binary 1단계 후보 수 = top_k × 이 값")
+    parser.add_argument("--index", choices=("none", "hnsw", "ivfflat"), default="none",
+                        help="ANN 인덱스 (none이면 전체 비교; ivfflat은 lists 기본값 100)")
+    parser.add_argument("--offline", action="store_true", help="DB 없이 NumPy로 recall과 바이트 수만 계산")
+    args = parser.parse_args()
+
+    vectors = load_table(args.table) if args.table else generate(args.rows + args.queries)
+    corpus, queries = vectors[:-args.queries], vectors[-args.queries:]
+    full_dims = vectors.shape[1]
+    truth = top_k(queries @ corpus.T, args.top_k)
+    print(f"{len(corpus)} rows, {len(queries)} queries, truth = exact cosine on {full_dims}-dim float32")
+
+    print(f"{'dims':>5} | {'storage':<8} | {'B/row':>6} | {'scan B/row':>10} | {'table MB':>8} | {'index MB':>8} | "
+          f"{'p50 ms':>7} | {'p95 ms':>7} | {'recall@' + str(args.top_k):>9}")
+    try:
+        for dims in args.dims:
+            if dims > full_dims:
+                print(f"skipping {dims} dims (source vectors have {full_dims})")
+                continue
+            short_corpus, short_queries = shorten(corpus, dims), shorten(queries, dims)
+            for mode in args.storage:
+                stored, scanned = row_bytes(mode, dims)
+                if args.offline:
+                    results = offline_search(short_corpus, short_queries, mode, args.top_k, args.rerank_factor)
+                    table_mb = f"{stored * len(corpus) / 2 ** 20:>8.1f}"
+                    index_mb, p50, p95 = "-", "-", "-"
+                else:
+                    sizes, latencies, results = run_db(short_corpus, short_queries, mode, args.top_k,
+                                                       args.rerank_factor, args.index)
+                    latencies.sort()
+                    table_mb = f"{sizes['table'] / 2 ** 20:>8.1f}"
+                    index_mb = f"{sizes['index'] / 2 ** 20:.1f}"
+                    p50 = f"{statistics.median(latencies):.2f}"
+                    p95 = f"{latencies[int(len(latencies) * 0.95)]:.2f}"
+                print(f"{dims:>5} | {mode:<8} | {stored:>6} | {scanned:>10} | {table_mb} | {index_mb:>8} | "
+                      f"{p50:>7} | {p95:>7} | {recall(results, truth):>9.3f}")
+    finally:
+        if not args.offline:
+            with get_pool().connection() as conn, conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+로컬 가짜 OpenAI 임베딩 서버
+
+POST /v1/embeddings에 고정 지연 후 무작위 벡터를 반환하고, 초당 요청/토큰 한도를 넘으면
+Retry-After 헤더와 함께 429를 반환합니다. 임베딩 파이프라인의 동시성/재시도 동작을
+실제 API 비용 없이 확인하는 데 사용합니다.
+
+사용법:
+    python -m benchmarks.fake_embeddings_server --port 8765 --rpm 600 --tpm 200000 --latency 0.2
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python -m app.embeddings
+"""
+import argparse
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class FakeEmbeddingsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.2, rpm: float = 3000, tpm: float = 1_000_000, dims: int = 1536):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.requests_per_second = rpm / 60.0
+        self.tokens_per_second = tpm / 60.0
+        self.dims = dims
+        self.lock = threading.Lock()
+        self.window = int(time.monotonic())
+        self.window_requests = 0
+        self.window_tokens = 0
+        self.served = 0
+        self.rejected = 0
+
+    def admit(self, tokens: int) -> bool:
+        """1초 단위 고정 창으로 분당 한도를 흉내 냅니다."""
+        with self.lock:
+            now = int(time.monotonic())
+            if now != self.window:
+                self.window, self.window_requests, self.window_tokens = now, 0, 0
+            if (self.window_requests + 1 > self.requests_per_second
+                    or (self.window_tokens and self.window_tokens + tokens > self.tokens_per_second)):
+                self.rejected += 1
+                return False
+            self.window_requests += 1
+            self.window_tokens += tokens
+            self.served += 1
+            return True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        inputs = request["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        # 문자열은 4글자당 1토큰으로 추정, 토큰 ID 리스트는 길이 그대로
+        tokens = sum(len(item) if isinstance(item, list) else max(1, len(item) // 4) for item in inputs)
+
+        server = self.server
+        if not server.admit(tokens):
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                       headers={"Retry-After": "1"})
+            return
+
+        time.sleep(server.latency)
+        vectors = np.random.default_rng().standard_normal((len(inputs), server.dims)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        as_base64 = request.get("encoding_format") == "base64"
+        data = [
+            {"object": "embedding", "index": i,
+             "embedding": base64.b64encode(vector.tobytes()).decode("ascii") if as_base64 else vector.tolist()}
+            for i, vector in enumerate(vectors)
+        ]
+        self._send(200, {"object": "list", "data": data, "model": request.get("model"),
+                         "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+
+def start_server(port: int = 0, **kwargs) -> FakeEmbeddingsServer:
+    """백그라운드 스레드에서 서버를 시작합니다 (port=0이면 빈 포트 사용)."""
+    server = FakeEmbeddingsServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="요청당 응답 지연(초)")
+    parser.add_argument("--rpm", type=float, default=3000, help="분당 요청 한도")
+    parser.add_argument("--tpm", type=float, default=1_000_000, help="분당 토큰 한도")
+    args = parser.parse_args()
+
+    server = FakeEmbeddingsServer(("127.0.0.1", args.port), latency=args.latency, rpm=args.rpm, tpm=args.tpm)
+    print(f"Fake embeddings server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
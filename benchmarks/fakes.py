@@ -0,0 +1,69 @@
+"""
+벤치마크용 가짜 LLM / 임베딩 백엔드
+
+실제 OpenAI 호출 없이 지연 시간만 흉내 내어 파이프라인의 임계 경로를 측정합니다.
+"""
+import asyncio
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+INTENT_RESPONSE = '{"visualization_needed": false, "chart_type": "none"}'
+SQL_RESPONSE = "SELECT 1 AS value"
+ANSWER_RESPONSE = "ok"
+
+
+class DelayedFakeChatModel(BaseChatModel):
+    """프롬프트 종류에 맞는 고정 응답을 `delay`초 지연 후 반환하는 가짜 채팅 모델"""
+
+    delay: float = 0.5
+    # True이면 SQL 응답에 질문의 리터럴을 그대로 넣는다 (SQL 템플릿 캐시 벤치마크용)
+    echo_literals: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "delayed-fake-chat"
+
+    def _respond(self, messages) -> ChatResult:
+        prompt = messages[-1].content
+        if "SQLQuery" in prompt:
+            text = self._sql_response(prompt)
+        elif "SQL Result" in prompt or "SQL 결과" in prompt:
+            text = ANSWER_RESPONSE
+        else:
+            text = INTENT_RESPONSE
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _sql_response(self, prompt: str) -> str:
+        if not self.echo_literals:
+            return SQL_RESPONSE
+        from app.sql_templates import extract_literals
+
+        question = prompt.rsplit("Question: ", 1)[-1].split("\nSQLQuery", 1)[0]
+        literals = extract_literals(question)[1]
+        if not literals:
+            return SQL_RESPONSE
+        values = [value if kind == "number" else "'" + value.replace("'", "''") + "'" for kind, value in literals]
+        return "SELECT " + ", ".join(f"{value} AS p{i}" for i, value in enumerate(values, 1))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._respond(messages)
+
+
+def get_fake_db():
+    """LLM 체인 구성에 필요한 최소한의 인메모리 SQLite 데이터베이스"""
+    from langchain_community.utilities import SQLDatabase
+    from sqlalchemy.pool import StaticPool
+
+    # 여러 스레드에서 같은 인메모리 연결을 공유하도록 StaticPool 사용
+    return SQLDatabase.from_uri(
+        "sqlite://",
+        engine_args={"connect_args": {"check_same_thread": False}, "poolclass": StaticPool},
+    )
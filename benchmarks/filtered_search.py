@@ -0,0 +1,124 @@
+"""
+source_filter 벡터 검색 벤치마크 (단일 테이블 + 전체 인덱스 vs source_table별 LIST 파티션)
+
+여러 규모의 합성 임베딩을 실제 비율(film 1000 : customer 599 : actor 200 : category 16)로 두 가지 구조에 적재하고,
+`WHERE source_table = ... ORDER BY embedding <=> ... LIMIT k` 검색의 지연 시간(p50/p95)과
+정확한 검색 대비 recall@k를 source별로 비교합니다.
+단일 인덱스는 모든 source에서 후보를 찾은 뒤 필터링하므로 행이 적은 source일수록 결과가 k개보다 적게 나옵니다.
+.env의 PostgreSQL 설정을 사용하며, 임시 벤치마크 테이블을 만들고 끝나면 삭제합니다.
+
+사용법:
+    python -m benchmarks.filtered_search --sizes 10000 50000 --dims 256
+    python -m benchmarks.filtered_search --method ivfflat --probes 10
+"""
+import argparse
+import io
+import statistics
+import time
+
+import numpy as np
+
+from app.db import encode_copy_binary, get_pool
+
+SOURCE_WEIGHTS = {"film": 1000, "customer": 599, "actor": 200, "category": 16}
+FLAT, PARTITIONED = "bench_unified_flat", "bench_unified_partitioned"
+
+
+def generate(rows: int, dims: int, seed: int = 0):
+    """군집이 있는 벡터, source는 군집과 무관하게 배정 (필터가 유사도와 상관없는 경우)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(rows // 200, 4), dims), dtype=np.float32)
+    vectors = centers[rng.integers(0, len(centers), rows)] + 0.5 * rng.standard_normal((rows, dims), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    names = list(SOURCE_WEIGHTS)
+    weights = np.array(list(SOURCE_WEIGHTS.values()), dtype=float)
+    sources = rng.choice(len(names), size=rows, p=weights / weights.sum())
+    return [names[i] for i in sources], vectors
+
+
+def create_tables(cur, dims: int, method: str, lists: int):
+    options = f"WITH (lists = {lists})" if method == "ivfflat" else ""
+    cur.execute(f"DROP TABLE IF EXISTS {FLAT}, {PARTITIONED}")
+    cur.execute(f"CREATE TABLE {FLAT} (source_table TEXT NOT NULL, source_id INTEGER NOT NULL, "
+                f"embedding vector({dims}), PRIMARY KEY (source_table, source_id))")
+    cur.execute(f"CREATE TABLE {PARTITIONED} (source_table TEXT NOT NULL, source_id INTEGER NOT NULL, "
+                f"embedding vector({dims}), PRIMARY KEY (source_table, source_id)) PARTITION BY LIST (source_table)")
+    for source in SOURCE_WEIGHTS:
+        cur.execute(f"CREATE TABLE {PARTITIONED}_{source} PARTITION OF {PARTITIONED} FOR VALUES IN (%s)", (source,))
+    return options
+
+
+def load(cur, table: str, sources, vectors, chunk: int = 10000):
+    for start in range(0, len(sources), chunk):
+        rows = [(sources[i], i, vectors[i]) for i in range(start, min(start + chunk, len(sources)))]
+        cur.copy_expert(f"COPY {table} (source_table, source_id, embedding) FROM STDIN WITH (FORMAT binary)",
+                        io.BytesIO(encode_copy_binary(rows, ("text", "int4", "vector"))))
+
+
+def run_queries(cur, table: str, queries, top_k: int, settings: str):
+    latencies, results = [], []
+    for source, vector in queries:
+        start = time.perf_counter()
+        cur.execute(f"{settings}SELECT source_id FROM {table} WHERE source_table = %s "
+                    f"ORDER BY embedding <=> %s LIMIT %s", (source, vector, top_k))
+        found = [row[0] for row in cur.fetchall()]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(found)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--dims", type=int, default=256)
+    parser.add_argument("--method", choices=("hnsw", "ivfflat"), default="hnsw")
+    parser.add_argument("--ef-search", type=int, default=40, help="hnsw.ef_search (pgvector 기본값 40)")
+    parser.add_argument("--probes", type=int, default=1, help="ivfflat.probes (pgvector 기본값 1)")
+    parser.add_argument("--queries", type=int, default=50, help="source별 질문 수")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    parameter = (f"SET LOCAL hnsw.ef_search = {args.ef_search};" if args.method == "hnsw"
+                 else f"SET LOCAL ivfflat.probes = {args.probes};")
+    print(f"{'rows':>8} | {'layout':<12} | {'source':<9} | {'p50 ms':>7} | {'p95 ms':>7} | {'recall@' + str(args.top_k):>9}")
+
+    try:
+        for size in args.sizes:
+            sources, vectors = generate(size, args.dims)
+            rng = np.random.default_rng(1)
+            queries = []
+            for source in SOURCE_WEIGHTS:
+                picks = vectors[rng.integers(0, size, args.queries)]
+                noisy = picks + 0.3 * rng.standard_normal(picks.shape, dtype=np.float32) / np.sqrt(args.dims)
+                queries += [(source, vector / np.linalg.norm(vector)) for vector in noisy]
+
+            with get_pool().connection() as conn, conn.cursor() as cur:
+                options = create_tables(cur, args.dims, args.method, lists=max(size // 1000, 10))
+                load(cur, FLAT, sources, vectors)
+                load(cur, PARTITIONED, sources, vectors)
+                conn.commit()
+                # 파티션 테이블에 만든 인덱스는 각 파티션에 따로 만들어짐 (파티션별 lists는 같은 값 사용)
+                for table in (FLAT, PARTITIONED):
+                    cur.execute(f"CREATE INDEX ON {table} USING {args.method} (embedding vector_cosine_ops) {options}")
+                    cur.execute(f"ANALYZE {table}")
+                conn.commit()
+
+                _, truth = run_queries(cur, FLAT, queries, args.top_k, "SET LOCAL enable_indexscan = off;")
+                conn.rollback()
+                for layout, table in (("single index", FLAT), ("partitioned", PARTITIONED)):
+                    latencies, results = run_queries(cur, table, queries, args.top_k, parameter)
+                    conn.rollback()
+                    for source in SOURCE_WEIGHTS:
+                        picked = [i for i, (s, _) in enumerate(queries) if s == source]
+                        times = sorted(latencies[i] for i in picked)
+                        recall = statistics.mean(
+                            len(set(results[i]) & set(truth[i])) / len(truth[i]) if truth[i] else 1.0 for i in picked)
+                        print(f"{size:>8} | {layout:<12} | {source:<9} | {statistics.median(times):>7.2f} | "
+                              f"{times[int(len(times) * 0.95)]:>7.2f} | {recall:>9.3f}")
+    finally:
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {FLAT}, {PARTITIONED}")
+
+
+if __name__ == "__main__":
+    main()
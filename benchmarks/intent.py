@@ -0,0 +1,123 @@
+"""
+시각화 의도 판단 벤치마크
+
+라벨이 붙은 한국어/영어 질문 세트로 규칙 기반 분류기의 정확도, 처리 비율(LLM 없이 판단한 질문 비율),
+호출당 지연 시간을 측정합니다. --llm 옵션을 주면 같은 질문 세트로 LLM 의도 체인의
+정확도와 지연 시간도 측정합니다 (OPENAI_API_KEY 필요).
+
+사용법:
+    python -m benchmarks.intent
+    python -m benchmarks.intent --llm
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app.intent import classify_intent_rules
+
+# (질문, 언어, visualization_needed, chart_type)
+LABELLED_QUESTIONS = [
+    ("카테고리별 영화 수를 시각화해줘", "한국어", True, "bar"),
+    ("월별 대여 건수를 선 그래프로 그려줘", "한국어", True, "line"),
+    ("등급별 영화 비율을 파이 차트로 보여줘", "한국어", True, "pie"),
+    ("매장별 매출을 막대 그래프로 보여줘", "한국어", True, "bar"),
+    ("영화 길이와 대여료의 관계를 산점도로 그려줘", "한국어", True, "scatter"),
+    ("연도별 결제 금액 추이를 차트로 만들어줘", "한국어", True, "line"),
+    ("국가별 고객 수를 그래프로 보여줘", "한국어", True, "bar"),
+    ("영화는 총 몇 개야?", "한국어", False, "none"),
+    ("가장 많이 대여된 영화 5개를 알려줘", "한국어", False, "none"),
+    ("Action 카테고리에 속한 영화 목록을 보여줘", "한국어", False, "none"),
+    ("고객 수를 세어줘", "한국어", False, "none"),
+    ("PENELOPE GUINESS가 출연한 영화를 알려줘", "한국어", False, "none"),
+    ("가장 결제를 많이 한 고객은 누구야?", "한국어", False, "none"),
+    ("2005년 7월 매출 합계는?", "한국어", False, "none"),
+    ("Visualize the number of films per category", "English", True, "bar"),
+    ("Show me a graph of monthly rentals", "English", True, "line"),
+    ("Create a pie chart of films by rating", "English", True, "pie"),
+    ("Plot revenue by store as a bar chart", "English", True, "bar"),
+    ("Draw a scatter plot of film length versus rental rate", "English", True, "scatter"),
+    ("Chart the payment totals over time", "English", True, "line"),
+    ("Make a chart of customers per country", "English", True, "bar"),
+    ("How many films are there?", "English", False, "none"),
+    ("Show me the top 5 customers by payment", "English", False, "none"),
+    ("Tell me which actor appears in the most films", "English", False, "none"),
+    ("List all films in the Comedy category", "English", False, "none"),
+    ("Count the rentals in July 2005", "English", False, "none"),
+    ("What is the average rental rate?", "English", False, "none"),
+    ("Which store has more customers?", "English", False, "none"),
+    # chart / plot / graph가 명사나 다른 단어의 일부로 쓰인 질문
+    ("What is the plot of ACADEMY DINOSAUR?", "English", False, "none"),
+    ("Plot summary of ACADEMY DINOSAUR?", "English", False, "none"),
+    ("Which films have a plot that involves a dog?", "English", False, "none"),
+    ("Which films have graphic violence?", "English", False, "none"),
+    ("List the chart-topping films of 2006", "English", False, "none"),
+    # 애매한 질문 (규칙은 LLM에게 넘김)
+    ("월별 대여 건수 추이를 알려줘", "한국어", False, "none"),
+    ("차트 말고 숫자로만 카테고리별 영화 수를 알려줘", "한국어", False, "none"),
+    ("What is the distribution of rental durations?", "English", False, "none"),
+    ("Give me a breakdown of revenue by category without a chart", "English", False, "none"),
+]
+
+
+def evaluate(classify, questions):
+    """(판단 결과 또는 None, 지연 시간) 목록과 정확도/처리 비율을 반환합니다."""
+    decided = correct_visualization = correct_chart = 0
+    latencies = []
+    for question, language, visualization_needed, chart_type in questions:
+        start = time.perf_counter()
+        result = classify(question, language)
+        latencies.append(time.perf_counter() - start)
+        if result is None:
+            continue
+        decided += 1
+        if bool(result.get("visualization_needed")) == visualization_needed:
+            correct_visualization += 1
+            if not visualization_needed or result.get("chart_type") == chart_type:
+                correct_chart += 1
+    return {
+        "coverage": decided / len(questions),
+        "visualization_accuracy": correct_visualization / decided if decided else 0.0,
+        "chart_type_accuracy": correct_chart / decided if decided else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p99_ms": sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def report(name, stats):
+    print(
+        f"{name:<6} | coverage {stats['coverage']:6.1%} | visualization {stats['visualization_accuracy']:6.1%} "
+        f"| +chart_type {stats['chart_type_accuracy']:6.1%} | mean {stats['mean_ms']:9.3f} ms | p99 {stats['p99_ms']:9.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--llm", action="store_true", help="LLM 의도 체인도 측정")
+    parser.add_argument("--repeat", type=int, default=100, help="규칙 분류기 지연 측정 반복 횟수")
+    args = parser.parse_args()
+
+    report("rules", evaluate(lambda question, language: classify_intent_rules(question),
+                             LABELLED_QUESTIONS * args.repeat))
+
+    if args.llm:
+        import app.intent
+        from app.chains import clean_json_response, get_chain_stages
+        from benchmarks.fakes import get_fake_db
+
+        # 규칙을 끄고 의도 단계가 항상 LLM을 호출하도록 설정
+        app.intent.INTENT_CLASSIFIER = "llm"
+        intent_chain = get_chain_stages(db=get_fake_db())["intent"]
+
+        def classify_llm(question, language):
+            raw = intent_chain.invoke({"question": question, "language": language})
+            try:
+                return json.loads(clean_json_response(raw))
+            except json.JSONDecodeError:
+                return {}
+
+        report("llm", evaluate(classify_llm, LABELLED_QUESTIONS))
+
+
+if __name__ == "__main__":
+    main()
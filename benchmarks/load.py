@@ -0,0 +1,91 @@
+"""
+/query 엔드포인트 부하 테스트
+
+LLM, 임베딩, 벡터 검색을 지연 시간만 흉내 내는 가짜 백엔드로 교체한 뒤
+단일 프로세스의 FastAPI 앱에 동시 요청을 보내 처리량과 지연 시간 분포를 측정합니다.
+
+사용법:
+    python -m benchmarks.load --requests 200 --concurrency 50 --llm-delay 0.2 --search-delay 0.05
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import app.chains as chains
+from benchmarks.fakes import DelayedFakeChatModel, get_fake_db
+
+
+def install_stub_backends(llm_delay: float, search_delay: float):
+    """app.main을 임포트하기 전에 외부 백엔드를 가짜 구현으로 교체합니다."""
+    fake_db = get_fake_db()
+    real_get_chain_stages = chains.get_chain_stages
+
+    def stub_hybrid_search(query, top_k=5, query_embedding=None):
+        # 동기 임베딩 호출 + pgvector 조회를 흉내 내는 블로킹 지연
+        time.sleep(search_delay)
+        return {"vector_results": [], "context": ""}
+
+    # "question {i}"는 모두 같은 템플릿으로 정규화되므로, 켜 두면 첫 요청 뒤로는 SQL 생성 LLM 호출을 건너뜀
+    chains.SQL_TEMPLATE_CACHE = False
+    chains.get_chain_stages = lambda: real_get_chain_stages(llm=DelayedFakeChatModel(delay=llm_delay), db=fake_db)
+    chains.get_db = lambda: fake_db
+
+    import app.main as main
+    main.hybrid_search = stub_hybrid_search
+    main.get_db = lambda: fake_db
+    return main.app
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(app, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/query", json={"question": f"question {i}", "language": "English"})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200, help="총 요청 수")
+    parser.add_argument("--concurrency", type=int, default=50, help="동시에 보낼 요청 수")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="가짜 LLM 호출 1회당 지연(초)")
+    parser.add_argument("--search-delay", type=float, default=0.05, help="가짜 벡터 검색 지연(초)")
+    args = parser.parse_args()
+
+    app = install_stub_backends(args.llm_delay, args.search_delay)
+    latencies, errors, elapsed = asyncio.run(run_load(app, args.requests, args.concurrency))
+
+    print(f"Requests      : {args.requests} (concurrency {args.concurrency}, errors {errors})")
+    print(f"Elapsed       : {elapsed:.2f}s")
+    print(f"Throughput    : {args.requests / elapsed:.1f} req/s")
+    print(f"Latency mean  : {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"Latency p50   : {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"Latency p99   : {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+SQLDatabase 생성/스키마 반영 비용 벤치마크
+
+요청마다 SQLDatabase.from_uri로 새 엔진을 만들고 스키마를 반영하던 기존 방식과
+공유 캐시(get_db)를 사용하는 방식의 요청당 오버헤드를 비교합니다. .env의 DB 설정을 사용합니다.
+
+사용법:
+    python -m benchmarks.schema_cache --runs 10
+"""
+import argparse
+import statistics
+import time
+
+from langchain_community.utilities import SQLDatabase
+
+from app.chains import get_database_uri, get_db
+
+
+def measure(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.mean(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10, help="측정 반복 횟수")
+    args = parser.parse_args()
+
+    uri = get_database_uri()
+
+    def uncached_request():
+        # 기존 방식: 요청마다 엔진 생성 + 전체 스키마 반영 + table_info 조회
+        db = SQLDatabase.from_uri(uri)
+        db.get_usable_table_names()
+        db.get_table_info()
+        db._engine.dispose()
+
+    start = time.perf_counter()
+    get_db().get_table_info()
+    startup = (time.perf_counter() - start) * 1000
+
+    def cached_request():
+        db = get_db()
+        db.get_usable_table_names()
+        db.get_table_info()
+
+    print(f"Shared handle startup cost      : {startup:.1f} ms (once per process)")
+    print(f"Per-request overhead (before)   : {measure(uncached_request, args.runs):.1f} ms")
+    print(f"Per-request overhead (after)    : {measure(cached_request, args.runs):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
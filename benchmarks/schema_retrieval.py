@@ -0,0 +1,112 @@
+"""
+스키마 검색 벤치마크
+
+라벨이 붙은 질문 세트로 스키마 검색(SCHEMA_TOP_K + 외래 키 이웃)의 테이블 재현율,
+SQL 생성 프롬프트의 table_info 토큰 수(전체 테이블 vs 검색된 테이블), 검색 지연 시간을 측정합니다.
+--llm 옵션을 주면 두 방식으로 실제 SQL을 생성/실행하여 정답 SQL 결과와 비교한 정확도와
+SQL 생성 지연 시간도 측정합니다 (OPENAI_API_KEY 필요).
+
+.env의 PostgreSQL 설정을 사용하며, 먼저 `python -m app.embeddings`로 schema_embeddings를 채워야 합니다.
+
+사용법:
+    python -m benchmarks.schema_retrieval
+    python -m benchmarks.schema_retrieval --llm --top-k 4 --fk-depth 1
+"""
+import argparse
+import statistics
+import time
+
+import app.chains as chains
+from app.chains import clean_sql_query, get_chain_stages, get_db, retrieve_relevant_tables
+from app.results import estimate_tokens, run_sql, strip_sql
+
+# (질문, 필요한 테이블, 정답 SQL)
+LABELLED_QUESTIONS = [
+    ("How many films are in each category?", {"category", "film_category"},
+     "SELECT c.name, COUNT(*) FROM category c JOIN film_category fc ON c.category_id = fc.category_id GROUP BY c.name"),
+    ("카테고리별 영화 수를 알려줘", {"category", "film_category"},
+     "SELECT c.name, COUNT(*) FROM category c JOIN film_category fc ON c.category_id = fc.category_id GROUP BY c.name"),
+    ("Who are the top 5 customers by total payment?", {"customer", "payment"},
+     "SELECT c.first_name, c.last_name, SUM(p.amount) AS total FROM customer c JOIN payment p ON c.customer_id = p.customer_id "
+     "GROUP BY c.customer_id, c.first_name, c.last_name ORDER BY total DESC LIMIT 5"),
+    ("결제 금액이 가장 많은 고객 5명은?", {"customer", "payment"},
+     "SELECT c.first_name, c.last_name, SUM(p.amount) AS total FROM customer c JOIN payment p ON c.customer_id = p.customer_id "
+     "GROUP BY c.customer_id, c.first_name, c.last_name ORDER BY total DESC LIMIT 5"),
+    ("Which actor appears in the most films?", {"actor", "film_actor"},
+     "SELECT a.first_name, a.last_name FROM actor a JOIN film_actor fa ON a.actor_id = fa.actor_id "
+     "GROUP BY a.actor_id, a.first_name, a.last_name ORDER BY COUNT(*) DESC LIMIT 1"),
+    ("How many customers live in each country?", {"customer", "address", "city", "country"},
+     "SELECT co.country, COUNT(*) FROM customer c JOIN address a ON c.address_id = a.address_id "
+     "JOIN city ci ON a.city_id = ci.city_id JOIN country co ON ci.country_id = co.country_id GROUP BY co.country"),
+    ("How many rentals were there per film category?", {"rental", "inventory", "film_category", "category"},
+     "SELECT c.name, COUNT(*) FROM rental r JOIN inventory i ON r.inventory_id = i.inventory_id "
+     "JOIN film_category fc ON i.film_id = fc.film_id JOIN category c ON fc.category_id = c.category_id GROUP BY c.name"),
+    ("등급별 평균 대여료는?", {"film"},
+     "SELECT rating, AVG(rental_rate) FROM film GROUP BY rating"),
+    ("How many films are in English?", {"film", "language"},
+     "SELECT COUNT(*) FROM film f JOIN language l ON f.language_id = l.language_id WHERE l.name = 'English'"),
+    ("How many staff members work at each store?", {"staff", "store"},
+     "SELECT store_id, COUNT(*) FROM staff GROUP BY store_id"),
+]
+
+
+def _normalise_rows(result):
+    """컬럼 이름/순서와 무관하게 비교할 수 있도록 행 값을 정렬된 문자열 튜플로 바꿉니다."""
+    return sorted(
+        tuple(sorted(str(round(value, 2) if isinstance(value, float) else value) for value in row))
+        for row in result["rows"]
+    )
+
+
+def evaluate_sql(sql_chain, db, question, gold_rows):
+    start = time.perf_counter()
+    sql = sql_chain.invoke({"question": question, "user_question": question})
+    elapsed = time.perf_counter() - start
+    result = run_sql(db, strip_sql(clean_sql_query(sql)))
+    return elapsed, not result["error"] and _normalise_rows(result) == gold_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=chains.SCHEMA_TOP_K, help="임베딩 유사도로 고르는 테이블 수")
+    parser.add_argument("--fk-depth", type=int, default=chains.SCHEMA_FK_DEPTH, help="외래 키 이웃 깊이")
+    parser.add_argument("--llm", action="store_true", help="실제 LLM으로 SQL을 생성해 정확도 측정")
+    args = parser.parse_args()
+
+    db = get_db()
+    full_tokens = estimate_tokens(db.get_table_info())
+
+    print(f"{'question':<48} | {'tables':>6} | {'recall':>6} | {'tokens':>12} | {'retrieve (ms)':>13}")
+    recalls, tokens, latencies = [], [], []
+    for question, gold_tables, _ in LABELLED_QUESTIONS:
+        start = time.perf_counter()
+        tables = retrieve_relevant_tables(question, top_k=args.top_k, fk_depth=args.fk_depth, db=db)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if tables is None:
+            raise SystemExit("schema_embeddings is empty: run `python -m app.embeddings` first")
+        recalls.append(len(gold_tables & set(tables)) / len(gold_tables))
+        tokens.append(estimate_tokens(db.get_table_info(tables)))
+        print(f"{question[:48]:<48} | {len(tables):>6} | {recalls[-1]:>6.0%} | {tokens[-1]:>5} / {full_tokens:<5} "
+              f"| {latencies[-1]:>13.1f}")
+    print(f"\nMean recall {statistics.mean(recalls):.0%}, mean table_info tokens {statistics.mean(tokens):.0f} "
+          f"(all tables: {full_tokens}), mean retrieval {statistics.mean(latencies):.1f} ms")
+
+    if args.llm:
+        chains.SCHEMA_TOP_K, chains.SCHEMA_FK_DEPTH = args.top_k, args.fk_depth
+        modes = {}
+        for mode, enabled in (("all tables", False), ("retrieved", True)):
+            chains.SCHEMA_RETRIEVAL = enabled
+            modes[mode] = get_chain_stages(db=db)["sql_query"]
+
+        print(f"\n{'mode':<12} | {'accuracy':>8} | {'mean SQL generation (ms)':>24}")
+        for mode, sql_chain in modes.items():
+            outcomes = [
+                evaluate_sql(sql_chain, db, question, _normalise_rows(run_sql(db, gold_sql)))
+                for question, _, gold_sql in LABELLED_QUESTIONS
+            ]
+            accuracy = sum(correct for _, correct in outcomes) / len(outcomes)
+            print(f"{mode:<12} | {accuracy:>8.0%} | {statistics.mean(e for e, _ in outcomes) * 1000:>24.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+SQL 결과 처리 방식 메모리/CPU 벤치마크
+
+기존 방식(SQLDatabase.run → 파이썬 repr 문자열 → json.loads 실패 → 문자열 그대로 사용)과
+구조화된 행 방식(run_sql → 컬럼/행 → 레코드 + 길이 제한 프롬프트)을 결과 크기별로 비교합니다.
+.env의 PostgreSQL 설정을 사용합니다.
+
+사용법:
+    python -m benchmarks.sql_results --sizes 100 1000 10000 50000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from app.chains import get_db
+from app.results import format_result_for_prompt, result_to_records, run_sql
+
+QUERY = """
+    SELECT g AS id, md5(g::text) AS name, g * 1.5 AS amount, now() - g * interval '1 hour' AS created_at
+    FROM generate_series(1, {rows}) AS g
+"""
+
+
+def legacy_path(db, sql):
+    raw = db.run(sql)
+    try:
+        records = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        records = [{"result": raw}]
+    return records, raw
+
+
+def structured_path(db, sql):
+    result = run_sql(db, sql)
+    return result_to_records(result), format_result_for_prompt(result)
+
+
+def profile(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    _, prompt = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024, len(prompt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000], help="결과 행 수")
+    args = parser.parse_args()
+
+    db = get_db()
+    print(f"{'rows':>8} | {'path':<10} | {'time (ms)':>10} | {'peak (MB)':>10} | {'prompt chars':>12}")
+    for rows in args.sizes:
+        sql = QUERY.format(rows=rows)
+        for name, func in (("legacy", legacy_path), ("structured", structured_path)):
+            elapsed, peak, prompt_chars = profile(func, db, sql)
+            print(f"{rows:>8} | {name:<10} | {elapsed:>10.1f} | {peak:>10.2f} | {prompt_chars:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+SQL 템플릿 캐시 재생(replay) 벤치마크
+
+질문 로그(한 줄에 질문 하나)를 순서대로 SQL 생성 → SQL 실행 단계에 흘려 보내며
+템플릿 캐시 적중률과 적중/미스별 지연 시간을 측정합니다.
+--invalidate-at N을 주면 N번째 질문 앞에서 스키마 캐시를 무효화하여 템플릿이 비워지는지 확인합니다.
+
+로그를 주지 않으면 리터럴만 다른 질문들로 만든 예시 로그를 사용합니다.
+기본은 실제 LLM과 .env의 PostgreSQL을 사용하고, --fake-delay를 주면 가짜 LLM과 SQLite로 실행합니다.
+
+사용법:
+    python -m benchmarks.sql_template_replay --log questions.txt
+    python -m benchmarks.sql_template_replay --size 200 --invalidate-at 100
+    python -m benchmarks.sql_template_replay --fake-delay 0.5
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.chains import get_chain_stages, invalidate_schema_cache
+from app.sql_templates import sql_template_cache
+
+QUESTION_TEMPLATES = [
+    "Show the top {n} longest films rated '{rating}'",
+    "How many films have a rental rate of {rate}?",
+    "List {n} customers who made payments over {amount} dollars",
+    "'{rating}' 등급 영화는 몇 개야?",
+    "대여 기간이 {days}일인 영화 {n}개를 보여줘",
+]
+
+
+def sample_log(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        rng.choice(QUESTION_TEMPLATES).format(
+            n=rng.choice([3, 5, 10, 20]),
+            rating=rng.choice(["G", "PG", "PG-13", "R", "NC-17"]),
+            rate=rng.choice(["0.99", "2.99", "4.99"]),
+            amount=rng.choice([5, 8, 10]),
+            days=rng.choice([3, 4, 5, 6, 7]),
+        )
+        for _ in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", help="질문 로그 파일 (한 줄에 질문 하나)")
+    parser.add_argument("--size", type=int, default=100, help="예시 로그의 질문 수")
+    parser.add_argument("--invalidate-at", type=int, default=None, help="이 순번의 질문 앞에서 스키마 캐시 무효화")
+    parser.add_argument("--fake-delay", type=float, default=None, help="가짜 LLM 지연(초)으로 실행")
+    args = parser.parse_args()
+
+    if args.log:
+        with open(args.log, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = sample_log(args.size)
+
+    if args.fake_delay is not None:
+        from benchmarks.fakes import DelayedFakeChatModel, get_fake_db
+        stages = get_chain_stages(llm=DelayedFakeChatModel(delay=args.fake_delay, echo_literals=True), db=get_fake_db())
+    else:
+        stages = get_chain_stages()
+
+    timings = {"hit": [], "miss": []}
+    errors = 0
+    for index, question in enumerate(questions):
+        if index == args.invalidate_at:
+            invalidate_schema_cache()
+            print(f"[{index}] schema cache invalidated, template cache size -> {sql_template_cache.stats()['size']}")
+        hits_before = sql_template_cache.stats()["hits"]
+        chain_input = {"question": question, "user_question": question}
+
+        start = time.perf_counter()
+        chain_input["sql_query"] = stages["sql_query"].invoke(chain_input)
+        result = stages["sql_result"].invoke(chain_input)
+        elapsed = time.perf_counter() - start
+
+        kind = "hit" if sql_template_cache.stats()["hits"] > hits_before else "miss"
+        timings[kind].append(elapsed * 1000)
+        errors += bool(result["error"])
+
+    stats = sql_template_cache.stats()
+    print(f"Questions            : {len(questions)} ({errors} SQL errors)")
+    print(f"Template hit rate    : {len(timings['hit']) / len(questions):.1%}")
+    print(f"Templates stored     : {stats['stored']} (rejected: {stats['rejected']})")
+    for kind in ("hit", "miss"):
+        if timings[kind]:
+            print(f"Mean latency ({kind:<4}) : {statistics.mean(timings[kind]):.1f} ms over {len(timings[kind])} questions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+벡터 검색 백엔드 벤치마크 (pgvector vs 프로세스 내부 NumPy 인덱스)
+
+저장된 임베딩에 잡음을 더한 벡터를 질문 임베딩으로 사용하여 (임베딩 API 호출 없음)
+vector_search_* 함수를 백엔드별로 실행하고 QPS, 지연 시간(p50/p95), 정확한 전체 비교 대비 recall@k를 측정합니다.
+--synthetic을 주면 DB 없이 무작위 벡터로 전체 비교와 HNSW(hnswlib 설치 시)만 비교합니다.
+
+사용법:
+    python -m benchmarks.vector_backends --table film --queries 500 --top-k 10
+    python -m benchmarks.vector_backends --synthetic 200000 --dims 256
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import app.chains as chains
+import app.vector_index as vector_index
+from app.vector_index import VectorIndex, build_snapshot, write_snapshot
+
+# 테이블 → (검색 함수, 결과 행을 식별하는 키)
+SEARCHES = {
+    "unified": (lambda q, k: chains.vector_search_unified(q, top_k=k), ("source_table", "source_id")),
+    "film": (lambda q, k: chains.vector_search_films(q, top_k=k), ("film_id",)),
+    "actor": (lambda q, k: chains.vector_search_actors(q, top_k=k), ("actor_id",)),
+    "customer": (lambda q, k: chains.vector_search_customers(q, top_k=k), ("customer_id",)),
+}
+
+
+def make_queries(matrix: np.ndarray, count: int, noise: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = matrix[rng.integers(0, len(matrix), count)]
+    queries = picks + rng.standard_normal(picks.shape, dtype=np.float32) * noise / np.sqrt(matrix.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(matrix: np.ndarray, queries: np.ndarray, top_k: int) -> np.ndarray:
+    scores = queries @ matrix.T
+    return np.argsort(-scores, axis=1)[:, :top_k]
+
+
+def measure(name: str, search, queries, truth, top_k: int):
+    latencies, recalls = [], []
+    start = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        t = time.perf_counter()
+        found = search(query, top_k)
+        latencies.append((time.perf_counter() - t) * 1000)
+        recalls.append(len(set(found) & set(expected)) / len(expected))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"{name:<12} | {len(queries) / elapsed:>8.0f} | {statistics.median(latencies):>8.2f} | "
+          f"{latencies[int(len(latencies) * 0.95)]:>8.2f} | {statistics.mean(recalls):>9.3f}")
+
+
+def header(top_k: int):
+    print(f"{'backend':<12} | {'QPS':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'recall@' + str(top_k):>9}")
+
+
+def run_database(args):
+    search, key = SEARCHES[args.table]
+    print(f"Building snapshot '{args.table}' from Postgres...")
+    build_snapshot(args.table)
+    index = VectorIndex(args.table)
+    ids = [tuple(payload[k] for k in key) for payload in index.payloads]
+    matrix = np.asarray(index.matrix)
+    queries = make_queries(matrix, args.queries, args.noise)
+    truth = [[ids[i] for i in row] for row in exact_top_k(matrix, queries, args.top_k)]
+
+    # vector_search_*가 받은 "질문"을 미리 만든 벡터로 바꿔 임베딩 API를 호출하지 않음
+    vectors = {}
+    chains.embed_query = lambda text: vectors[text]
+
+    def run_backend(backend):
+        chains.VECTOR_SEARCH_BACKEND = backend
+
+        def do_search(query, top_k):
+            text = f"q{len(vectors)}"
+            vectors[text] = query.tolist() if backend == "pgvector" else query
+            return [tuple(row[k] for k in key) for row in search(text, top_k)]
+        return do_search
+
+    print(f"\n{args.table}: {len(ids)} rows, {args.queries} queries, top_k={args.top_k}")
+    header(args.top_k)
+    measure("pgvector", run_backend("pgvector"), queries, truth, args.top_k)
+    measure("numpy", run_backend("numpy"), queries, truth, args.top_k)
+
+
+def run_synthetic(args):
+    rng = np.random.default_rng(0)
+    # 실제 임베딩처럼 군집이 있는 분포
+    centers = rng.standard_normal((max(args.synthetic // 100, 1), args.dims), dtype=np.float32)
+    matrix = (centers[rng.integers(0, len(centers), args.synthetic)]
+              + 0.5 * rng.standard_normal((args.synthetic, args.dims), dtype=np.float32))
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    payloads = [{"id": i} for i in range(args.synthetic)]
+    queries = make_queries(matrix, args.queries, args.noise)
+    truth = exact_top_k(matrix, queries, args.top_k).tolist()
+
+    print(f"synthetic: {args.synthetic} rows x {args.dims} dims, {args.queries} queries, top_k={args.top_k}")
+    header(args.top_k)
+    with tempfile.TemporaryDirectory() as directory:
+        vector_index.VECTOR_INDEX_HNSW_MIN_ROWS = args.synthetic + 1
+        write_snapshot("synthetic", payloads, matrix, directory)
+        index = VectorIndex("synthetic", directory)
+        measure("exhaustive", lambda q, k: [row["id"] for row in index.search(q, k)], queries, truth, args.top_k)
+
+        if vector_index.hnswlib is None:
+            print("hnsw         | skipped (pip install hnswlib)")
+            return
+        vector_index.VECTOR_INDEX_HNSW_MIN_ROWS = 0
+        start = time.perf_counter()
+        write_snapshot("synthetic", payloads, matrix, directory)
+        print(f"(HNSW build {time.perf_counter() - start:.1f}s)")
+        index = VectorIndex("synthetic", directory)
+        measure("hnsw", lambda q, k: [row["id"] for row in index.search(q, k)], queries, truth, args.top_k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", choices=sorted(SEARCHES), default="film")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.5, help="질문 벡터를 만들 때 더하는 잡음 크기")
+    parser.add_argument("--synthetic", type=int, default=0, help="DB 없이 이 행 수의 무작위 벡터로 측정")
+    parser.add_argument("--dims", type=int, default=1536, help="--synthetic 벡터 차원")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        run_synthetic(args)
+    else:
+        run_database(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,54 +9,99 @@ pg_restore -U "$POSTGRES_USER" -d "$POSTGRES_DB" /docker-entrypoint-initdb.d/dvd
 echo "Creating pgvector extension..."
 psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
     CREATE EXTENSION IF NOT EXISTS vector;
+    -- 하이브리드 검색의 이름 유사도(오타 허용) 검색
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
 EOSQL
 
 # 벡터 임베딩 테이블 생성
 echo "Creating vector embedding tables..."
 psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
+    -- embedding 컬럼은 1536차원 float32로 만들고, EMBEDDING_DIMENSIONS / EMBEDDING_STORAGE를 바꾸면
+    -- python -m app.embeddings가 halfvec 변환, 차원 축소, binary용 embedding_bits 생성 컬럼 추가를 합니다.
     -- Film 벡터 임베딩 테이블 (영화 제목 + 설명)
     CREATE TABLE IF NOT EXISTS film_embeddings (
         film_id INTEGER PRIMARY KEY REFERENCES film(film_id) ON DELETE CASCADE,
         content TEXT NOT NULL,
+        content_hash TEXT,
         embedding vector(1536)
     );
-    CREATE INDEX IF NOT EXISTS film_embeddings_idx ON film_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
     -- Actor 벡터 임베딩 테이블 (배우 이름 + 출연 영화)
     CREATE TABLE IF NOT EXISTS actor_embeddings (
         actor_id INTEGER PRIMARY KEY REFERENCES actor(actor_id) ON DELETE CASCADE,
         content TEXT NOT NULL,
+        content_hash TEXT,
         embedding vector(1536)
     );
-    CREATE INDEX IF NOT EXISTS actor_embeddings_idx ON actor_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
     -- Customer 벡터 임베딩 테이블 (고객 정보)
     CREATE TABLE IF NOT EXISTS customer_embeddings (
         customer_id INTEGER PRIMARY KEY REFERENCES customer(customer_id) ON DELETE CASCADE,
         content TEXT NOT NULL,
+        content_hash TEXT,
         embedding vector(1536)
     );
-    CREATE INDEX IF NOT EXISTS customer_embeddings_idx ON customer_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
     -- Category 벡터 임베딩 테이블 (카테고리 + 영화 목록)
     CREATE TABLE IF NOT EXISTS category_embeddings (
         category_id INTEGER PRIMARY KEY REFERENCES category(category_id) ON DELETE CASCADE,
         content TEXT NOT NULL,
+        content_hash TEXT,
         embedding vector(1536)
     );
-    CREATE INDEX IF NOT EXISTS category_embeddings_idx ON category_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
     -- 통합 검색을 위한 전체 데이터 벡터 테이블
+    -- source_table별 LIST 파티션: source_filter 검색은 해당 파티션의 벡터 인덱스만 사용합니다.
+    -- 기본 키는 증분 동기화(upsert)의 충돌 대상으로도 사용됩니다.
     CREATE TABLE IF NOT EXISTS unified_embeddings (
-        id SERIAL PRIMARY KEY,
         source_table VARCHAR(50) NOT NULL,
         source_id INTEGER NOT NULL,
         content TEXT NOT NULL,
         embedding vector(1536),
-        metadata JSONB
+        metadata JSONB,
+        CONSTRAINT unified_embeddings_source_key PRIMARY KEY (source_table, source_id)
+    ) PARTITION BY LIST (source_table);
+    CREATE TABLE IF NOT EXISTS unified_embeddings_film PARTITION OF unified_embeddings FOR VALUES IN ('film');
+    CREATE TABLE IF NOT EXISTS unified_embeddings_actor PARTITION OF unified_embeddings FOR VALUES IN ('actor');
+    CREATE TABLE IF NOT EXISTS unified_embeddings_customer PARTITION OF unified_embeddings FOR VALUES IN ('customer');
+    CREATE TABLE IF NOT EXISTS unified_embeddings_category PARTITION OF unified_embeddings FOR VALUES IN ('category');
+    CREATE TABLE IF NOT EXISTS unified_embeddings_other PARTITION OF unified_embeddings DEFAULT;
+    -- 하이브리드 검색용 키워드 색인 (전문 검색 tsvector + 이름 트라이그램)
+    ALTER TABLE unified_embeddings ADD COLUMN IF NOT EXISTS content_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED;
+    CREATE INDEX IF NOT EXISTS unified_embeddings_content_tsv_idx ON unified_embeddings USING gin (content_tsv);
+    CREATE INDEX IF NOT EXISTS unified_embeddings_content_trgm_idx ON unified_embeddings USING gin (content gin_trgm_ops);
+
+    -- 벡터 인덱스는 임베딩을 적재한 뒤 python -m app.index_manager(임베딩 생성 시 자동 실행)가
+    -- 행 수에 맞춰 만듭니다. 빈 테이블에 만든 ivfflat 인덱스는 중심점이 의미가 없어 재현율이 낮습니다.
+    CREATE TABLE IF NOT EXISTS vector_index_settings (
+        table_name TEXT PRIMARY KEY,
+        method TEXT NOT NULL,
+        params JSONB NOT NULL,
+        row_count INTEGER NOT NULL,
+        recall_curve JSONB NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+
+    -- 테이블 스키마 임베딩 (SQL 생성 시 질문과 관련된 테이블만 프롬프트에 넣기 위해 사용)
+    CREATE TABLE IF NOT EXISTS schema_embeddings (
+        table_name TEXT PRIMARY KEY,
+        content TEXT NOT NULL,
+        embedding vector(1536),
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+
+    -- 답변 캐시 테이블 (ANSWER_CACHE_BACKEND=postgres 일 때 사용)
+    CREATE TABLE IF NOT EXISTS answer_cache (
+        cache_key TEXT PRIMARY KEY,
+        question TEXT NOT NULL,
+        language TEXT NOT NULL,
+        response JSONB NOT NULL,
+        embedding vector(1536),
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        last_accessed_at TIMESTAMPTZ NOT NULL DEFAULT now()
     );
-    CREATE INDEX IF NOT EXISTS unified_embeddings_idx ON unified_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
-    CREATE INDEX IF NOT EXISTS unified_embeddings_source_idx ON unified_embeddings(source_table, source_id);
+    CREATE INDEX IF NOT EXISTS answer_cache_last_accessed_idx ON answer_cache (last_accessed_at);
 EOSQL
 
 echo "DVD Rental database, pgvector extension, and vector tables created successfully."
\ No newline at end of file
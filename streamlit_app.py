@@ -89,6 +89,22 @@ LANGUAGES = {
     }
 }
 
+def iter_sse_events(response):
+    """requests 스트리밍 응답에서 Server-Sent Events를 (이벤트 이름, JSON 데이터)로 순회합니다."""
+    response.encoding = "utf-8"
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
 # 세션 상태 초기화
 if "language" not in st.session_state:
     st.session_state.language = "한국어"
@@ -143,13 +159,45 @@ if st.button(lang["run_button"], type="primary", use_container_width=True):
     if question:
         with st.spinner("⏳ Processing..."):
             try:
-                # FastAPI 백엔드에 요청
-                response = requests.post(
-                    "http://127.0.0.1:8000/query",
-                    json={"question": question, "language": st.session_state.language}
-                )
-                response.raise_for_status()
-                data = response.json()
+                # FastAPI 백엔드에 스트리밍 요청: 단계별 결과를 도착하는 대로 미리 보여줌
+                intent_placeholder = st.empty()
+                sql_placeholder = st.empty()
+                rows_placeholder = st.empty()
+                answer_placeholder = st.empty()
+                streamed_answer = ""
+                data = None
+                
+                with requests.post(
+                    "http://127.0.0.1:8000/query/stream",
+                    json={"question": question, "language": st.session_state.language},
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
+                    for event, payload in iter_sse_events(response):
+                        if event == "intent" and payload.get("chart_type") not in (None, "none"):
+                            intent_placeholder.caption(f"📊 Chart: {payload['chart_type']}")
+                        elif event == "sql":
+                            with sql_placeholder.container():
+                                st.markdown(f"**{lang['sql_header']}**")
+                                st.code(payload["sql_query"], language="sql")
+                        elif event == "rows":
+                            with rows_placeholder.container():
+                                st.markdown(f"**{lang['result_header']}**")
+                                st.dataframe(pd.DataFrame(payload["result"]), use_container_width=True, height=200)
+                        elif event == "token":
+                            streamed_answer += payload["text"]
+                            answer_placeholder.markdown(f"**{lang['answer_header']}**\n\n{streamed_answer}▌")
+                        elif event == "result":
+                            data = payload
+                        elif event == "error":
+                            raise RuntimeError(payload["detail"])
+                
+                if data is None:
+                    raise RuntimeError("Stream ended without a result")
+                
+                # 미리보기를 지우고 최종 결과를 표시
+                for placeholder in (intent_placeholder, sql_placeholder, rows_placeholder, answer_placeholder):
+                    placeholder.empty()
                 
                 # 대화 기록에 추가
                 st.session_state.conversation_history.append({
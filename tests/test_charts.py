@@ -0,0 +1,54 @@
+"""
+SQL 결과 행에서 chart_data를 만들 때 라벨/값 컬럼 선택 테스트
+"""
+from app.charts import build_chart_data
+from app.results import make_result
+
+
+def test_name_column_is_label_and_id_is_dropped():
+    result = make_result(["category_id", "name", "film_count"], [[1, "Action", 64], [2, "Animation", 66]])
+    assert build_chart_data(result, "bar") == [
+        {"name": "Action", "film_count": 64},
+        {"name": "Animation", "film_count": 66},
+    ]
+
+
+def test_split_name_columns_are_joined_into_one_label():
+    result = make_result(["customer_id", "first_name", "last_name", "total"],
+                         [[148, "ELEANOR", "HUNT", 211.55]])
+    assert build_chart_data(result, "bar") == [{"first_name_last_name": "ELEANOR HUNT", "total": 211.55}]
+
+
+def test_numeric_time_parts_are_labels_not_values():
+    result = make_result(["year", "month", "revenue"], [[2005, 5, 4824.43], [2005, 6, 9631.88]])
+    assert build_chart_data(result, "line") == [
+        {"year_month": "2005-05", "revenue": 4824.43},
+        {"year_month": "2005-06", "revenue": 9631.88},
+    ]
+
+
+def test_pie_keeps_one_value_and_scatter_needs_two():
+    result = make_result(["rating", "films", "avg_rate"], [["PG", 194, 3.05], ["R", 195, 2.94]])
+    assert build_chart_data(result, "pie") == [{"rating": "PG", "films": 194}, {"rating": "R", "films": 195}]
+    assert build_chart_data(result, "scatter") == [
+        {"rating": "PG", "films": 194, "avg_rate": 3.05},
+        {"rating": "R", "films": 195, "avg_rate": 2.94},
+    ]
+    assert build_chart_data(make_result(["rating", "films"], [["PG", 194]]), "scatter") == []
+
+
+def test_table_drops_id_columns():
+    result = make_result(["film_id", "title", "length"], [[1, "ACADEMY DINOSAUR", 86]])
+    assert build_chart_data(result, "table") == [{"title": "ACADEMY DINOSAUR", "length": 86}]
+
+
+def test_no_chart_for_none_errors_or_missing_values():
+    result = make_result(["title"], [["ACADEMY DINOSAUR"]])
+    assert build_chart_data(result, "bar") == []
+    assert build_chart_data(make_result(["name", "n"], [["a", 1]]), "none") == []
+    assert build_chart_data(make_result(error="boom"), "bar") == []
+
+
+def test_points_are_capped():
+    result = make_result(["name", "n"], [[f"item {i}", i] for i in range(50)])
+    assert len(build_chart_data(result, "bar", max_points=10)) == 10
@@ -0,0 +1,132 @@
+"""
+_sync_embeddings 테스트 (Postgres 없이 가짜 커넥션 풀과 임베딩 모델로 실행)
+
+- 한 배치 저장에 실패해도 나머지 배치를 계속 저장하는지 확인합니다.
+  모든 배치가 커넥션 하나를 공유하므로, 실패한 배치의 트랜잭션을 되돌리지 않으면
+  이후 배치와 마지막 DELETE가 모두 InFailedSqlTransaction으로 실패합니다.
+- 원본 행 수가 늘어도 클라이언트 최대 메모리(tracemalloc)가 함께 늘지 않는지 확인합니다.
+"""
+import os
+import tracemalloc
+from contextlib import contextmanager
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import app.embeddings as embeddings  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.aborted = False
+        self.committed = []
+        self.pending = []
+
+    @contextmanager
+    def cursor(self, name=None):
+        yield FakeCursor(self)
+
+    def commit(self):
+        if self.aborted:
+            raise RuntimeError("current transaction is aborted")
+        self.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.aborted = False
+        self.pending = []
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.itersize = None
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        if self.conn.aborted:
+            raise RuntimeError("InFailedSqlTransaction: current transaction is aborted")
+
+    def __iter__(self):
+        # 원본 행 + 저장된 content_hash(없음) + 임베딩 없음 (서버 측 커서처럼 한 행씩)
+        return (row + (None, True) for row in self.conn.rows)
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextmanager
+    def connection(self):
+        yield self.conn
+
+
+class FakeEmbedder:
+    rate_limited = 0
+
+    def __init__(self, dims=3):
+        self.dims = dims
+
+    def embed(self, texts, token_count):
+        return [[1.0] + [0.0] * (self.dims - 1) for _ in texts]
+
+
+def test_failed_batch_does_not_abort_remaining_batches(monkeypatch):
+    rows = [(i, f"film {i}") for i in range(1, 7)]
+    conn = FakeConnection(rows)
+
+    def fake_copy_upsert(cur, table, key_column, columns, column_types, batch_rows):
+        if conn.aborted:
+            raise RuntimeError("InFailedSqlTransaction: current transaction is aborted")
+        if any(row[0] == 3 for row in batch_rows):
+            conn.aborted = True
+            raise RuntimeError("copy failed")
+        conn.pending.extend(row[0] for row in batch_rows)
+
+    monkeypatch.setattr(embeddings, "get_pool", lambda: FakePool(conn))
+    monkeypatch.setattr(embeddings, "copy_upsert", fake_copy_upsert)
+    monkeypatch.setattr(embeddings, "embedder", FakeEmbedder())
+    monkeypatch.setattr(embeddings, "EMBEDDING_BATCH_SIZE", 2)
+
+    stats, removed = embeddings._sync_embeddings(
+        "film_embeddings", "film_id", "SELECT film_id, title FROM film", lambda row: row, "test",
+    )
+
+    assert stats.failed_rows == 2
+    assert stats.rows == 4
+    assert sorted(conn.committed) == [1, 2, 5, 6]
+    assert not conn.aborted
+
+
+def _sync_peak_bytes(monkeypatch, rows: int) -> int:
+    """원본 rows개를 한 행씩 만들어 동기화하는 동안의 tracemalloc 최대 메모리"""
+    source = ((i, f"Customer: CUSTOMER {i}\nEmail: customer{i}@example.com\nLocation: {i} Main St")
+              for i in range(1, rows + 1))
+    conn = FakeConnection(source)
+    written = []
+
+    def fake_copy_upsert(cur, table, key_column, columns, column_types, batch_rows):
+        written.append(len(batch_rows))
+
+    monkeypatch.setattr(embeddings, "get_pool", lambda: FakePool(conn))
+    monkeypatch.setattr(embeddings, "copy_upsert", fake_copy_upsert)
+    monkeypatch.setattr(embeddings, "embedder", FakeEmbedder(dims=256))
+
+    tracemalloc.start()
+    try:
+        stats, _ = embeddings._sync_embeddings(
+            "customer_embeddings", "customer_id", "SELECT customer_id FROM customer", lambda row: row, "test",
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert stats.rows == rows
+    assert sum(written) == rows
+    return peak
+
+
+def test_sync_peak_memory_does_not_grow_with_row_count(monkeypatch):
+    small = _sync_peak_bytes(monkeypatch, 2_000)
+    large = _sync_peak_bytes(monkeypatch, 20_000)
+    # 행 수가 10배여도 진행 중인 배치 몇 개 분량만 메모리에 있어야 함
+    assert large < small * 1.5, f"peak grew from {small / 1024:.0f} KiB to {large / 1024:.0f} KiB"
@@ -0,0 +1,55 @@
+"""
+답변 프롬프트용 SQL 결과 압축(compact_result_for_prompt)이 토큰 예산을 지키는지 테스트
+"""
+import pytest
+
+from app.results import compact_result_for_prompt, estimate_tokens, make_result
+
+
+def _films(rows: int):
+    return make_result(
+        ["film_id", "title", "rating", "rental_rate"],
+        [[i, f"FILM TITLE {i}", ("G", "PG", "R")[i % 3], 0.99 + i % 5] for i in range(1, rows + 1)],
+    )
+
+
+def test_small_result_is_sent_as_full_table():
+    text = compact_result_for_prompt(_films(3), token_budget=1000)
+    assert text.splitlines()[0] == "film_id | title | rating | rental_rate"
+    assert "FILM TITLE 3" in text
+    assert "Summary" not in text
+
+
+@pytest.mark.parametrize("budget", [40, 100, 300, 1000])
+def test_large_result_stays_within_budget(budget):
+    text = compact_result_for_prompt(_films(5000), token_budget=budget)
+    assert estimate_tokens(text) <= budget
+    assert text.startswith("Summary of the full result:")
+
+
+def test_large_result_has_summary_and_first_rows():
+    text = compact_result_for_prompt(_films(5000), token_budget=1000)
+    assert "Total rows: 5000" in text
+    assert "- rental_rate (numeric):" in text
+    assert "\n\nFirst rows:\nfilm_id | title | rating | rental_rate\n1 | FILM TITLE 1" in text
+
+
+@pytest.mark.parametrize("budget", [50, 200, 1000])
+def test_single_row_with_huge_cell_stays_within_budget(budget):
+    result = make_result(["film_id", "description"], [[1, "A Epic Drama " * 2000]])
+    text = compact_result_for_prompt(result, token_budget=budget)
+    assert estimate_tokens(text) <= budget
+    assert "…" in text
+
+
+def test_wide_result_omits_summary_columns_to_fit():
+    columns = [f"column_with_a_long_name_{i}" for i in range(200)]
+    result = make_result(columns, [[f"value {i} {j}" for j in range(200)] for i in range(20)])
+    text = compact_result_for_prompt(result, token_budget=300)
+    assert estimate_tokens(text) <= 300
+    assert "more columns omitted" in text
+
+
+def test_errors_and_empty_results_pass_through():
+    assert compact_result_for_prompt(make_result(error="Error executing query: boom")) == "Error executing query: boom"
+    assert compact_result_for_prompt(make_result(["n"], [])) == "n\n(0 rows)"
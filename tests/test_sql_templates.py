@@ -0,0 +1,85 @@
+"""
+SQL 템플릿 캐시의 리터럴 추출 / 템플릿 생성 / 렌더링 테스트
+
+템플릿은 LLM이 만든 SQL의 리터럴을 $n으로 바꿔 prepared statement로 실행하므로,
+어느 위치를 바꿀지 확실하지 않으면 캐시하지 않아야 하고 렌더링한 SQL은 원래 SQL과 같아야 합니다.
+"""
+import pytest
+
+from app.sql_templates import SQLTemplateCache, extract_literals, parameterize_sql, render_sql
+
+
+def test_extract_literals_orders_strings_dates_and_numbers():
+    question, literals = extract_literals("Top 5 'PG-13' films rented on 2005-07-08 for 4.99")
+    assert question == "Top <num> <str> films rented on <str> for <num>"
+    assert literals == [("number", "5"), ("string", "PG-13"), ("string", "2005-07-08"), ("number", "4.99")]
+
+
+def test_repeated_literal_is_not_cached():
+    cache = SQLTemplateCache()
+    question = "Films with rental_duration 5 and rental_rate 5"
+    sql = "SELECT title FROM film WHERE rental_duration = 5 AND rental_rate = 5"
+    assert parameterize_sql(sql, extract_literals(question)[1]) is None
+    assert cache.store(question, sql) is False
+    assert cache.lookup(question) is None
+    assert cache.stats()["rejected"] == 1
+
+
+def test_literal_used_twice_in_sql_is_not_cached():
+    _, literals = extract_literals("Top 5 customers")
+    assert parameterize_sql("SELECT * FROM customer WHERE store_id <> 5 LIMIT 5", literals) is None
+
+
+def test_number_inside_string_literal_is_left_alone():
+    _, literals = extract_literals("Top 13 films rated 'PG-13'")
+    sql = "SELECT title FROM film WHERE rating = 'PG-13' ORDER BY rental_rate DESC LIMIT 13"
+    template = parameterize_sql(sql, literals)
+    assert template == "SELECT title FROM film WHERE rating = $2 ORDER BY rental_rate DESC LIMIT $1"
+
+
+def test_iso_date_is_one_string_literal():
+    _, literals = extract_literals("Rentals on 2005-07-08")
+    assert literals == [("string", "2005-07-08")]
+    sql = "SELECT COUNT(*) FROM rental WHERE rental_date::date = '2005-07-08'"
+    assert parameterize_sql(sql, literals) == "SELECT COUNT(*) FROM rental WHERE rental_date::date = $1"
+
+
+def test_quoted_name_with_apostrophe_round_trips():
+    _, literals = extract_literals('Films with actor "O\'BRIEN"')
+    assert literals == [("string", "O'BRIEN")]
+    sql = "SELECT f.title FROM film f JOIN film_actor fa USING (film_id) JOIN actor a USING (actor_id) WHERE a.last_name = 'O''BRIEN'"
+    template = parameterize_sql(sql, literals)
+    assert template.endswith("WHERE a.last_name = $1")
+    assert render_sql(template, literals) == sql
+
+
+def test_sql_with_dollar_sign_is_not_cached():
+    _, literals = extract_literals("Top 5 films")
+    assert parameterize_sql("SELECT $$x$$ AS tag FROM film LIMIT 5", literals) is None
+
+
+@pytest.mark.parametrize("question, sql", [
+    ("Top 5 films in 'Action'",
+     "SELECT f.title FROM film f JOIN film_category fc USING (film_id) JOIN category c USING (category_id) "
+     "WHERE c.name = 'Action' LIMIT 5"),
+    ("Payments over 4.99 since 2007-02-15",
+     "SELECT * FROM payment WHERE amount > 4.99 AND payment_date >= '2007-02-15'"),
+    ("Films released in 2006 longer than 120 minutes",
+     "SELECT title FROM film WHERE release_year = 2006 AND length > 120"),
+])
+def test_render_round_trips_to_original_sql(question, sql):
+    _, literals = extract_literals(question)
+    template = parameterize_sql(sql, literals)
+    assert template is not None and "$" in template
+    assert render_sql(template, literals) == sql
+
+
+def test_lookup_renders_new_literals_into_cached_template():
+    cache = SQLTemplateCache()
+    assert cache.store("Top 5 films rated 'PG'", "SELECT title FROM film WHERE rating = 'PG' LIMIT 5")
+    hit = cache.lookup("Top 10 films rated 'R'")
+    assert hit is not None
+    assert hit.params == ["10", "R"]
+    assert hit.sql == "SELECT title FROM film WHERE rating = 'R' LIMIT 10"
+    # 리터럴 종류가 다르면 (숫자 자리에 문자열) 같은 템플릿을 쓰지 않음
+    assert cache.lookup("Top 'five' films rated 'R'") is None